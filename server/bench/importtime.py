@@ -0,0 +1,85 @@
+"""
+Startup-time report: imports the app in a fresh interpreter with
+`python -X importtime` and breaks the cost down by top-level package.
+
+    cd server
+    python -m bench.importtime                    # report
+    python -m bench.importtime --budget-ms 1500   # also exit 1 if over budget (for CI)
+
+Best of --runs (default 3) is used, so a cold disk cache doesn't fail the check.
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+# Must never be imported at startup
+FORBIDDEN = ("gradio_client", "PIL", "twilio", "redis", "numpy")
+
+
+def measure(module: str):
+    """(total_us, [(self_us, cumulative_us, depth, name)]) for one cold import of `module`."""
+    env = dict(os.environ)
+    env.setdefault("SECRET_KEY", "importtime")
+    env.setdefault("DATABASE_URL", "sqlite:///:memory:")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SERVER_DIR, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append((int(self_us), int(cumulative_us), len(indent) // 2, name))
+    total = sum(self_us for self_us, _, _, _ in rows)
+    return total, rows
+
+
+def by_package(rows):
+    totals = defaultdict(int)
+    for self_us, _, _, name in rows:
+        totals[name.split(".")[0]] += self_us
+    return sorted(totals.items(), key=lambda item: -item[1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, help="fail if the best run exceeds this")
+    args = parser.parse_args(argv)
+
+    total, rows = min((measure(args.module) for _ in range(args.runs)), key=lambda run: run[0])
+
+    print(f"import {args.module}: {total / 1000:.1f} ms (best of {args.runs})")
+    print(f"\n{'package':<32}{'self ms':>10}{'share':>8}")
+    for package, self_us in by_package(rows)[:args.top]:
+        print(f"{package:<32}{self_us / 1000:>10.1f}{self_us / total:>8.1%}")
+
+    print(f"\n{'slowest modules (cumulative)':<48}{'ms':>10}")
+    for _, cumulative_us, depth, name in sorted(rows, key=lambda row: -row[1])[:args.top]:
+        print(f"{'  ' * min(depth, 6) + name:<48}{cumulative_us / 1000:>10.1f}")
+
+    failed = False
+    loaded = {name.split(".")[0] for _, _, _, name in rows}
+    eager = [package for package in FORBIDDEN if package in loaded]
+    if eager:
+        print(f"\nFAIL: imported at startup, should be lazy: {', '.join(eager)}", file=sys.stderr)
+        failed = True
+    if args.budget_ms is not None and total / 1000 > args.budget_ms:
+        print(f"\nFAIL: {total / 1000:.1f} ms exceeds the {args.budget_ms:.0f} ms budget", file=sys.stderr)
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
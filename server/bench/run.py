@@ -0,0 +1,274 @@
+"""
+Load/benchmark harness: drives the FastAPI app from main.py in-process
+(httpx ASGI transport, no network) against a local seeded database and a
+stubbed disease-prediction backend.
+
+    cd server
+    python -m bench.run --fresh --concurrency 16 --requests 500 --output bench-results.json
+    python -m bench.run --baseline bench-results.json --output after.json
+
+Reports p50/p95/p99 latency and requests/sec per endpoint.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+DEFAULT_DATABASE_URL = "sqlite:///bench.db"
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _random_point(rng):
+    from bench.seed import NEPAL_LAT, NEPAL_LON
+
+    return round(rng.uniform(*NEPAL_LAT), 4), round(rng.uniform(*NEPAL_LON), 4)
+
+
+def _leaf_image():
+    from PIL import Image
+
+    buf = io.BytesIO()
+    Image.new("RGB", (224, 224), (40, 140, 60)).save(buf, "JPEG")
+    return buf.getvalue()
+
+
+def build_scenarios(ctx):
+    """name -> callable(rng, token) returning kwargs for client.request()."""
+    from bench.seed import VEGETABLES
+
+    now = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    image = _leaf_image()
+
+    def get_machinery(rng, token):
+        lat, lon = _random_point(rng)
+        return {"method": "GET", "url": "/machinery/", "params": {
+            "machine_name": "tractor", "latitude": lat, "longitude": lon, "max_distance": 25,
+        }}
+
+    def get_vegetables(rng, token):
+        params = {"limit": 50}
+        if rng.random() < 0.5:
+            params["category"] = rng.choice(VEGETABLES)[1]
+        if rng.random() < 0.5:
+            params["cursor"] = rng.randrange(ctx["counts"]["vegetables"] or 1)
+        return {"method": "GET", "url": "/vegetables/", "params": params}
+
+    def login(rng, token):
+        from bench.seed import SEED_PASSWORD
+
+        user = rng.randrange(ctx["counts"]["users"] or 1)
+        return {"method": "POST", "url": "/auth/login", "data": {
+            "username": f"farmer{user}@example.com", "password": SEED_PASSWORD,
+        }}
+
+    def users_me(rng, token):
+        return {"method": "GET", "url": "/users/me", "headers": {"Authorization": f"Bearer {token}"}}
+
+    def user_bookings(rng, token):
+        return {"method": "GET", "url": "/machinery/bookings", "headers": {"Authorization": f"Bearer {token}"}}
+
+    def availability(rng, token):
+        ids = [rng.randrange(1, (ctx["counts"]["machinery"] or 1) + 1) for _ in range(20)]
+        return {"method": "GET", "url": "/machinery/availability", "params": {
+            "start": now.isoformat(), "end": (now + timedelta(days=14)).isoformat(), "machinery_ids": ids,
+        }}
+
+    def book_machinery(rng, token):
+        start = now + timedelta(days=rng.randint(1, 80), hours=rng.randint(0, 23))
+        return {"method": "POST", "url": "/machinery/book", "headers": {"Authorization": f"Bearer {token}"}, "json": {
+            "machinery_id": rng.randrange(1, (ctx["counts"]["machinery"] or 1) + 1),
+            "start_time": start.isoformat(),
+            "end_time": (start + timedelta(hours=rng.randint(1, 6))).isoformat(),
+            "delivery_type": "SELF_PICKUP",
+        }}
+
+    def predict_disease(rng, token):
+        return {"method": "POST", "url": "/predict/disease", "files": {"file": ("leaf.jpg", image, "image/jpeg")}}
+
+    return {
+        "get_machinery": get_machinery,
+        "get_vegetables": get_vegetables,
+        "login_for_access_token": login,
+        "read_current_user": users_me,
+        "get_user_bookings": user_bookings,
+        "get_availability": availability,
+        "book_machinery": book_machinery,
+        "predict_disease": predict_disease,
+    }
+
+
+async def run_scenario(client, name, factory, requests, concurrency, token, rng_seed):
+    latencies, statuses = [], {}
+    remaining = requests
+    rng = random.Random(rng_seed)
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            kwargs = factory(rng, token)
+            started = time.perf_counter()
+            try:
+                response = await client.request(**kwargs)
+                status = str(response.status_code)
+            except Exception as exc:  # count transport/app crashes as errors
+                status = type(exc).__name__
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    errors = sum(count for status, count in statuses.items() if not status.startswith(("2", "3", "4")))
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "status_counts": statuses,
+        "rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50), 3),
+        "p95_ms": round(percentile(latencies, 0.95), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+    }
+
+
+def compare(results, baseline):
+    lines = [f"{'endpoint':<26}{'p50 Δ%':>10}{'p95 Δ%':>10}{'p99 Δ%':>10}{'rps Δ%':>10}"]
+    for name, current in results["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(name)
+        if not before:
+            continue
+
+        def delta(key):
+            return f"{(current[key] - before[key]) / before[key] * 100:+.1f}" if before[key] else "n/a"
+
+        lines.append(f"{name:<26}{delta('p50_ms'):>10}{delta('p95_ms'):>10}{delta('p99_ms'):>10}{delta('rps'):>10}")
+    return "\n".join(lines)
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args):
+    import httpx
+    from sqlalchemy import func, select
+
+    from bench.seed import create_schema, seed, SEED_PASSWORD
+    from database import engine, AsyncSessionLocal
+    from main import app
+    from models.user import User
+    from models.machinery import Machinery
+    from models.vegetable import Vegetable
+
+    create_schema(engine)
+    async with AsyncSessionLocal() as db:
+        counts = {
+            "users": await db.scalar(select(func.count(User.id))),
+            "machinery": await db.scalar(select(func.count(Machinery.id))),
+            "vegetables": await db.scalar(select(func.count(Vegetable.id))),
+        }
+    if counts["users"] == 0:
+        print("Database is empty, seeding...", file=sys.stderr)
+        counts.update(await asyncio.to_thread(
+            seed, engine, args.users, args.machinery, args.bookings, args.vegetables
+        ))
+
+    ctx = {"counts": counts}
+    scenarios = build_scenarios(ctx)
+    selected = args.endpoints or list(scenarios)
+
+    # ASGITransport doesn't send lifespan events; run them so shutdown hooks fire
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app), \
+            httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        login = await client.post("/auth/login", data={"username": "farmer0@example.com", "password": SEED_PASSWORD})
+        login.raise_for_status()
+        token = login.json()["access_token"]
+
+        results = {
+            "meta": {
+                "timestamp": datetime.utcnow().isoformat() + "Z",
+                "git_revision": _git_revision(),
+                "python": platform.python_version(),
+                "database": args.database_url,
+                "concurrency": args.concurrency,
+                "requests_per_endpoint": args.requests,
+                "list_cache": not args.disable_list_cache,
+                "dataset": counts,
+            },
+            "endpoints": {},
+        }
+        for i, name in enumerate(selected):
+            factory = scenarios[name]
+            # Warm caches/pools so the first few requests don't skew percentiles
+            await run_scenario(client, name, factory, args.warmup, args.concurrency, token, rng_seed=1000 + i)
+            stats = await run_scenario(client, name, factory, args.requests, args.concurrency, token, rng_seed=i)
+            results["endpoints"][name] = stats
+            print(
+                f"{name:<26} {stats['rps']:>9.1f} req/s  p50 {stats['p50_ms']:>8.2f} ms  "
+                f"p95 {stats['p95_ms']:>8.2f} ms  p99 {stats['p99_ms']:>8.2f} ms  {stats['status_counts']}",
+                file=sys.stderr,
+            )
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL)
+    parser.add_argument("--fresh", action="store_true", help="delete the SQLite database file first")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=500, help="requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--endpoints", nargs="*", help="subset of scenarios to run")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--machinery", type=int, default=10000)
+    parser.add_argument("--bookings", type=int, default=30000)
+    parser.add_argument("--vegetables", type=int, default=5000)
+    parser.add_argument("--disable-list-cache", action="store_true", help="measure uncached list endpoints")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--baseline", help="results JSON from an earlier run to compare against")
+    args = parser.parse_args(argv)
+
+    # Must be set before the app (and database.py) are imported
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("SECRET_KEY", "bench-secret")
+    os.environ["DISEASE_BACKEND"] = "local"
+    if args.disable_list_cache:
+        os.environ["LIST_CACHE_TTL"] = "0"
+
+    if args.fresh and args.database_url.startswith("sqlite:///"):
+        path = args.database_url[len("sqlite:///"):]
+        if os.path.exists(path):
+            os.remove(path)
+
+    results = asyncio.run(run(args))
+
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(results, fh, indent=2)
+    if args.baseline:
+        with open(args.baseline) as fh:
+            print(compare(results, json.load(fh)), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Seed a database with realistic volumes for benchmarking.
+
+    cd server
+    python -m bench.seed --database-url sqlite:///bench.db --machinery 20000
+
+Every seeded user's password is SEED_PASSWORD (hashed once and reused).
+"""
+import argparse
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+NEPAL_LAT = (26.35, 30.45)
+NEPAL_LON = (80.06, 88.20)
+SEED_PASSWORD = "krishi-bench"
+
+MACHINE_NAMES = [
+    "Tractor", "Mini Tractor", "Power Tiller", "Rotavator", "Combine Harvester",
+    "Thresher", "Sprayer", "Seed Drill", "Water Pump", "Reaper", "Cultivator",
+]
+VEGETABLES = [
+    ("Tomato", "vegetable"), ("Potato", "vegetable"), ("Onion", "vegetable"),
+    ("Cauliflower", "vegetable"), ("Cabbage", "vegetable"), ("Spinach", "leafy"),
+    ("Mustard Greens", "leafy"), ("Banana", "fruit"), ("Orange", "fruit"),
+    ("Apple", "fruit"), ("Rice", "grain"), ("Maize", "grain"), ("Lentil", "pulse"),
+]
+BATCH_SIZE = 1000
+
+
+def _batches(rows):
+    for i in range(0, len(rows), BATCH_SIZE):
+        yield rows[i:i + BATCH_SIZE]
+
+
+def _insert(conn, model, rows):
+    from sqlalchemy import insert
+
+    from models.sync import Versioned, reserve_versions
+
+    for batch in _batches(rows):
+        if issubclass(model, Versioned):
+            # Core INSERTs skip the ORM's sync version stamping
+            first = reserve_versions(conn, model.__tablename__, len(batch)) - len(batch) + 1
+            batch = [dict(row, row_version=first + i) for i, row in enumerate(batch)]
+        conn.execute(insert(model), batch)
+
+
+def seed(engine, users=2000, machinery=10000, bookings=30000, vegetables=5000, random_seed=42):
+    from models.user import User
+    from models.machinery import Machinery, Booking, DeliveryType
+    from models.vegetable import Vegetable
+    import models.notification  # noqa: F401  (User.notifications needs it mapped)
+    from services.auth import get_password_hash
+
+    rng = random.Random(random_seed)
+    now = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    password = get_password_hash(SEED_PASSWORD)
+
+    user_rows = [
+        {
+            "email": f"farmer{i}@example.com",
+            "name": f"Farmer {i}",
+            "phone": f"98{i:08d}",
+            "password": password,
+            "latitude": rng.uniform(*NEPAL_LAT),
+            "longitude": rng.uniform(*NEPAL_LON),
+            "is_active": True,
+        }
+        for i in range(users)
+    ]
+
+    machinery_rows = []
+    for i in range(machinery):
+        owner = user_rows[rng.randrange(users)]
+        delivery = rng.random() < 0.5
+        machinery_rows.append({
+            "id": i + 1,
+            "name": f"{rng.choice(MACHINE_NAMES)} {rng.choice(['Mahindra', 'Sonalika', 'Kubota', 'Swaraj', 'John Deere'])}",
+            "description": "Well maintained, available with operator",
+            "price_per_hour": round(rng.uniform(300, 3000), 0),
+            "latitude": rng.uniform(*NEPAL_LAT),
+            "longitude": rng.uniform(*NEPAL_LON),
+            "owner_name": owner["name"],
+            "owner_phone": owner["phone"],
+            "image_url": "/static/favicon.ico",
+            "available_from": now - timedelta(days=30),
+            "available_to": now + timedelta(days=90),
+            "delivery_available": delivery,
+            "delivery_charge": round(rng.uniform(100, 800), 0) if delivery else None,
+            "is_available": rng.random() < 0.9,
+        })
+
+    # Sequential, non-overlapping bookings per machine
+    booking_rows = []
+    next_free = {}
+    for _ in range(bookings):
+        machine = machinery_rows[rng.randrange(machinery)]
+        start = next_free.get(machine["id"], now - timedelta(days=7)) + timedelta(hours=rng.randint(0, 48))
+        end = start + timedelta(hours=rng.randint(1, 8))
+        next_free[machine["id"]] = end
+        delivery_type = DeliveryType.OWNER_DELIVERY if machine["delivery_available"] and rng.random() < 0.5 else DeliveryType.SELF_PICKUP
+        booking_rows.append({
+            "machinery_id": machine["id"],
+            "user_phone": user_rows[rng.randrange(users)]["phone"],
+            "start_time": start,
+            "end_time": end,
+            "delivery_type": delivery_type,
+            "total_price": machine["price_per_hour"] * (end - start).total_seconds() / 3600,
+        })
+
+    vegetable_rows = []
+    for i in range(vegetables):
+        name, category = rng.choice(VEGETABLES)
+        vegetable_rows.append({
+            "veg_name": f"{name} {i}",
+            "category": category,
+            "quantity": round(rng.uniform(1, 500), 1),
+            "rate": round(rng.uniform(20, 400), 0),
+            "description": "Fresh from the farm",
+        })
+
+    with engine.begin() as conn:
+        _insert(conn, User, user_rows)
+        _insert(conn, Machinery, machinery_rows)
+        _insert(conn, Booking, booking_rows)
+        _insert(conn, Vegetable, vegetable_rows)
+
+    return {
+        "users": len(user_rows),
+        "machinery": len(machinery_rows),
+        "bookings": len(booking_rows),
+        "vegetables": len(vegetable_rows),
+    }
+
+
+def create_schema(engine):
+    import migrate
+
+    migrate.upgrade(engine)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default="sqlite:///bench.db")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--machinery", type=int, default=10000)
+    parser.add_argument("--bookings", type=int, default=30000)
+    parser.add_argument("--vegetables", type=int, default=5000)
+    parser.add_argument("--random-seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    os.environ["DATABASE_URL"] = args.database_url
+    from database import engine
+
+    create_schema(engine)
+    counts = seed(engine, args.users, args.machinery, args.bookings, args.vegetables, args.random_seed)
+    print(f"Seeded {counts} into {args.database_url}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Compares the two list-endpoint read paths on the same rows:
+
+  orm        select(Model) -> ORM instances -> TypeAdapter(List[Schema]) validate + dump_json
+  projection select(columns) -> row tuples -> orjson (services/serialization.py)
+
+    cd server
+    python -m bench.serialization --rows 5000 --repeat 5
+
+Also checks both produce byte-identical JSON.
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+
+def best_of(repeat, fn):
+    async def run():
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = await fn()
+            timings.append(time.perf_counter() - started)
+        return min(timings), result
+    return run()
+
+
+async def compare(rows, repeat):
+    from typing import List
+
+    from pydantic import TypeAdapter
+    from sqlalchemy import select
+
+    from database import AsyncSessionLocal, async_engine
+    from models.machinery import Machinery
+    from models.notification import Notification
+    from models.user import User
+    from models.vegetable import Vegetable
+    from schemas.machinery import MachineryOut
+    from schemas.notification import NotificationOut
+    from schemas.user import UserOut
+    from schemas.vegetable import VegetableOut
+    from services.serialization import Projection
+
+    cases = [
+        ("get_machinery", MachineryOut, Machinery),
+        ("get_vegetables", VegetableOut, Vegetable),
+        ("get_all_users", UserOut, User),
+        ("get_notifications", NotificationOut, Notification),
+    ]
+    print(f"{'endpoint':<20}{'rows':>7}{'orm ms':>10}{'projection ms':>15}{'speedup':>9}  identical")
+    async with AsyncSessionLocal() as session:
+        for name, schema, model in cases:
+            adapter = TypeAdapter(List[schema])
+            projection = Projection(schema, model)
+
+            async def orm_path():
+                objects = (await session.scalars(select(model).order_by(model.id).limit(rows))).all()
+                body = adapter.dump_json(adapter.validate_python(objects, from_attributes=True))
+                session.expunge_all()  # don't let the identity map turn later runs into cache hits
+                return body
+
+            async def projection_path():
+                result = (await session.execute(projection.select().order_by(model.id).limit(rows))).all()
+                return projection.dump(result)
+
+            orm_seconds, orm_body = await best_of(repeat, orm_path)
+            fast_seconds, fast_body = await best_of(repeat, projection_path)
+            count = len(adapter.validate_json(orm_body))
+            print(
+                f"{name:<20}{count:>7}{orm_seconds * 1000:>10.1f}{fast_seconds * 1000:>15.1f}"
+                f"{orm_seconds / fast_seconds:>8.1f}x  {orm_body == fast_body}"
+            )
+    await async_engine.dispose()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="krishi-bench-")
+    path = os.path.join(workdir, "serialization.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    os.environ.setdefault("SECRET_KEY", "bench-secret")
+
+    from sqlalchemy import insert
+
+    from bench.seed import create_schema, seed
+    from database import engine
+    from models.notification import Notification
+
+    create_schema(engine)
+    seed(engine, users=args.rows, machinery=args.rows, bookings=0, vegetables=args.rows)
+    with engine.begin() as conn:
+        conn.execute(insert(Notification), [
+            {"user_id": 1 + i % args.rows, "message": f"New Tractor available for rent {i % 20}.0 km from you"}
+            for i in range(args.rows)
+        ])
+    print(f"Seeded {args.rows} rows per table into {path}", file=sys.stderr)
+
+    asyncio.run(compare(args.rows, args.repeat))
+    shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
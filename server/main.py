@@ -1,14 +1,50 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.staticfiles import StaticFiles
 from router import auth,users, machinery
-from database import Base, engine
-from router import vegetables , disease
+from database import engine, async_engine, read_router, ReadYourWritesMiddleware
+from router import vegetables , disease, metrics, media, notification, sync, profiles
+from services.prediction import prediction_service
+from services.images import UploadLimitMiddleware, shutdown_image_pool
+from services.notifications import notification_hub
+from services.sms import sms_sender
+from services.refresh_tokens import refresh_token_maintenance
+from services.instrumentation import instrument_engine, sql_metrics_middleware
+from services.profiling import ProfilingMiddleware
 
+# Schema is managed by versioned migrations run before deploy: `python -m migrate`
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await notification_hub.start()
+    await refresh_token_maintenance.start()
+    await read_router.start()
+    yield
+    await read_router.stop()
+    await refresh_token_maintenance.stop()
+    await notification_hub.stop()
+    await sms_sender.stop()
+    await prediction_service.stop()
+    shutdown_image_pool()
+    # Pooled aiosqlite connections each hold a non-daemon thread; without this the process hangs at exit
+    await async_engine.dispose()
 
-# Create tables in MySQL
-Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="SMART KRISHI", version="1.0.0")
+app = FastAPI(title="SMART KRISHI", version="1.0.0", lifespan=lifespan)
+
+# Per-request SQL counts/timings, slow-query log and route latency metrics
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+for replica in read_router.replicas:
+    instrument_engine(replica.engine.sync_engine)
+# On-demand request profiles (X-Profile-Token / PROFILE_SAMPLE_RATES). Added first so
+# it sits inside the metrics middleware, in the task that runs the endpoint.
+app.add_middleware(ProfilingMiddleware)
+# Caps image upload bodies before the multipart form is parsed and spooled
+app.add_middleware(UploadLimitMiddleware)
+# Read-your-writes cookie for callers that committed (see database.ReadRouter)
+app.add_middleware(ReadYourWritesMiddleware)
+app.middleware("http")(sql_metrics_middleware)
 
 app.include_router(auth.router, prefix="/auth", tags=["auth"])
 
@@ -17,7 +53,15 @@ app.include_router(auth.router, prefix="/auth", tags=["auth"])
 app.include_router(machinery.router)
 app.include_router(users.router)
 app.include_router(vegetables.router)
+app.include_router(notification.router, tags=["Notifications"])
+app.include_router(sync.router)
 app.include_router(disease.router)
+app.include_router(metrics.router)
+app.include_router(media.router)
+app.include_router(profiles.router)
+
+# Everything else under static/ (machinery photos are served by router/media.py)
+app.mount("/static", StaticFiles(directory="static"), name="static")
 
 
 @app.get("/")
@@ -0,0 +1,129 @@
+"""
+Versioned schema migrations. Run as a deploy step, before starting workers:
+
+    cd server
+    python -m migrate              # apply everything pending
+    python -m migrate --status     # show applied / pending versions
+    python -m migrate --check      # exit 1 if anything is pending
+
+Each migrations/NNNN_description.py defines `upgrade(conn)`. Applied versions
+are recorded in the schema_version table, one transaction per migration.
+"""
+import argparse
+import importlib
+import os
+import re
+import sys
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+MIGRATION_FILE = re.compile(r"^(\d{4})_(\w+)\.py$")
+
+version_metadata = MetaData()
+schema_version = Table(
+    "schema_version",
+    version_metadata,
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("name", String(255), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def discover():
+    """[(version, name)] for every migration file, in order."""
+    found = []
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        match = MIGRATION_FILE.match(filename)
+        if match:
+            found.append((int(match.group(1)), match.group(2)))
+    versions = [version for version, _ in found]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"Duplicate migration versions in {MIGRATIONS_DIR}")
+    return found
+
+
+def load(version: int, name: str):
+    return importlib.import_module(f"migrations.{version:04d}_{name}")
+
+
+def applied_versions(conn) -> set:
+    version_metadata.create_all(conn)
+    return set(conn.scalars(select(schema_version.c.version)))
+
+
+def pending(engine):
+    with engine.begin() as conn:
+        done = applied_versions(conn)
+    return [(version, name) for version, name in discover() if version not in done]
+
+
+def upgrade(engine=None, target: int = None):
+    """Apply pending migrations up to `target` (default: all). Returns the versions applied."""
+    if engine is None:
+        from database import engine
+
+    applied = []
+    for version, name in pending(engine):
+        if target is not None and version > target:
+            break
+        module = load(version, name)
+        with engine.begin() as conn:
+            module.upgrade(conn)
+            conn.execute(schema_version.insert().values(version=version, name=name, applied_at=datetime.utcnow()))
+        applied.append(version)
+        print(f"Applied migration {version:04d}_{name}", file=sys.stderr)
+    return applied
+
+
+# --- helpers for migrations: idempotent so half-migrated databases can be re-run ---
+
+def has_table(conn, table: str) -> bool:
+    return inspect(conn).has_table(table)
+
+
+def has_column(conn, table: str, column: str) -> bool:
+    return column in {col["name"] for col in inspect(conn).get_columns(table)}
+
+
+def has_index(conn, table: str, index: str) -> bool:
+    return index in {ix["name"] for ix in inspect(conn).get_indexes(table)}
+
+
+def add_column(conn, table: str, column: Column):
+    if not has_column(conn, table, column.name):
+        column_type = column.type.compile(dialect=conn.dialect)
+        conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {column.name} {column_type}")
+
+
+def create_index(conn, name: str, table: str, *columns: str, unique: bool = False):
+    if not has_index(conn, table, name):
+        kind = "UNIQUE INDEX" if unique else "INDEX"
+        conn.exec_driver_sql(f"CREATE {kind} {name} ON {table} ({', '.join(columns)})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--status", action="store_true", help="list applied and pending migrations")
+    parser.add_argument("--check", action="store_true", help="exit 1 if migrations are pending")
+    parser.add_argument("--target", type=int, help="stop after this version")
+    args = parser.parse_args(argv)
+
+    from database import engine
+
+    if args.status or args.check:
+        todo = pending(engine)
+        todo_versions = {version for version, _ in todo}
+        for version, name in discover():
+            state = "pending" if version in todo_versions else "applied"
+            print(f"{version:04d}_{name:<40} {state}")
+        if args.check and todo:
+            sys.exit(1)
+        return
+
+    upgrade(engine, args.target)
+
+
+if __name__ == "__main__":
+    main()
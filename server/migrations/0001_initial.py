@@ -0,0 +1,81 @@
+"""
+Schema as it was when tables were still created by Base.metadata.create_all().
+Frozen here rather than built from the models, so later migrations apply on
+top of it. Tables that already exist are left alone.
+"""
+from sqlalchemy import (
+    Boolean, Column, DateTime, Enum, Float, ForeignKey, Integer, MetaData, String, Table, Text, func,
+)
+
+metadata = MetaData()
+
+Table(
+    "users",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("email", String(100), unique=True, index=True, nullable=False),
+    Column("name", String(100), nullable=False),
+    Column("phone", String(20), nullable=False),
+    Column("password", String(255), nullable=False),
+    Column("latitude", Float, nullable=True),
+    Column("longitude", Float, nullable=True),
+    Column("is_active", Boolean),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+Table(
+    "machinery",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String(100), nullable=False),
+    Column("description", String(500)),
+    Column("price_per_hour", Float, nullable=False),
+    Column("latitude", Float),
+    Column("longitude", Float),
+    Column("owner_name", String(100)),
+    Column("owner_phone", String(20)),
+    Column("image_url", String(255)),
+    Column("available_from", DateTime),
+    Column("available_to", DateTime),
+    Column("delivery_available", Boolean),
+    Column("delivery_charge", Float),
+    Column("is_available", Boolean),
+)
+
+Table(
+    "booking",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("machinery_id", Integer, ForeignKey("machinery.id")),
+    Column("user_phone", String(20)),
+    Column("start_time", DateTime),
+    Column("end_time", DateTime),
+    Column("delivery_type", Enum("SELF_PICKUP", "OWNER_DELIVERY", name="deliverytype")),
+    Column("total_price", Float),
+)
+
+Table(
+    "notifications",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("message", String(500), nullable=False),
+    Column("created_at", DateTime),
+    Column("is_read", Boolean),
+)
+
+Table(
+    "vegetables",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("veg_name", String(100), nullable=False),
+    Column("category", String(50), nullable=False),
+    Column("quantity", Float, nullable=False),
+    Column("rate", Float, nullable=False),
+    Column("image_url", String(255), nullable=True),
+    Column("description", Text, nullable=True),
+)
+
+
+def upgrade(conn):
+    metadata.create_all(conn, checkfirst=True)
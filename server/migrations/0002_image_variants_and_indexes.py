@@ -0,0 +1,18 @@
+"""Machinery image derivatives plus the indexes behind search, booking and feed queries."""
+from sqlalchemy import Column, JSON, String
+
+from migrate import add_column, create_index
+
+
+def upgrade(conn):
+    add_column(conn, "machinery", Column("thumbnail_url", String(255)))
+    add_column(conn, "machinery", Column("image_variants", JSON))
+
+    create_index(conn, "ix_machinery_lat_lon", "machinery", "latitude", "longitude")
+    create_index(conn, "ix_booking_user_phone", "booking", "user_phone")
+    create_index(conn, "ix_booking_machinery_time", "booking", "machinery_id", "start_time", "end_time")
+    create_index(conn, "ix_vegetables_category_id", "vegetables", "category", "id")
+    create_index(conn, "ix_vegetables_rate", "vegetables", "rate")
+    create_index(conn, "ix_vegetables_veg_name", "vegetables", "veg_name")
+    create_index(conn, "ix_notification_user_read_created", "notifications", "user_id", "is_read", "created_at")
+    create_index(conn, "ix_users_lat_lon", "users", "latitude", "longitude")
@@ -0,0 +1,60 @@
+"""
+Change versions and tombstones for delta sync (GET /sync): row_version/updated_at
+on machinery, vegetables and notifications, the global version counter and the
+tombstone table. Existing rows get distinct versions so the first sync can be
+paged by version like any other.
+"""
+from datetime import datetime
+
+from sqlalchemy import BigInteger, Column, DateTime, Integer, MetaData, String, Table, text
+
+from migrate import add_column, create_index
+
+SYNCED_TABLES = ("machinery", "vegetables", "notifications")
+
+metadata = MetaData()
+
+Table(
+    "sync_counter",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=False),
+    Column("value", BigInteger, nullable=False),
+)
+
+Table(
+    "sync_tombstones",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("entity", String(32), nullable=False),
+    Column("entity_id", Integer, nullable=False),
+    Column("user_id", Integer),
+    Column("row_version", BigInteger, nullable=False),
+    Column("deleted_at", DateTime, nullable=False),
+)
+
+
+def upgrade(conn):
+    metadata.create_all(conn, checkfirst=True)
+    for table in SYNCED_TABLES:
+        add_column(conn, table, Column("row_version", BigInteger))
+        add_column(conn, table, Column("updated_at", DateTime))
+
+    # Backfill: each table's ids shifted past the previous table's, so every row is distinct
+    version = conn.scalar(text("SELECT value FROM sync_counter WHERE id = 1"))
+    if version is None:
+        conn.execute(text("INSERT INTO sync_counter (id, value) VALUES (1, 0)"))
+        version = 0
+    now = datetime.utcnow()
+    for table in SYNCED_TABLES:
+        backfilled = conn.execute(
+            text(f"UPDATE {table} SET row_version = id + :offset, updated_at = :now WHERE row_version IS NULL"),
+            {"offset": version, "now": now},
+        )
+        if backfilled.rowcount:
+            version += conn.scalar(text(f"SELECT COALESCE(MAX(id), 0) FROM {table}"))
+    conn.execute(text("UPDATE sync_counter SET value = :value WHERE id = 1"), {"value": version})
+
+    create_index(conn, "ix_machinery_row_version", "machinery", "row_version")
+    create_index(conn, "ix_vegetables_row_version", "vegetables", "row_version")
+    create_index(conn, "ix_notification_user_version", "notifications", "user_id", "row_version")
+    create_index(conn, "ix_sync_tombstones_version", "sync_tombstones", "row_version")
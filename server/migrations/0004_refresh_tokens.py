@@ -0,0 +1,33 @@
+"""Rotating refresh tokens (POST /auth/refresh), stored as SHA-256 hashes."""
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, MetaData, String, Table
+
+from migrate import create_index
+
+metadata = MetaData()
+
+Table(
+    "users",
+    metadata,
+    Column("id", Integer, primary_key=True),
+)
+
+Table(
+    "refresh_tokens",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("family_id", String(32), nullable=False),
+    Column("token_hash", String(64), nullable=False),
+    Column("created_at", DateTime),
+    Column("expires_at", DateTime, nullable=False),
+    Column("used_at", DateTime),
+    Column("revoked_at", DateTime),
+)
+
+
+def upgrade(conn):
+    metadata.tables["refresh_tokens"].create(conn, checkfirst=True)
+    create_index(conn, "ix_refresh_tokens_token_hash", "refresh_tokens", "token_hash", unique=True)
+    create_index(conn, "ix_refresh_tokens_family", "refresh_tokens", "family_id")
+    create_index(conn, "ix_refresh_tokens_expires", "refresh_tokens", "expires_at")
+    create_index(conn, "ix_refresh_tokens_revoked", "refresh_tokens", "revoked_at")
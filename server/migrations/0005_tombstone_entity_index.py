@@ -0,0 +1,6 @@
+"""Index for the list cache's per-table version (MAX(row_version) of a table's tombstones)."""
+from migrate import create_index
+
+
+def upgrade(conn):
+    create_index(conn, "ix_sync_tombstones_entity_version", "sync_tombstones", "entity", "row_version")
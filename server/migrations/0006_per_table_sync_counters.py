@@ -0,0 +1,30 @@
+"""
+One change counter per synced table (sync_counters), so writers to different
+tables no longer queue on the single sync_counter row. Each starts at the old
+global value: versions keep growing, and sync tokens issued before this stay
+valid. The old sync_counter table is no longer used.
+"""
+from sqlalchemy import BigInteger, Column, MetaData, String, Table, text
+
+SYNCED_TABLES = ("machinery", "vegetables", "notifications")
+
+metadata = MetaData()
+
+Table(
+    "sync_counters",
+    metadata,
+    Column("entity", String(32), primary_key=True),
+    Column("value", BigInteger, nullable=False),
+)
+
+
+def upgrade(conn):
+    metadata.create_all(conn, checkfirst=True)
+    version = conn.scalar(text("SELECT value FROM sync_counter WHERE id = 1")) or 0
+    for table in SYNCED_TABLES:
+        exists = conn.scalar(text("SELECT COUNT(*) FROM sync_counters WHERE entity = :entity"), {"entity": table})
+        if not exists:
+            conn.execute(
+                text("INSERT INTO sync_counters (entity, value) VALUES (:entity, :value)"),
+                {"entity": table, "value": version},
+            )
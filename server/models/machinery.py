@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Enum, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Enum, ForeignKey, Index, JSON
 from sqlalchemy.orm import relationship
 from database import Base
+from models.sync import Versioned
 import enum
 
 
@@ -9,7 +10,7 @@ class DeliveryType(str, enum.Enum):
     OWNER_DELIVERY = "OWNER_DELIVERY"
 
 
-class Machinery(Base):
+class Machinery(Versioned, Base):
     __tablename__ = "machinery"
 
     id = Column(Integer, primary_key=True, index=True)
@@ -21,6 +22,8 @@ class Machinery(Base):
     owner_name = Column(String(100))
     owner_phone = Column(String(20))
     image_url = Column(String(255))
+    thumbnail_url = Column(String(255))  # small derivative for list screens
+    image_variants = Column(JSON)  # {"detail": {"jpeg": url, "webp": url}, "thumb": {...}}
     available_from = Column(DateTime)
     available_to = Column(DateTime)
     delivery_available = Column(Boolean, default=False)
@@ -29,16 +32,29 @@ class Machinery(Base):
 
     bookings = relationship("Booking", back_populates="machinery")
 
+    # Bounding-box prefilter for radius search (see services/geo.py)
+    __table_args__ = (
+        Index("ix_machinery_lat_lon", "latitude", "longitude"),
+        # Delta sync: rows changed since a client's token
+        Index("ix_machinery_row_version", "row_version"),
+    )
+
 
 class Booking(Base):
     __tablename__ = "booking"
 
     id = Column(Integer, primary_key=True, index=True)
     machinery_id = Column(Integer, ForeignKey("machinery.id"))
-    user_phone = Column(String(20))  # ✅ Now valid for MySQL
+    user_phone = Column(String(20), index=True)  # ✅ Now valid for MySQL
     start_time = Column(DateTime)
     end_time = Column(DateTime)
     delivery_type = Column(Enum(DeliveryType))
     total_price = Column(Float)
 
     machinery = relationship("Machinery", back_populates="bookings")
+
+    # Overlap checks: machinery_id = ? AND start_time < :end AND end_time > :start.
+    # Also serves plain machinery_id lookups/joins (leftmost prefix).
+    __table_args__ = (
+        Index("ix_booking_machinery_time", "machinery_id", "start_time", "end_time"),
+    )
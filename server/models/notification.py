@@ -1,9 +1,10 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
+from models.sync import Versioned
 
-class Notification(Base):
+class Notification(Versioned, Base):
     __tablename__ = "notifications"
 
     id = Column(Integer, primary_key=True, index=True)
@@ -13,3 +14,10 @@ class Notification(Base):
     is_read = Column(Boolean, default=False)
 
     user = relationship("User", back_populates="notifications")
+
+    __table_args__ = (
+        # Unread counts and the per-user feed
+        Index("ix_notification_user_read_created", "user_id", "is_read", "created_at"),
+        # Delta sync of one user's notifications
+        Index("ix_notification_user_version", "user_id", "row_version"),
+    )
@@ -0,0 +1,30 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from datetime import datetime
+from database import Base
+
+
+class RefreshToken(Base):
+    """
+    One refresh token of a login session ("family"). Only the SHA-256 of the
+    opaque token is stored. Each use rotates it: the row is marked used and a
+    successor is issued in the same family.
+    """
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    family_id = Column(String(32), nullable=False)
+    token_hash = Column(String(64), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False)
+    used_at = Column(DateTime)  # rotated; presenting it again means it leaked
+    revoked_at = Column(DateTime)  # the whole family was revoked (logout or reuse)
+
+    __table_args__ = (
+        Index("ix_refresh_tokens_token_hash", "token_hash", unique=True),
+        Index("ix_refresh_tokens_family", "family_id"),
+        # Batched purge of expired rows
+        Index("ix_refresh_tokens_expires", "expires_at"),
+        # Denylist reload of recent revocations
+        Index("ix_refresh_tokens_revoked", "revoked_at"),
+    )
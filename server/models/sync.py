@@ -0,0 +1,106 @@
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import BigInteger, Column, DateTime, Index, Integer, String, column, event, func, select, table, update
+from sqlalchemy.orm import Session
+
+from database import Base
+
+
+class SyncCounter(Base):
+    """Last change version handed out, one row per synced table."""
+    __tablename__ = "sync_counters"
+
+    entity = Column(String(32), primary_key=True)  # table name
+    value = Column(BigInteger, nullable=False, default=0)
+
+
+class Tombstone(Base):
+    """A deleted synced row, kept so delta-sync clients can drop their copy."""
+    __tablename__ = "sync_tombstones"
+
+    id = Column(Integer, primary_key=True)
+    entity = Column(String(32), nullable=False)  # table name of the deleted row
+    entity_id = Column(Integer, nullable=False)
+    user_id = Column(Integer)  # owner, for per-user tables (notifications)
+    row_version = Column(BigInteger, nullable=False)
+    deleted_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("ix_sync_tombstones_version", "row_version"),
+        # Per-table version for the list cache (services/list_cache.table_version)
+        Index("ix_sync_tombstones_entity_version", "entity", "row_version"),
+    )
+
+
+class Versioned:
+    """
+    Mixin for tables mirrored by offline clients (GET /sync). Every ORM insert
+    or update stamps the row with the next row_version of its table; ORM
+    deletes leave a Tombstone with one. Core INSERTs must stamp rows
+    themselves with reserve_versions().
+    """
+    row_version = Column(BigInteger)
+    updated_at = Column(DateTime)
+
+
+def reserve_versions(connection, entity: str, count: int = 1) -> int:
+    """
+    Take `count` consecutive versions of table `entity` and return the last
+    one. Its counter row stays locked until the transaction ends, so the
+    table's versions become visible in the order they were handed out and a
+    client's token never skips a row; writers to other tables don't wait.
+    """
+    counter = SyncCounter.entity == entity
+    connection.execute(update(SyncCounter).where(counter).values(value=SyncCounter.value + count))
+    return connection.scalar(select(SyncCounter.value).where(counter))
+
+
+async def table_version(db, name: str) -> int:
+    """
+    Highest change version among the table's rows and its tombstones. Every
+    insert, update and delete takes a new version from the table's counter,
+    so this grows with each write, and every worker (or a replica, for the
+    data it has) reads the same value.
+    """
+    rows = select(func.max(column("row_version"))).select_from(table(name)).scalar_subquery()
+    deleted = select(func.max(Tombstone.row_version)).where(Tombstone.entity == name).scalar_subquery()
+    latest, removed = (await db.execute(select(rows, deleted))).one()
+    return max(latest or 0, removed or 0)
+
+
+@event.listens_for(Session, "before_flush")
+def stamp_versions(session, flush_context, instances):
+    changed = defaultdict(list)  # table -> objects
+    deleted = defaultdict(list)
+    for obj in session.new:
+        if isinstance(obj, Versioned):
+            changed[obj.__tablename__].append(obj)
+    for obj in session.dirty:
+        if isinstance(obj, Versioned) and session.is_modified(obj, include_collections=False):
+            changed[obj.__tablename__].append(obj)
+    for obj in session.deleted:
+        if isinstance(obj, Versioned):
+            deleted[obj.__tablename__].append(obj)
+    if not changed and not deleted:
+        return
+
+    now = datetime.utcnow()
+    # Counters locked in name order, so two transactions never wait on each other's
+    for entity in sorted(changed.keys() | deleted.keys()):
+        count = len(changed[entity]) + len(deleted[entity])
+        version = reserve_versions(session.connection(), entity, count) - count
+        for obj in changed[entity]:
+            version += 1
+            obj.row_version = version
+            obj.updated_at = now
+        for obj in deleted[entity]:
+            version += 1
+            obj.row_version = version  # not written: the object keeps its tombstone's version
+            session.add(Tombstone(
+                entity=entity,
+                entity_id=obj.id,
+                user_id=getattr(obj, "user_id", None),
+                row_version=version,
+                deleted_at=now,
+            ))
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime,Float
+from sqlalchemy import Column, Integer, String, Boolean, DateTime,Float, Index
 from sqlalchemy.sql import func
 from database import Base
 from sqlalchemy.orm import relationship
@@ -16,4 +16,9 @@ class User(Base):
     longitude = Column(Float, nullable=True)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    notifications = relationship("Notification", back_populates="user")
\ No newline at end of file
+    notifications = relationship("Notification", back_populates="user")
+
+    __table_args__ = (
+        # Bounding-box lookups for nearby farmers
+        Index("ix_users_lat_lon", "latitude", "longitude"),
+    )
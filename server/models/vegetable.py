@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, Float, Text
+from sqlalchemy import Column, Integer, String, Float, Text, Index
 from database import Base  # your SQLAlchemy Base
+from models.sync import Versioned
 
-class Vegetable(Base):
+class Vegetable(Versioned, Base):
     __tablename__ = "vegetables"
 
     id = Column(Integer, primary_key=True, index=True)
@@ -12,3 +13,12 @@ class Vegetable(Base):
     rate = Column(Float, nullable=False)
     image_url = Column(String(255), nullable=True)
     description = Column(Text, nullable=True)
+
+    # Keyset pagination walks id; filters are category (+id), rate range and name prefix
+    __table_args__ = (
+        Index("ix_vegetables_category_id", "category", "id"),
+        Index("ix_vegetables_rate", "rate"),
+        Index("ix_vegetables_veg_name", "veg_name"),
+        # Delta sync: rows changed since a client's token
+        Index("ix_vegetables_row_version", "row_version"),
+    )
@@ -1,17 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
 
-from schemas.user import UserCreate, UserOut, Token
+from schemas.user import UserCreate, UserOut, Token, RefreshRequest
 from models.user import User
 from database import get_db
 from services.auth import (
-    get_password_hash,
-    verify_password,
+    get_password_hash_async,
+    verify_password_async,
     create_access_token,
     ACCESS_TOKEN_EXPIRE_MINUTES
 )
+from services.refresh_tokens import issue_refresh_token, rotate_refresh_token, revoke_refresh_token
 
 router = APIRouter( tags=["auth"])
 
@@ -19,12 +21,12 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")  # 👈 Required fo
 
 # ✅ Register endpoint (no changes)
 @router.post("/register", response_model=UserOut, status_code=status.HTTP_201_CREATED)
-async def register_user(user: UserCreate, db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.email == user.email).first()
+async def register_user(user: UserCreate, db: AsyncSession = Depends(get_db)):
+    db_user = await db.scalar(select(User).where(User.email == user.email))
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash_async(user.password)
     db_user = User(
         email=user.email,
         name=user.name,
@@ -34,27 +36,48 @@ async def register_user(user: UserCreate, db: Session = Depends(get_db)):
         longitude=user.longitude,
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
 # ✅ Login endpoint using OAuth2PasswordRequestForm (enables Swagger popup)
 @router.post("/login", response_model=Token)
 async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    user = db.query(User).filter(User.email == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.password):
+    user = await db.scalar(select(User).where(User.email == form_data.username))
+    if not user or not await verify_password_async(form_data.password, user.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # The only bcrypt check of the session: afterwards the app renews through /auth/refresh
+    refresh_token, session_id = issue_refresh_token(db, user.id)
+    await db.commit()
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.email},
+        data={"sub": user.email, "sid": session_id},
         expires_delta=access_token_expires
     )
-    return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+# Swap a refresh token for a new access token + refresh token (rotation, no bcrypt).
+# Each refresh token works once; keep the new one from the response. Retrying a
+# refresh whose response was lost (within REFRESH_REUSE_GRACE_SECONDS) is safe.
+@router.post("/refresh", response_model=Token)
+async def refresh_access_token(body: RefreshRequest, db: AsyncSession = Depends(get_db)):
+    user, refresh_token, session_id = await rotate_refresh_token(db, body.refresh_token)
+    access_token = create_access_token(
+        data={"sub": user.email, "sid": session_id},
+        expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+# Ends the session: its refresh tokens and the access tokens issued from them stop working
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(body: RefreshRequest, db: AsyncSession = Depends(get_db)):
+    await revoke_refresh_token(db, body.refresh_token)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
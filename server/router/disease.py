@@ -1,34 +1,33 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from gradio_client import Client, handle_file
-import shutil
-import uuid
-import os
+from fastapi import APIRouter, UploadFile, File, HTTPException, Response
+import asyncio
+
+from services.images import read_upload_limited
+from services.prediction import prediction_service, PredictionBusy
+from services.prediction_cache import prediction_cache
 
 router = APIRouter(prefix="/predict", tags=["Prediction"])
 
 @router.post("/disease")
-async def predict_disease(file: UploadFile = File(...)):
-    try:
-        # Create a unique filename in a temp folder
-        temp_dir = "temp_uploads"
-        os.makedirs(temp_dir, exist_ok=True)
-        temp_path = os.path.join(temp_dir, f"{uuid.uuid4()}_{file.filename}")
+async def predict_disease(response: Response, file: UploadFile = File(...)):
+    # The image stays in memory (bounded like machinery photos); the long-lived
+    # prediction service batches it
+    image = await read_upload_limited(file)
+    if not image:
+        raise HTTPException(status_code=400, detail="Empty image upload")
 
-        # Save the uploaded file
-        with open(temp_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-
-        # Call the Hugging Face model
-        client = Client("biswa000/rice")
-        result = client.predict(
-            img=handle_file(temp_path),
-            api_name="/predict"
+    try:
+        # Identical (or near-identical) photos reuse a cached or in-flight inference
+        result, outcome = await prediction_cache.get_or_compute(image, prediction_service.predict)
+    except PredictionBusy:
+        raise HTTPException(
+            status_code=503,
+            detail="Prediction service is busy, please try again",
+            headers={"Retry-After": "5"},
         )
-
-        # Clean up temp file
-        os.remove(temp_path)
-
-        return {"prediction": result}
-    
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Prediction timed out")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
+
+    response.headers["X-Prediction-Cache"] = outcome
+    return {"prediction": result}
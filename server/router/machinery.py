@@ -1,11 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File,Form 
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, UploadFile, File,Form, Request, Query
+from sqlalchemy import select, case
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
 from typing import List,Optional
-import os
-import uuid
-from PIL import Image
-import io
 from datetime import datetime, timezone
 from models.notification import Notification
 
@@ -15,32 +12,32 @@ from schemas.machinery import (
     BookingCreate,
     BookingOut,
     DeliveryType,
-    
+    MachineryAvailability,
     
 )
 from schemas.machinery import MachineryUpdate
 from models.machinery import Machinery, Booking
-from database import get_db
+from database import get_db, get_read_db
 from services.auth import get_current_user
 from models.user import User
-from math import radians, cos, sin, asin, sqrt
-from fastapi import Depends
-from services.auth import get_current_user
-# Define haversine function here
-def haversine(lat1, lon1, lat2, lon2):
-    R = 6371  # Radius of earth in km
-    dlat = radians(lat2 - lat1)
-    dlon = radians(lon2 - lon1)
-    a = sin(dlat / 2)**2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon / 2)**2
-    c = 2 * asin(sqrt(a))
-    distance = R * c
-    return distance
+from services.images import read_upload_limited, process_machinery_image
+from services.list_cache import list_cache
+from services.booking import create_booking, as_naive_utc
+from services import availability
+from services.fanout import notify_nearby_users
+from services.serialization import Projection
+from services.name_search import name_index, top_candidates
+from services.snapshot import machinery_snapshot
 
 router = APIRouter(prefix="/machinery", tags=["machinery"])
 
-# Image upload directory setup
-MACHINERY_IMAGES_DIR = "static/machinery_images"
-os.makedirs(MACHINERY_IMAGES_DIR, exist_ok=True)
+# Column projection + orjson for the list endpoint (no ORM objects, no per-row validation)
+MACHINERY_ROWS = Projection(MachineryOut, Machinery)
+
+AVAILABILITY_MAX_DAYS = availability.AVAILABILITY_MAX_DAYS
+AVAILABILITY_MAX_MACHINES = 500
+# Ids per name-search lookup; well under SQLite's bound-variable limit
+NAME_LOOKUP_CHUNK = 500
 
   
 @router.post("/", response_model=MachineryOut)
@@ -57,23 +54,20 @@ async def create_machinery(
     delivery_available: bool = Form(False),
     delivery_charge: Optional[float] = Form(None),
     image: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    background_tasks: BackgroundTasks = None,
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     # Use current_user for owner info
     owner_name = current_user.name
     owner_phone = current_user.phone
 
-    # Save image with error handling
+    # Size-capped read, then decode + resize in the image process pool (off the event loop)
+    contents = await read_upload_limited(image)
     try:
-        contents = await image.read()
-        img = Image.open(io.BytesIO(contents))
-        img.thumbnail((800, 800))
-        file_ext = image.filename.split('.')[-1].lower()
-        save_format = "JPEG" if file_ext in ['jpg', 'jpeg'] else "PNG"
-        filename = f"{uuid.uuid4()}.{file_ext}"
-        filepath = os.path.join(MACHINERY_IMAGES_DIR, filename)
-        img.save(filepath, save_format)
+        variants = await process_machinery_image(contents)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Image processing error: {str(e)}")
 
@@ -85,15 +79,30 @@ async def create_machinery(
         longitude=longitude,
         owner_name=owner_name,
         owner_phone=owner_phone,
-        image_url=f"/{MACHINERY_IMAGES_DIR}/{filename}",
+        image_url=variants["detail"]["jpeg"],
+        thumbnail_url=variants["thumb"]["jpeg"],
+        image_variants=variants,
         available_from=available_from,
         available_to=available_to,
         delivery_available=delivery_available,
         delivery_charge=delivery_charge
     )
     db.add(machinery)
-    db.commit()
-    db.refresh(machinery)
+    await db.commit()
+    await db.refresh(machinery)
+    name_index.upsert(machinery.id, machinery.name, machinery.row_version)
+    machinery_snapshot.upsert(machinery)
+
+    # Notify nearby farmers after the response has been sent
+    background_tasks.add_task(
+        notify_nearby_users,
+        machinery.id,
+        machinery.name,
+        machinery.price_per_hour,
+        machinery.latitude,
+        machinery.longitude,
+        owner_id=current_user.id,
+    )
     return machinery
 
 
@@ -101,95 +110,226 @@ async def create_machinery(
 
 @router.get("/", response_model=List[MachineryOut])
 async def get_machinery(
-    machine_name:str,
+    machine_name: Optional[str] = None,  # fuzzy: typos, transliterations, prefix of the last word
     latitude: Optional[float] = None,
     longitude: Optional[float] = None,
     max_distance: int = 20,  # Default 20km radius
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
-    db: Session = Depends(get_db)
+    delivery: Optional[bool] = None,
+    available_at: Optional[datetime] = None,
+    sort: str = Query("distance", pattern="^(distance|score)$", description="'score' blends distance and price"),
+    skip: int = 0,
+    limit: int = 100,
+    request: Request = None,
+    db: AsyncSession = Depends(get_read_db)
 ):
-    query = db.query(Machinery).filter(Machinery.is_available == True)
+    async def build():
+        name_scores = None
+        if machine_name and machine_name.strip():
+            await name_index.ensure_fresh(db)
+            name_scores = name_index.search(machine_name)
+            if not name_scores:
+                return b"[]", {}
+        machines = await search_machinery(
+            db, latitude, longitude, max_distance, min_price, max_price, skip, limit, name_scores,
+            delivery=delivery, available_at=available_at, sort=sort,
+        )
+        return MACHINERY_ROWS.dump(machines), {}
+
+    # Cached per listings version; If-None-Match with the current ETag gets a 304
+    return await list_cache.respond(request, db, "machinery", build)
+
+
+async def search_machinery(db, latitude, longitude, max_distance, min_price, max_price, skip, limit, name_scores=None,
+                           delivery=None, available_at=None, sort="distance"):
+    """`name_scores` ({id: relevance} from the name index) restricts the search to those ids."""
+    if available_at is not None:
+        available_at = as_naive_utc(available_at)
+
+    if latitude is not None and longitude is not None:
+        # Ranked in memory by the columnar snapshot, then one primary-key lookup for the page
+        await machinery_snapshot.ensure_fresh(db)
+        ranked = machinery_snapshot.search(
+            latitude, longitude, max_distance, min_price, max_price, delivery, available_at,
+            candidate_ids=name_scores, sort=sort, k=skip + limit,
+        )[skip:]
+        if not ranked:
+            return []
+        rows = (await db.execute(
+            MACHINERY_ROWS.select().where(Machinery.id.in_([machinery_id for machinery_id, _ in ranked]))
+        )).all()
+        by_id = {row.id: row for row in rows if row.is_available}
+        return [by_id[machinery_id] for machinery_id, _ in ranked if machinery_id in by_id]
+
+    query = MACHINERY_ROWS.select().where(Machinery.is_available == True)
 
     if min_price:
-        query = query.filter(Machinery.price_per_hour >= min_price)
+        query = query.where(Machinery.price_per_hour >= min_price)
 
     if max_price:
-        query = query.filter(Machinery.price_per_hour <= max_price)
+        query = query.where(Machinery.price_per_hour <= max_price)
 
-    all_machines = query.all()
+    if delivery is not None:
+        query = query.where(Machinery.delivery_available == delivery)
 
-    if latitude is not None and longitude is not None:
-        # Filter by Haversine distance
-        filtered = []
-        for machine in all_machines:
-            if machine.latitude is not None and machine.longitude is not None:
-                dist = haversine(latitude, longitude, machine.latitude, machine.longitude)
-                if dist <= max_distance:
-                    filtered.append(machine)
-        return filtered
+    if available_at is not None:
+        query = query.where(Machinery.available_from <= available_at, Machinery.available_to > available_at)
 
-    return all_machines
+    if name_scores is not None:
+        # Best match first: the index ranks the candidates, SQL applies the filters
+        # a chunk at a time, stopping once the page is full
+        wanted = skip + limit
+        ranked = top_candidates(name_scores)
+        matches = []
+        for start in range(0, len(ranked), NAME_LOOKUP_CHUNK):
+            chunk = ranked[start:start + NAME_LOOKUP_CHUNK]
+            by_id = {row.id: row for row in (await db.execute(query.where(Machinery.id.in_(chunk)))).all()}
+            matches.extend(by_id[machinery_id] for machinery_id in chunk if machinery_id in by_id)
+            if len(matches) >= wanted:
+                break
+        return matches[skip:wanted]
+
+    return (await db.execute(query.order_by(Machinery.id).offset(skip).limit(limit))).all()
+
+
+# Search-as-you-type: listing names matching what's been typed so far
+@router.get("/suggest", response_model=List[str])
+async def suggest_machinery_names(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_read_db)
+):
+    await name_index.ensure_fresh(db)
+    return name_index.suggest(q, limit)
 
 # booking machinery
 
 @router.post("/book", response_model=BookingOut)
 async def book_machinery(
     booking: BookingCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    # Debug print to check what machinery is being queried
-    print(f"Looking for machinery with ID: {booking.machinery_id} and is_available=True")
+    if booking.user_phone is not None and booking.user_phone != current_user.phone:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Bookings can only be made for your own phone number"
+        )
+    new_booking, machinery = await create_booking(
+        db,
+        booking.machinery_id,
+        current_user.phone,
+        booking.start_time,
+        booking.end_time,
+        booking.delivery_type,
+    )
+    availability.record_booking(new_booking.machinery_id, new_booking.start_time, new_booking.end_time)
 
-    machinery = db.query(Machinery).filter(
-        Machinery.id == booking.machinery_id,
-        Machinery.is_available == True
-    ).first()
-    
-    print(f"Queried machinery: {machinery}")  # This should show None or Machinery object
+    return {
+        "id": new_booking.id,
+        "machinery_id": new_booking.machinery_id,
+        "user_phone": new_booking.user_phone,
+        "start_time": new_booking.start_time,
+        "end_time": new_booking.end_time,
+        "delivery_type": new_booking.delivery_type,
+        "total_price": new_booking.total_price,
+        "machinery_name": machinery.name,
+        "latitude": machinery.latitude,
+        "longitude": machinery.longitude,
+        "owner_name": machinery.owner_name,
+        "owner_phone": machinery.owner_phone,
+        "price_per_hour": machinery.price_per_hour,
+        "delivery_charge": machinery.delivery_charge if new_booking.delivery_type == DeliveryType.OWNER_DELIVERY else None
+    }
 
-    if not machinery:
+# 📅 Free/busy calendar for many machines at once
+@router.get("/availability", response_model=List[MachineryAvailability])
+async def get_availability(
+    start: datetime,
+    end: datetime,
+    machinery_ids: Optional[List[int]] = Query(None),
+    latitude: Optional[float] = None,
+    longitude: Optional[float] = None,
+    max_distance: int = 20,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Hourly free/busy slots between start and end, for the given machinery_ids
+    or for every available machine within max_distance km of latitude/longitude.
+    """
+    start, end = as_naive_utc(start), as_naive_utc(end)
+    if end <= start or end - start > timedelta(days=AVAILABILITY_MAX_DAYS):
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Machinery not found or not available"
+            status_code=400,
+            detail=f"end must be after start and at most {AVAILABILITY_MAX_DAYS} days later"
         )
-    
-    # Optional: check booking times fall within machinery availability
-    if booking.start_time < machinery.available_from or booking.end_time > machinery.available_to:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Booking time is outside machinery availability window"
+
+    if not machinery_ids:
+        if latitude is None or longitude is None:
+            raise HTTPException(status_code=400, detail="Pass machinery_ids or latitude/longitude")
+        nearby = await search_machinery(
+            db, latitude, longitude, max_distance, None, None, 0, AVAILABILITY_MAX_MACHINES
         )
-    
-    # ... rest of your booking logic
+        machinery_ids = [machine.id for machine in nearby]
+    machinery_ids = machinery_ids[:AVAILABILITY_MAX_MACHINES]
+
+    first_hour, last_hour = availability.hour_floor(start), availability.hour_ceil(end)
+    calendars = await availability.load_calendars(db, machinery_ids, first_hour, last_hour)
+
+    result = []
+    for machinery_id in machinery_ids:
+        calendar = calendars.get(machinery_id)
+        if calendar is None:
+            continue
+        free, busy = calendar.window(first_hour, last_hour)
+        result.append({
+            "machinery_id": machinery_id,
+            "free": availability.slots(free, first_hour),
+            "busy": availability.slots(busy, first_hour),
+        })
+    return result
 
 @router.get("/bookings", response_model=List[BookingOut])
 async def get_user_bookings(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
-    bookings = db.query(Booking).filter(
-        Booking.user_phone == current_user.phone
-    ).join(Machinery).all()
-    
-    return [{
-        **booking.__dict__,
-        "machinery_name": booking.machinery.name,
-        "owner_name": booking.machinery.owner_name,
-        "owner_phone": booking.machinery.owner_phone,
-        "price_per_hour": booking.machinery.price_per_hour,
-        "delivery_charge": booking.machinery.delivery_charge if booking.delivery_type == DeliveryType.OWNER_DELIVERY else None
-    } for booking in bookings]
+    # One projected SELECT ... JOIN returning plain rows: no ORM hydration, no lazy loads
+    rows = await db.execute(
+        select(
+            Booking.id,
+            Booking.machinery_id,
+            Booking.user_phone,
+            Booking.start_time,
+            Booking.end_time,
+            Booking.delivery_type,
+            Booking.total_price,
+            Machinery.name.label("machinery_name"),
+            Machinery.latitude,
+            Machinery.longitude,
+            Machinery.owner_name,
+            Machinery.owner_phone,
+            Machinery.price_per_hour,
+            case(
+                (Booking.delivery_type == DeliveryType.OWNER_DELIVERY, Machinery.delivery_charge),
+                else_=None,
+            ).label("delivery_charge"),
+        )
+        .join(Machinery, Booking.machinery_id == Machinery.id)
+        .where(Booking.user_phone == current_user.phone)
+        .order_by(Booking.start_time.desc())
+    )
+    return rows.mappings().all()
 
 # 🛠️ Update machinery
 @router.put("/update/{machinery_id}")
 async def update_machinery(
     machinery_id: int,
     updates: MachineryUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    machinery = db.query(Machinery).filter(Machinery.id == machinery_id).first()
+    machinery = await db.scalar(select(Machinery).where(Machinery.id == machinery_id))
     
     if not machinery:
         raise HTTPException(status_code=404, detail="Machinery not found")
@@ -199,20 +339,23 @@ async def update_machinery(
     for key, value in update_data.items():
         setattr(machinery, key, value)
 
-    db.commit()
-    db.refresh(machinery)
+    await db.commit()
+    await db.refresh(machinery)
+    availability.invalidate(machinery_id)
+    name_index.upsert(machinery.id, machinery.name, machinery.row_version)
+    machinery_snapshot.upsert(machinery)
 
     return machinery
 
 
 # ❌ Delete machinery
 @router.delete("/delete/{machinery_id}")
-def delete_machinery(
+async def delete_machinery(
     machinery_id: int,
     owner_phone: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    machinery = db.query(Machinery).filter(Machinery.id == machinery_id).first()
+    machinery = await db.scalar(select(Machinery).where(Machinery.id == machinery_id))
 
     if not machinery:
         raise HTTPException(status_code=404, detail="Machinery not found")
@@ -220,7 +363,11 @@ def delete_machinery(
     if machinery.owner_phone != owner_phone:
         raise HTTPException(status_code=403, detail="Unauthorized to delete this machinery")
 
-    db.delete(machinery)
-    db.commit()
+    await db.delete(machinery)
+    await db.commit()
+    availability.invalidate(machinery_id)
+    # The deleted object carries its tombstone's version (models/sync.stamp_versions)
+    name_index.remove(machinery_id, machinery.row_version)
+    machinery_snapshot.remove(machinery_id, machinery.row_version)
 
     return {"message": "Machinery deleted successfully"}
\ No newline at end of file
@@ -0,0 +1,73 @@
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import FileResponse
+from email.utils import formatdate, parsedate_to_datetime
+import os
+import re
+
+from services.images import MACHINERY_IMAGES_DIR, CONTENT_HASH_LENGTH
+
+router = APIRouter(tags=["media"])
+
+# <content hash>_<variant>.<ext>, written by services/images.build_derivatives
+CONTENT_HASHED_NAME = re.compile(rf"^[0-9a-f]{{{CONTENT_HASH_LENGTH}}}_[a-z]+\.(jpg|webp)$")
+SAFE_NAME = re.compile(r"^[\w-]+\.[A-Za-z0-9]+$")
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Older uuid-named uploads can be overwritten in place, so only cache them for a day
+LEGACY_CACHE_CONTROL = "public, max-age=86400"
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison is fine for GET/HEAD conditional requests
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag in candidates
+
+
+def _not_modified_since(if_modified_since: str, mtime: float) -> bool:
+    try:
+        since = parsedate_to_datetime(if_modified_since).timestamp()
+    except (TypeError, ValueError):
+        return False
+    return int(mtime) <= since
+
+
+@router.api_route("/static/machinery_images/{filename}", methods=["GET", "HEAD"])
+async def get_machinery_image(filename: str, request: Request):
+    """
+    Serve machinery photos with validators and long-lived caching.
+    Content-hashed derivatives are immutable; Range and If-Range are handled by
+    FileResponse, which also uses zero-copy pathsend when the server supports it.
+    """
+    if not SAFE_NAME.match(filename):
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    path = os.path.join(MACHINERY_IMAGES_DIR, filename)
+    try:
+        stat_result = os.stat(path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    if CONTENT_HASHED_NAME.match(filename):
+        etag = f'"{filename.rsplit(".", 1)[0]}"'
+        cache_control = IMMUTABLE_CACHE_CONTROL
+    else:
+        etag = f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+        cache_control = LEGACY_CACHE_CONTROL
+
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(stat_result.st_mtime, usegmt=True),
+        "Cache-Control": cache_control,
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_none_match is not None:
+        if _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+    elif if_modified_since is not None and _not_modified_since(if_modified_since, stat_result.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    return FileResponse(path, headers=headers, stat_result=stat_result)
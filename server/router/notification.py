@@ -1,18 +1,135 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from typing import List
-from database import get_db
+import asyncio
+import orjson
+from fastapi import APIRouter, Depends, Header, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from database import get_read_db, read_router
 from services.auth import get_current_user
+from services.notifications import notification_hub
+from services.serialization import Projection
 from models.notification import Notification
-from schemas.notification import NotificationOut
+from schemas.notification import NotificationOut, UnreadCount
 from models.user import User  # import User here
 
+# Comment line sent on idle streams so proxies don't time them out
+STREAM_KEEPALIVE_SECONDS = 15
+REPLAY_BATCH = 200
+NOTIFICATION_ROWS = Projection(NotificationOut, Notification)
+
 router = APIRouter()
 
+# Newest first, keyset paginated: pass the X-Next-Cursor header value back as ?before=
+# (ids grow with created_at, so the id alone is a stable cursor)
 @router.get("/notifications", response_model=List[NotificationOut])
 async def get_notifications(
-    db: Session = Depends(get_db),
+    before: Optional[int] = None,
+    unread_only: bool = False,
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    query = NOTIFICATION_ROWS.select().where(Notification.user_id == current_user.id)
+    if unread_only:
+        query = query.where(Notification.is_read.is_(False))
+    if before is not None:
+        query = query.where(Notification.id < before)
+    notifications = (await db.execute(query.order_by(Notification.id.desc()).limit(limit))).all()
+    headers = {}
+    if len(notifications) == limit:
+        headers["X-Next-Cursor"] = str(notifications[-1].id)
+    return Response(content=NOTIFICATION_ROWS.dump(notifications), media_type="application/json", headers=headers)
+
+
+@router.get("/notifications/unread-count", response_model=UnreadCount)
+async def get_unread_count(
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    unread = await db.scalar(
+        select(func.count())
+        .select_from(Notification)
+        .where(Notification.user_id == current_user.id, Notification.is_read.is_(False))
+    )
+    return {"unread": unread}
+
+
+def sse_event(notification_id: int, data: str) -> str:
+    return f"id: {notification_id}\nevent: notification\ndata: {data}\n\n"
+
+
+async def replay(sessions, user_id: int, after_id: int):
+    """Committed notifications newer than after_id, oldest first."""
+    # Own session: the request-scoped one is closed before the body is streamed
+    async with sessions() as session:
+        while True:
+            rows = (await session.execute(
+                NOTIFICATION_ROWS.select()
+                .where(Notification.user_id == user_id, Notification.id > after_id)
+                .order_by(Notification.id)
+                .limit(REPLAY_BATCH)
+            )).all()
+            for row, data in zip(rows, NOTIFICATION_ROWS.as_dicts(rows)):
+                after_id = row.id
+                yield row.id, orjson.dumps(data).decode()
+            if len(rows) < REPLAY_BATCH:
+                return
+
+
+async def notification_stream(sessions, user_id: int, last_id: Optional[int]):
+    """
+    `sessions` is the read session factory the request was routed to. Live
+    events come from the hub; only replays read it, so on a lagging replica a
+    replay can miss the newest rows (at most REPLICA_MAX_LAG_SECONDS old).
+    Those stay in the feed, GET /notifications.
+    """
+    # Subscribe before reading the table so nothing committed in between is missed
+    subscription = notification_hub.subscribe(user_id)
+    try:
+        if last_id is None:
+            async with sessions() as session:
+                last_id = await session.scalar(
+                    select(func.coalesce(func.max(Notification.id), 0)).where(Notification.user_id == user_id)
+                )
+            catch_up = False
+        else:
+            catch_up = True
+
+        while True:
+            if catch_up or subscription.lagged:
+                # Resume, or the queue overflowed: the table is the source of truth
+                subscription.reset()
+                async for notification_id, data in replay(sessions, user_id, last_id):
+                    last_id = notification_id
+                    yield sse_event(notification_id, data)
+                catch_up = False
+
+            try:
+                notification_id, data = await asyncio.wait_for(subscription.get(), STREAM_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if notification_id <= last_id:
+                continue  # already sent during a replay
+            last_id = notification_id
+            yield sse_event(notification_id, data)
+    finally:
+        notification_hub.unsubscribe(subscription)
+
+
+# Server-Sent Events push channel. Reconnecting clients send Last-Event-ID
+# (or ?last_id=) and get everything they missed before live events resume.
+@router.get("/notifications/stream")
+async def stream_notifications(
+    request: Request,
+    last_id: Optional[int] = None,
+    last_event_id: Optional[int] = Header(None),
     current_user: User = Depends(get_current_user)
 ):
-    notifications = db.query(Notification).filter(Notification.user_id == current_user.id).order_by(Notification.created_at.desc()).all()
-    return notifications
+    resume_from = last_event_id if last_event_id is not None else last_id
+    return StreamingResponse(
+        notification_stream(read_router.session_factory(request), current_user.id, resume_from),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,38 @@
+import orjson
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from typing import List, Optional
+from services.profiling import has_profile_token, profile_store
+
+router = APIRouter(prefix="/admin/profiles", tags=["profiling"])
+
+
+def require_profile_token(x_profile_token: Optional[str] = Header(None)):
+    if not has_profile_token(x_profile_token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="A valid X-Profile-Token is required")
+
+
+# Captured request profiles, newest first
+@router.get("", response_model=List[dict], dependencies=[Depends(require_profile_token)])
+def list_profiles(limit: int = Query(100, ge=1, le=1000)):
+    return profile_store.list(limit)
+
+
+# Download one: speedscope JSON (open at speedscope.app) or collapsed stacks
+# (flamegraph.pl, inferno, speedscope)
+@router.get("/{profile_id}", dependencies=[Depends(require_profile_token)])
+def download_profile(
+    profile_id: str,
+    format: str = Query("speedscope", pattern="^(speedscope|collapsed)$"),
+):
+    try:
+        if format == "collapsed":
+            body, media_type, suffix = profile_store.collapsed(profile_id), "text/plain", "folded"
+        else:
+            body, media_type, suffix = orjson.dumps(profile_store.speedscope(profile_id)), "application/json", "speedscope.json"
+    except (KeyError, FileNotFoundError):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return Response(
+        content=body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{profile_id}.{suffix}"'},
+    )
@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_read_db
+from services.auth import get_current_user
+from services.sync import collect_changes, negotiate, encode, available_encodings, parse_token
+from schemas.sync import SyncDelta
+from models.user import User
+
+router = APIRouter(tags=["Sync"])
+
+
+# Delta sync for offline clients: everything created, updated or deleted since
+# `since` (omit it for a full download), in chunks of at most `limit` changes.
+# Apply the chunk, store its `token`, and call again with since=token while
+# `more` is true; after a dropped connection, repeat with the last stored token.
+# Send Accept: application/msgpack or application/cbor for a compact encoding,
+# and Accept-Encoding: gzip to have it compressed.
+@router.get("/sync", response_model=SyncDelta)
+async def sync(
+    request: Request,
+    since: str = Query("0", description="Token from the previous response"),
+    limit: int = Query(500, ge=1, le=5000),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    versions = parse_token(since)
+    if versions is None:
+        raise HTTPException(status_code=400, detail="Invalid sync token")
+    media_type = negotiate(request.headers.get("accept", ""))
+    if media_type is None:
+        raise HTTPException(status_code=406, detail=f"Supported encodings: {', '.join(available_encodings())}")
+
+    payload = await collect_changes(db, current_user.id, versions, limit)
+    body, headers = encode(payload, media_type, request.headers.get("accept-encoding", ""))
+    return Response(content=body, media_type=media_type, headers=headers)
@@ -1,6 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 from typing import Optional
 
@@ -8,23 +9,28 @@ from schemas.user import UserBase, UserCreate, UserOut, Token, TokenData
 from models.user import User
 from database import get_db
 from services.auth import (
-    get_password_hash,
-    verify_password,
+    get_password_hash_async,
+    verify_password_async,
     create_access_token,
-    get_current_active_user
+    get_current_active_user,
+    current_session_id,
+    invalidate_user
 )
+from services.refresh_tokens import revoke_user_sessions
+from services.serialization import Projection
 
 router = APIRouter(prefix="/users", tags=["users"])
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
+USER_ROWS = Projection(UserOut, User)
 
 # User Registration Endpoint
 @router.post("/register", response_model=UserOut, status_code=status.HTTP_201_CREATED)
-async def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register_user(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     """
     Register a new user with email, name, password, and optional location
     """
     # Check if email already exists
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
+    existing_user = await db.scalar(select(User).where(User.email == user_data.email))
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -32,7 +38,7 @@ async def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
         )
 
     # Hash password and create user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash_async(user_data.password)
     new_user = User(
         email=user_data.email,
         name=user_data.name,
@@ -47,8 +53,8 @@ async def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
     )
 
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
 
     return new_user
 
@@ -71,22 +77,24 @@ async def update_user_profile(
     longitude: Optional[float] = None,
 
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Update user profile information (partial update)
     """
+    user = await db.get(User, current_user.id)
     if name is not None:
-        current_user.name = name
+        user.name = name
     if latitude is not None:
-        current_user.latitude = latitude
+        user.latitude = latitude
     if longitude is not None:
-        current_user.longitude = longitude
+        user.longitude = longitude
 
     
-    db.commit()
-    db.refresh(current_user)
-    return current_user
+    await db.commit()
+    await db.refresh(user)
+    invalidate_user(user.email)
+    return user
 
 # Change Password Endpoint
 @router.post("/change-password", status_code=status.HTTP_204_NO_CONTENT)
@@ -94,36 +102,41 @@ async def change_password(
     current_password: str,
     new_password: str,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    session_id: Optional[str] = Depends(current_session_id),
+    db: AsyncSession = Depends(get_db)
 ):
     """
-    Change user password after verifying current password
+    Change user password after verifying current password.
+    Every other login session is revoked; this one stays signed in.
     """
-    if not verify_password(current_password, current_user.password):
+    user = await db.get(User, current_user.id)
+    if not await verify_password_async(current_password, user.password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Current password is incorrect"
         )
     
-    current_user.password = get_password_hash(new_password)
-    db.commit()
+    user.password = await get_password_hash_async(new_password)
+    await revoke_user_sessions(db, user.id, keep=session_id)
+    await db.commit()
+    invalidate_user(user.email)
 
 # Admin-only: Get All Users
 @router.get("/", response_model=list[UserOut])
 async def get_all_users(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
     Get list of all users (admin only)
     """
-    if not current_user.is_admin:  # Assuming you have an is_admin field
+    if not getattr(current_user, "is_admin", False):  # no is_admin column yet, so nobody qualifies
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only administrators can access this endpoint"
         )
     
-    users = db.query(User).offset(skip).limit(limit).all()
-    return users
\ No newline at end of file
+    users = (await db.execute(USER_ROWS.select().order_by(User.id).offset(skip).limit(limit))).all()
+    return Response(content=USER_ROWS.dump(users), media_type="application/json")
\ No newline at end of file
@@ -1,47 +1,102 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_db, get_read_db
 from models.vegetable import Vegetable
 from schemas.vegetable import VegetableCreate, VegetableOut
-from typing import List
+from typing import List, Optional
+from services.list_cache import list_cache
+from services.serialization import Projection
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+STREAM_CHUNK_ROWS = 500
+VEGETABLE_ROWS = Projection(VegetableOut, Vegetable)
 
 router = APIRouter(prefix="/vegetables", tags=["Vegetables"])
 
 # Create Vegetable
 @router.post("/", response_model=VegetableOut)
-def create_vegetable(data: VegetableCreate, db: Session = Depends(get_db)):
+async def create_vegetable(data: VegetableCreate, db: AsyncSession = Depends(get_db)):
     veg = Vegetable(**data.dict())
     db.add(veg)
-    db.commit()
-    db.refresh(veg)
+    await db.commit()
+    await db.refresh(veg)
     return veg
 
-# Get all Vegetables
+def vegetable_filters(
+    category: Optional[str] = None,
+    min_rate: Optional[float] = None,
+    max_rate: Optional[float] = None,
+    name_prefix: Optional[str] = None,
+    cursor: Optional[int] = None,
+):
+    query = VEGETABLE_ROWS.select()
+    if category is not None:
+        query = query.where(Vegetable.category == category)
+    if min_rate is not None:
+        query = query.where(Vegetable.rate >= min_rate)
+    if max_rate is not None:
+        query = query.where(Vegetable.rate <= max_rate)
+    if name_prefix:
+        query = query.where(Vegetable.veg_name.startswith(name_prefix, autoescape=True))
+    if cursor is not None:
+        query = query.where(Vegetable.id > cursor)
+    return query.order_by(Vegetable.id)
+
+
+async def stream_ndjson(query, bind):
+    # Own session on the database the request was routed to: the request-scoped
+    # one is closed before the body is streamed
+    async with AsyncSession(bind) as session:
+        result = await session.stream(query.execution_options(yield_per=STREAM_CHUNK_ROWS))
+        async for rows in result.partitions():
+            yield VEGETABLE_ROWS.dump_lines(rows)
+
+
+# Get Vegetables (keyset paginated: pass the X-Next-Cursor header value back as ?cursor=)
 @router.get("/", response_model=List[VegetableOut])
-def get_vegetables(db: Session = Depends(get_db)):
-    return db.query(Vegetable).all()
+async def get_vegetables(
+    request: Request,
+    limit: int = Query(100, ge=1, le=1000),
+    format: Optional[str] = Query(None, description="'ndjson' to stream every matching row"),
+    query=Depends(vegetable_filters),
+    db: AsyncSession = Depends(get_read_db),
+):
+    if format == "ndjson" or NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+        return StreamingResponse(stream_ndjson(query, db.bind), media_type=NDJSON_MEDIA_TYPE)
+
+    async def build():
+        vegetables = (await db.execute(query.limit(limit))).all()
+        headers = {}
+        if len(vegetables) == limit:
+            headers["X-Next-Cursor"] = str(vegetables[-1].id)
+        return VEGETABLE_ROWS.dump(vegetables), headers
+
+    # Cached per catalog version; If-None-Match with the current ETag gets a 304
+    return await list_cache.respond(request, db, "vegetables", build)
 
 # ✅ Delete Vegetable by ID
 @router.delete("/{veg_id}")
-def delete_vegetable(veg_id: int, db: Session = Depends(get_db)):
-    veg = db.query(Vegetable).filter(Vegetable.id == veg_id).first()
+async def delete_vegetable(veg_id: int, db: AsyncSession = Depends(get_db)):
+    veg = await db.scalar(select(Vegetable).where(Vegetable.id == veg_id))
     if not veg:
         raise HTTPException(status_code=404, detail="Vegetable not found")
     
-    db.delete(veg)
-    db.commit()
+    await db.delete(veg)
+    await db.commit()
     return {"message": "Vegetable deleted successfully"}
 
 # ✅ Optional: Update Vegetable by ID
 @router.put("/{veg_id}", response_model=VegetableOut)
-def update_vegetable(veg_id: int, data: VegetableCreate, db: Session = Depends(get_db)):
-    veg = db.query(Vegetable).filter(Vegetable.id == veg_id).first()
+async def update_vegetable(veg_id: int, data: VegetableCreate, db: AsyncSession = Depends(get_db)):
+    veg = await db.scalar(select(Vegetable).where(Vegetable.id == veg_id))
     if not veg:
         raise HTTPException(status_code=404, detail="Vegetable not found")
     
     for key, value in data.dict().items():
         setattr(veg, key, value)
 
-    db.commit()
-    db.refresh(veg)
+    await db.commit()
+    await db.refresh(veg)
     return veg
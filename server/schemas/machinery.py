@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, Dict, List
 from datetime import datetime
 from enum import Enum
 
@@ -22,16 +22,16 @@ class MachineryCreate(BaseModel):
 
 
 class MachineryUpdate(BaseModel):
-    name: Optional[str]
-    description: Optional[str]
-    price_per_hour: Optional[float]
-    latitude: Optional[float]
-    longitude: Optional[float]
-    available_from: Optional[datetime]
-    available_to: Optional[datetime]
-    delivery_available: Optional[bool]
-    delivery_charge: Optional[float]
-    is_available: Optional[bool]
+    name: Optional[str] = None
+    description: Optional[str] = None
+    price_per_hour: Optional[float] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    available_from: Optional[datetime] = None
+    available_to: Optional[datetime] = None
+    delivery_available: Optional[bool] = None
+    delivery_charge: Optional[float] = None
+    is_available: Optional[bool] = None
 
 
 class MachineryOut(MachineryCreate):
@@ -39,6 +39,8 @@ class MachineryOut(MachineryCreate):
     owner_name: str
     owner_phone: str
     image_url: Optional[str]
+    thumbnail_url: Optional[str] = None
+    image_variants: Optional[Dict[str, Dict[str, str]]] = None
     is_available: bool = True
 
     class Config:
@@ -47,7 +49,7 @@ class MachineryOut(MachineryCreate):
 
 class BookingCreate(BaseModel):
     machinery_id: int
-    user_phone: str
+    user_phone: Optional[str] = None  # bookings are made for the caller; must match their phone if sent
     start_time: datetime
     end_time: datetime
     delivery_type: DeliveryType
@@ -66,3 +68,14 @@ class BookingOut(BookingCreate):
 
     class Config:
         orm_mode = True
+
+
+class TimeSlot(BaseModel):
+    start: datetime
+    end: datetime
+
+
+class MachineryAvailability(BaseModel):
+    machinery_id: int
+    free: List[TimeSlot]
+    busy: List[TimeSlot]
@@ -11,3 +11,7 @@ class NotificationOut(BaseModel):
     class Config:
      from_attributes = True
 
+
+
+class UnreadCount(BaseModel):
+    unread: int
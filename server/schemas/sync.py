@@ -0,0 +1,21 @@
+from pydantic import BaseModel
+from typing import List
+
+from schemas.machinery import MachineryOut
+from schemas.notification import NotificationOut
+from schemas.vegetable import VegetableOut
+
+
+class SyncDeleted(BaseModel):
+    machinery: List[int]
+    vegetables: List[int]
+    notifications: List[int]
+
+
+class SyncDelta(BaseModel):
+    token: str
+    more: bool
+    machinery: List[MachineryOut]
+    vegetables: List[VegetableOut]
+    notifications: List[NotificationOut]
+    deleted: SyncDeleted
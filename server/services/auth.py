@@ -5,9 +5,12 @@ from passlib.context import CryptContext
 from datetime import datetime, timedelta
 import os
 from dotenv import load_dotenv
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from database import get_db
 from models.user import User  # import your User model
+from services.hashing import run_hash_job
+from services.cache import ExpiringSet, TTLCache
 
 
 SECRET_KEY = os.getenv("SECRET_KEY")
@@ -18,6 +21,20 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Authenticated principals are cached per worker so get_current_user doesn't
+# decode the JWT and SELECT the user on every request. Keep the TTL short:
+# other workers only see profile changes once their entry expires.
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+PRINCIPAL_CACHE_TTL = int(os.getenv("PRINCIPAL_CACHE_TTL", "60"))
+
+token_cache = TTLCache("auth_token", PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL)
+user_cache = TTLCache("auth_user", PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL)
+
+# Denylist of revoked login sessions (refresh-token families, the "sid" claim).
+# An access token can't outlive ACCESS_TOKEN_EXPIRE_MINUTES, so neither does its
+# entry; entries are never evicted before that, however many sessions are revoked.
+revoked_sessions = ExpiringSet("auth_revoked_sessions", ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
  # or "token" depending on your route
@@ -30,33 +47,57 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_current_user(
+async def get_current_user(
     token: str = Depends(oauth2_scheme), 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
+    payload = token_cache.get(token)
+    if payload is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError:
             raise credentials_exception
-    except JWTError:
+        # Never keep a token cached past its own expiry
+        remaining = payload.get("exp", 0) - datetime.utcnow().timestamp()
+        token_cache.set(token, payload, ttl=remaining)
+
+    username: str = payload.get("sub")
+    if username is None:
         raise credentials_exception
-    
-    user = db.query(User).filter(User.email == username).first()
-    if user is None:
+    if payload.get("sid") in revoked_sessions:
         raise credentials_exception
-    
+
+    user = user_cache.get(username)
+    if user is None:
+        user = await db.scalar(select(User).where(User.email == username))
+        if user is None:
+            raise credentials_exception
+        user_cache.set(username, user)
+
+    # NOTE: the user may be a cached, detached instance. Handlers that modify
+    # it must load their own copy from `db` and call invalidate_user() after commit.
     return user
 
-def get_current_active_user(current_user: dict = Depends(get_current_user)):
-    # Optional check for user status; update based on your user model
-    # If you have `disabled` field, use this check:
-    if current_user.get("disabled"):
+def current_session_id(token: str = Depends(oauth2_scheme)):
+    """The request's login session (the "sid" claim); use alongside get_current_user, which validates the token."""
+    payload = token_cache.get(token)
+    if payload is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError:
+            return None
+    return payload.get("sid")
+
+def invalidate_user(email: str):
+    user_cache.pop(email)
+
+def get_current_active_user(current_user: User = Depends(get_current_user)):
+    if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 def verify_password(plain_password: str, hashed_password: str):
@@ -65,3 +106,11 @@ def verify_password(plain_password: str, hashed_password: str):
 def get_password_hash(password: str):
     return pwd_context.hash(password)
 
+# Use these from request handlers: bcrypt runs on the bounded hash pool, not the event loop
+async def verify_password_async(plain_password: str, hashed_password: str):
+    return await run_hash_job("verify", verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str):
+    return await run_hash_job("hash", get_password_hash, password)
+
+
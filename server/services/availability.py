@@ -0,0 +1,177 @@
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from models.machinery import Machinery, Booking
+from services.booking import as_naive_utc
+from services.cache import TTLCache
+
+# Calendars are hourly bitsets (Python ints): bit i == hour EPOCH + i.
+EPOCH = datetime(2020, 1, 1)
+HOUR_SECONDS = 3600
+
+# Longest window GET /machinery/availability accepts. A calendar covers twice
+# that from its base, so its masks stay a few hundred bytes however far ahead
+# a listing is open; a window outside it gets the calendar rebuilt around it.
+AVAILABILITY_MAX_DAYS = 62
+HORIZON_HOURS = 2 * AVAILABILITY_MAX_DAYS * 24
+
+AVAILABILITY_CACHE_SIZE = int(os.getenv("AVAILABILITY_CACHE_SIZE", "20000"))
+# Bookings are caught up on every read (see load_calendars); edits to a machine's
+# availability window made on another worker show up once the entry expires
+AVAILABILITY_CACHE_TTL = int(os.getenv("AVAILABILITY_CACHE_TTL", "300"))
+
+
+def hour_floor(value: datetime) -> int:
+    return int((value - EPOCH).total_seconds() // HOUR_SECONDS)
+
+
+def hour_ceil(value: datetime) -> int:
+    return -int(-(value - EPOCH).total_seconds() // HOUR_SECONDS)
+
+
+def hour_to_datetime(index: int) -> datetime:
+    return EPOCH + timedelta(hours=index)
+
+
+def span_mask(first: int, last: int) -> int:
+    """Bits [first, last) set."""
+    if last <= first:
+        return 0
+    return ((1 << (last - first)) - 1) << first
+
+
+def runs(bits: int):
+    """Yield (start, end) for every run of consecutive set bits."""
+    while bits:
+        start = (bits & -bits).bit_length() - 1
+        shifted = bits >> start
+        length = (~shifted & (shifted + 1)).bit_length() - 1
+        yield start, start + length
+        bits &= ~span_mask(start, start + length)
+
+
+class MachineCalendar:
+    """
+    Open hours come from available_from/available_to (whole hours only),
+    busy hours from bookings (any touched hour). Both cover HORIZON_HOURS
+    from `base` (an hour index), offset by it so masks stay small.
+    `last_booking_id` is the newest booking applied.
+    """
+    __slots__ = ("base", "open_mask", "busy_mask", "last_booking_id")
+
+    def __init__(self, available_from, available_to, is_available=True, base: int = 0):
+        self.base = base
+        if available_from is None or available_to is None or not is_available:
+            self.open_mask = 0
+        else:
+            self.open_mask = self._span(hour_ceil(available_from), hour_floor(available_to))
+        self.busy_mask = 0
+        self.last_booking_id = 0
+
+    def _span(self, first_hour: int, last_hour: int) -> int:
+        return span_mask(max(first_hour - self.base, 0), min(last_hour - self.base, HORIZON_HOURS))
+
+    def covers(self, first_hour: int, last_hour: int) -> bool:
+        return self.base <= first_hour and last_hour <= self.base + HORIZON_HOURS
+
+    def mark_busy(self, start: datetime, end: datetime):
+        self.busy_mask |= self._span(hour_floor(start), hour_ceil(end))
+
+    def window(self, first_hour: int, last_hour: int):
+        """(free, busy) bitsets for [first_hour, last_hour), relative to first_hour."""
+        shift = first_hour - self.base
+        length = last_hour - first_hour
+        window = span_mask(0, length)
+
+        def clip(mask):
+            return (mask >> shift if shift >= 0 else mask << -shift) & window
+
+        open_bits = clip(self.open_mask)
+        busy_bits = clip(self.busy_mask) & open_bits
+        return open_bits & ~busy_bits, busy_bits
+
+
+calendars = TTLCache("availability_calendar", AVAILABILITY_CACHE_SIZE, AVAILABILITY_CACHE_TTL)
+
+
+async def load_calendars(db, machinery_ids, first_hour: int, last_hour: int) -> dict:
+    """
+    Calendars covering [first_hour, last_hour) for the given machines. Missing
+    ones, and cached ones based elsewhere, are built with two batched queries;
+    the rest are caught up with one query for bookings newer than they have
+    seen, so bookings taken by other workers show as busy at once. Booking
+    ids are handed out under the machine's row lock, so a machine's bookings
+    commit in id order; they are applied in that order and marking is
+    idempotent, so a row at or below a calendar's watermark is harmless.
+    """
+    found = {}
+    missing = []
+    for machinery_id in machinery_ids:
+        calendar = calendars.get(machinery_id)
+        if calendar is None or not calendar.covers(first_hour, last_hour):
+            missing.append(machinery_id)
+        else:
+            found[machinery_id] = calendar
+
+    if found:
+        newer = await db.execute(
+            select(Booking.id, Booking.machinery_id, Booking.start_time, Booking.end_time)
+            .where(
+                Booking.machinery_id.in_(list(found)),
+                Booking.id > min(calendar.last_booking_id for calendar in found.values()),
+            )
+            .order_by(Booking.id)
+        )
+        for row in newer:
+            calendar = found[row.machinery_id]
+            calendar.mark_busy(row.start_time, row.end_time)
+            calendar.last_booking_id = max(calendar.last_booking_id, row.id)
+
+    if missing:
+        machines = await db.execute(
+            select(Machinery.id, Machinery.available_from, Machinery.available_to, Machinery.is_available)
+            .where(Machinery.id.in_(missing))
+        )
+        built = {
+            row.id: MachineCalendar(row.available_from, row.available_to, row.is_available, base=first_hour)
+            for row in machines
+        }
+        if built:
+            # Every booking id, so the watermark is right, but only in-horizon ones are marked
+            bookings = await db.execute(
+                select(Booking.id, Booking.machinery_id, Booking.start_time, Booking.end_time)
+                .where(Booking.machinery_id.in_(list(built)))
+            )
+            for row in bookings:
+                calendar = built[row.machinery_id]
+                calendar.mark_busy(row.start_time, row.end_time)
+                calendar.last_booking_id = max(calendar.last_booking_id, row.id)
+        for machinery_id, calendar in built.items():
+            calendars.set(machinery_id, calendar)
+        found.update(built)
+
+    return found
+
+
+def record_booking(machinery_id: int, start: datetime, end: datetime):
+    """
+    Incrementally mark a new booking on an already-built calendar. The
+    booking is re-applied by the next catch-up query; last_booking_id isn't
+    moved, since another worker may still commit a lower id.
+    """
+    calendar = calendars.get(machinery_id)
+    if calendar is not None:
+        calendar.mark_busy(as_naive_utc(start), as_naive_utc(end))
+
+
+def invalidate(machinery_id: int):
+    calendars.pop(machinery_id)
+
+
+def slots(bits: int, first_hour: int):
+    return [
+        {"start": hour_to_datetime(first_hour + start), "end": hour_to_datetime(first_hour + end)}
+        for start, end in runs(bits)
+    ]
@@ -0,0 +1,158 @@
+import asyncio
+import os
+import weakref
+from bisect import bisect_left, insort
+from datetime import datetime, timezone
+
+from fastapi import HTTPException, status
+from sqlalchemy import select
+
+from models.machinery import Machinery, Booking, DeliveryType
+from services.cache import TTLCache
+
+# How many recently-booked machines keep their upcoming bookings in memory
+BOOKING_INTERVAL_CACHE_SIZE = int(os.getenv("BOOKING_INTERVAL_CACHE_SIZE", "1000"))
+BOOKING_INTERVAL_CACHE_TTL = int(os.getenv("BOOKING_INTERVAL_CACHE_TTL", "300"))
+
+
+class IntervalSet:
+    """Sorted, non-overlapping [start, end) intervals with O(log n) overlap checks."""
+
+    def __init__(self, intervals=()):
+        self._intervals = sorted(intervals)
+
+    def overlaps(self, start, end) -> bool:
+        # First interval starting at/after `end` can't overlap; only its predecessor can
+        i = bisect_left(self._intervals, (end,))
+        return i > 0 and self._intervals[i - 1][1] > start
+
+    def add(self, start, end):
+        insort(self._intervals, (start, end))
+
+    def __iter__(self):
+        return iter(self._intervals)
+
+    def __len__(self):
+        return len(self._intervals)
+
+
+# machinery_id -> IntervalSet of upcoming bookings. Only ever used to reject
+# early: a miss here is always confirmed against the database.
+booking_intervals = TTLCache("booking_intervals", BOOKING_INTERVAL_CACHE_SIZE, BOOKING_INTERVAL_CACHE_TTL)
+
+# Serializes bookings for the same machine within this worker (SQLite has no
+# SELECT ... FOR UPDATE); the row lock does the same across workers on MySQL.
+_machine_locks = weakref.WeakValueDictionary()
+
+
+def _machine_lock(machinery_id: int) -> asyncio.Lock:
+    lock = _machine_locks.get(machinery_id)
+    if lock is None:
+        lock = _machine_locks[machinery_id] = asyncio.Lock()
+    return lock
+
+
+def as_naive_utc(value: datetime) -> datetime:
+    """Machinery/booking columns are naive UTC; normalize client-supplied datetimes."""
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def compute_total_price(machinery: Machinery, start: datetime, end: datetime, delivery_type) -> float:
+    hours = (end - start).total_seconds() / 3600
+    total = hours * machinery.price_per_hour
+    if delivery_type == DeliveryType.OWNER_DELIVERY:
+        total += machinery.delivery_charge or 0
+    return round(total, 2)
+
+
+async def _load_intervals(db, machinery_id: int) -> IntervalSet:
+    rows = await db.execute(
+        select(Booking.start_time, Booking.end_time).where(
+            Booking.machinery_id == machinery_id,
+            Booking.end_time > datetime.utcnow(),
+        )
+    )
+    intervals = IntervalSet(tuple(row) for row in rows)
+    booking_intervals.set(machinery_id, intervals)
+    return intervals
+
+
+def _conflict():
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="Machinery is already booked for part of this period",
+    )
+
+
+async def create_booking(db, machinery_id: int, user_phone: str, start: datetime, end: datetime, delivery_type):
+    """
+    Book a machine for [start, end). Returns (booking, machinery).
+    Raises 404 / 400 / 409 HTTPExceptions for unknown machines, bad windows and overlaps.
+    """
+    start, end = as_naive_utc(start), as_naive_utc(end)
+    if end <= start:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="end_time must be after start_time")
+
+    async with _machine_lock(machinery_id):
+        # Row lock on the machine serializes concurrent bookings for it
+        machinery = await db.scalar(
+            select(Machinery)
+            .where(Machinery.id == machinery_id, Machinery.is_available == True)
+            .with_for_update()
+        )
+        if not machinery:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Machinery not found or not available"
+            )
+
+        if start < machinery.available_from or end > machinery.available_to:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Booking time is outside machinery availability window"
+            )
+
+        if delivery_type == DeliveryType.OWNER_DELIVERY and not machinery.delivery_available:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Owner delivery is not offered for this machinery"
+            )
+
+        intervals = booking_intervals.get(machinery_id)
+        if intervals is not None and intervals.overlaps(start, end):
+            await db.rollback()
+            raise _conflict()
+
+        # Authoritative check: index range probe on (machinery_id, start_time, end_time)
+        clash = await db.scalar(
+            select(Booking.id).where(
+                Booking.machinery_id == machinery_id,
+                Booking.start_time < end,
+                Booking.end_time > start,
+            ).limit(1)
+        )
+        if clash is not None:
+            # Another worker booked it; refresh our copy of the machine's bookings
+            await _load_intervals(db, machinery_id)
+            await db.rollback()
+            raise _conflict()
+
+        booking = Booking(
+            machinery_id=machinery_id,
+            user_phone=user_phone,
+            start_time=start,
+            end_time=end,
+            delivery_type=delivery_type,
+            total_price=compute_total_price(machinery, start, end, delivery_type),
+        )
+        db.add(booking)
+        await db.commit()
+
+        if intervals is None:
+            await _load_intervals(db, machinery_id)
+        else:
+            intervals.add(start, end)
+
+    return booking, machinery
@@ -0,0 +1,106 @@
+import threading
+import time
+from collections import OrderedDict
+
+from services.metrics import Counter, Gauge
+
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "In-process cache lookups",
+    ["cache", "result"],
+)
+CACHE_ENTRIES = Gauge("cache_entries", "Entries currently held by an in-process cache", ["cache"])
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Bounded LRU cache whose entries also expire after a TTL.
+    Thread-safe; hits and misses are exported as cache_requests_total{cache=name}.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING and entry[0] <= now:
+                del self._data[key]
+                entry = _MISSING
+            if entry is _MISSING:
+                CACHE_REQUESTS.inc(cache=self.name, result="miss")
+                CACHE_ENTRIES.set(len(self._data), cache=self.name)
+                return default
+            self._data.move_to_end(key)
+        CACHE_REQUESTS.inc(cache=self.name, result="hit")
+        return entry[1]
+
+    def set(self, key, value, ttl: float = None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+            CACHE_ENTRIES.set(len(self._data), cache=self.name)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, _MISSING)
+            CACHE_ENTRIES.set(len(self._data), cache=self.name)
+        return default if entry is _MISSING else entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            CACHE_ENTRIES.set(0, cache=self.name)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+
+class ExpiringSet:
+    """
+    Keys that expire after a TTL and are never evicted before it, unlike
+    TTLCache's LRU bound: for denylists, where dropping an entry early would
+    let something revoked back in. Expired keys are swept on insert, at
+    most once per TTL, so size is bounded by what's added within one TTL.
+    """
+
+    def __init__(self, name: str, ttl: float):
+        self.name = name
+        self.ttl = ttl
+        self._data = {}  # key -> expires_at
+        self._lock = threading.Lock()
+        self._next_sweep = time.monotonic() + ttl
+
+    def add(self, key, ttl: float = None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._data[key] = max(self._data.get(key, 0), now + ttl)
+            if now >= self._next_sweep:
+                self._data = {k: expires for k, expires in self._data.items() if expires > now}
+                self._next_sweep = now + self.ttl
+            CACHE_ENTRIES.set(len(self._data), cache=self.name)
+
+    def __contains__(self, key):
+        expires = self._data.get(key)
+        return expires is not None and expires > time.monotonic()
+
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,132 @@
+import json
+import logging
+import os
+import time
+from datetime import datetime
+
+from sqlalchemy import insert, select
+
+from database import AsyncSessionLocal
+from models.notification import Notification
+from models.sync import reserve_versions
+from models.user import User
+from schemas.notification import NotificationOut
+from services.geo import haversine, bounding_box
+from services.metrics import Counter, Gauge, Histogram
+from services.notifications import notification_hub
+from services.sms import sms_sender
+
+# Farmers within this distance of a new listing are notified
+FANOUT_RADIUS_KM = float(os.getenv("FANOUT_RADIUS_KM", "20"))
+# Rows per executemany INSERT (and per commit)
+FANOUT_BATCH_SIZE = int(os.getenv("FANOUT_BATCH_SIZE", "1000"))
+
+logger = logging.getLogger("smart_krishi.fanout")
+
+FANOUT_JOBS = Counter("fanout_jobs_total", "Notification fan-out jobs by outcome", ["result"])
+FANOUT_IN_PROGRESS = Gauge("fanout_jobs_in_progress", "Fan-out jobs currently running")
+FANOUT_RECIPIENTS = Counter("fanout_notifications_total", "Notifications inserted by fan-out jobs")
+FANOUT_SECONDS = Histogram(
+    "fanout_duration_seconds",
+    "Wall time of one fan-out job",
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0),
+)
+
+
+def new_machinery_message(name: str, price_per_hour: float, distance_km: float) -> str:
+    return f"New {name} available for rent {distance_km:.1f} km from you at Rs {price_per_hour:g}/hour."
+
+
+async def find_nearby_users(session, latitude, longitude, radius_km, exclude_user_id=None):
+    """[(user_id, phone, distance_km)] for active users inside the radius."""
+    min_lat, max_lat, min_lon, max_lon = bounding_box(latitude, longitude, radius_km)
+    query = select(User.id, User.phone, User.latitude, User.longitude).where(
+        User.is_active == True,
+        User.latitude.between(min_lat, max_lat),
+        User.longitude.between(min_lon, max_lon),
+    )
+    if exclude_user_id is not None:
+        query = query.where(User.id != exclude_user_id)
+
+    nearby = []
+    for row in await session.execute(query):
+        distance = haversine(latitude, longitude, row.latitude, row.longitude)
+        if distance <= radius_km:
+            nearby.append((row.id, row.phone, distance))
+    return nearby
+
+
+async def insert_batch(session, batch, name, price_per_hour):
+    """One executemany INSERT for the batch, then read back the ids for the push hub."""
+    messages = {user_id: new_machinery_message(name, price_per_hour, distance) for user_id, _, distance in batch}
+    # Core INSERTs bypass the ORM's version stamping, so reserve the batch's sync
+    # versions here. They also find the new rows again without RETURNING (MySQL has none).
+    connection = await session.connection()
+    last = await connection.run_sync(reserve_versions, Notification.__tablename__, len(messages))
+    first = last - len(messages) + 1
+    now = datetime.utcnow()
+    await session.execute(insert(Notification), [
+        {
+            "user_id": user_id, "message": message, "created_at": now, "is_read": False,
+            "row_version": first + i, "updated_at": now,
+        }
+        for i, (user_id, message) in enumerate(messages.items())
+    ])
+    await session.commit()
+    return list(await session.scalars(
+        select(Notification)
+        .where(Notification.user_id.in_(list(messages)), Notification.row_version.between(first, last))
+        .order_by(Notification.row_version)
+    ))
+
+
+async def notify_nearby_users(
+    machinery_id: int,
+    name: str,
+    price_per_hour: float,
+    latitude: float,
+    longitude: float,
+    owner_id: int = None,
+    radius_km: float = FANOUT_RADIUS_KM,
+    batch_size: int = FANOUT_BATCH_SIZE,
+):
+    """
+    Background job run after a listing is committed: insert a Notification
+    for every farmer nearby, push them to open streams and queue SMS.
+    """
+    started = time.perf_counter()
+    FANOUT_IN_PROGRESS.inc()
+    sent = 0
+    try:
+        async with AsyncSessionLocal() as session:
+            targets = await find_nearby_users(session, latitude, longitude, radius_km, exclude_user_id=owner_id)
+            phones = {user_id: phone for user_id, phone, _ in targets}
+
+            for i in range(0, len(targets), batch_size):
+                notifications = await insert_batch(session, targets[i:i + batch_size], name, price_per_hour)
+                for notification in notifications:
+                    await notification_hub.publish(
+                        notification.user_id,
+                        notification.id,
+                        NotificationOut.model_validate(notification).model_dump_json(),
+                    )
+                    await sms_sender.enqueue(phones[notification.user_id], notification.message)
+                sent += len(notifications)
+                FANOUT_RECIPIENTS.inc(len(notifications))
+    except Exception:
+        FANOUT_JOBS.inc(result="failed")
+        logger.exception("Fan-out for machinery %s failed after %d notifications", machinery_id, sent)
+        return
+    finally:
+        FANOUT_IN_PROGRESS.dec()
+        elapsed = time.perf_counter() - started
+        FANOUT_SECONDS.observe(elapsed)
+
+    FANOUT_JOBS.inc(result="ok")
+    logger.info(json.dumps({
+        "event": "fanout",
+        "machinery_id": machinery_id,
+        "notifications": sent,
+        "duration_ms": round(elapsed * 1000, 2),
+        "per_second": round(sent / elapsed, 1) if elapsed else None,
+    }))
@@ -0,0 +1,38 @@
+from math import radians, degrees, cos, sin, asin, sqrt
+
+EARTH_RADIUS_KM = 6371
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km between two points."""
+    dlat = radians(lat2 - lat1)
+    dlon = radians(lon2 - lon1)
+    a = sin(dlat / 2)**2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon / 2)**2
+    c = 2 * asin(sqrt(a))
+    return EARTH_RADIUS_KM * c
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """
+    Return (min_lat, max_lat, min_lon, max_lon) of a box that fully contains
+    the circle of `radius_km` around the point. Used as an indexable SQL
+    prefilter before the exact haversine check.
+    """
+    angular = radius_km / EARTH_RADIUS_KM
+    lat_delta = degrees(angular)
+    min_lat = latitude - lat_delta
+    max_lat = latitude + lat_delta
+
+    # Near the poles the circle covers every longitude
+    if min_lat <= -90 or max_lat >= 90:
+        return max(min_lat, -90.0), min(max_lat, 90.0), -180.0, 180.0
+
+    lon_delta = degrees(asin(min(1.0, sin(angular) / cos(radians(latitude)))))
+    min_lon = longitude - lon_delta
+    max_lon = longitude + lon_delta
+
+    # Don't bother splitting boxes across the antimeridian
+    if min_lon < -180 or max_lon > 180:
+        return min_lat, max_lat, -180.0, 180.0
+
+    return min_lat, max_lat, min_lon, max_lon
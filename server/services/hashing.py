@@ -0,0 +1,84 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException, status
+
+from services.metrics import Counter, Gauge, Histogram
+
+# bcrypt releases the GIL while hashing, so a thread pool gives real
+# parallelism without pickling overhead of a process pool.
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(os.cpu_count() or 2)))
+# How many hash jobs may wait for a worker before we start shedding load
+HASH_QUEUE_LIMIT = int(os.getenv("HASH_QUEUE_LIMIT", "32"))
+HASH_RETRY_AFTER_SECONDS = int(os.getenv("HASH_RETRY_AFTER_SECONDS", "2"))
+
+HASH_SECONDS = Histogram(
+    "password_hash_seconds",
+    "Time spent inside bcrypt per operation",
+    ["op"],
+)
+HASH_WAIT_SECONDS = Histogram(
+    "password_hash_wait_seconds",
+    "Time a hash job waited for a free worker",
+    ["op"],
+)
+HASH_QUEUE_DEPTH = Gauge("password_hash_queue_depth", "Hash jobs waiting for a worker")
+HASH_IN_FLIGHT = Gauge("password_hash_in_flight", "Hash jobs queued or running")
+HASH_REJECTED = Counter(
+    "password_hash_rejected_total",
+    "Hash jobs rejected because the pool was saturated",
+    ["op"],
+)
+
+_executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="bcrypt")
+_in_flight = 0  # only touched from the event loop thread
+
+
+def _timed(op, fn, args, submitted_at):
+    started = time.perf_counter()
+    HASH_WAIT_SECONDS.observe(started - submitted_at, op=op)
+    try:
+        return fn(*args)
+    finally:
+        HASH_SECONDS.observe(time.perf_counter() - started, op=op)
+
+
+def _update_gauges():
+    HASH_IN_FLIGHT.set(_in_flight)
+    HASH_QUEUE_DEPTH.set(max(0, _in_flight - HASH_WORKERS))
+
+
+async def run_hash_job(op: str, fn, *args):
+    """
+    Run a password hashing function on the bounded bcrypt pool.
+    Raises 503 with Retry-After when too many jobs are already waiting.
+    """
+    global _in_flight
+    if _in_flight >= HASH_WORKERS + HASH_QUEUE_LIMIT:
+        HASH_REJECTED.inc(op=op)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, please try again shortly",
+            headers={"Retry-After": str(HASH_RETRY_AFTER_SECONDS)},
+        )
+
+    _in_flight += 1
+    _update_gauges()
+    loop = asyncio.get_running_loop()
+    try:
+        job = _executor.submit(_timed, op, fn, args, time.perf_counter())
+    except RuntimeError:  # pool shut down
+        _release()
+        raise
+    # Released when bcrypt finishes, not when the caller stops waiting: a
+    # cancelled request (client disconnect) still occupies its worker
+    job.add_done_callback(lambda _: loop.call_soon_threadsafe(_release))
+    return await asyncio.wrap_future(job)
+
+
+def _release():
+    global _in_flight
+    _in_flight -= 1
+    _update_gauges()
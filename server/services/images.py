@@ -0,0 +1,184 @@
+import asyncio
+import hashlib
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from fastapi import HTTPException, UploadFile, status
+from fastapi.responses import JSONResponse
+
+# Image upload directory setup
+MACHINERY_IMAGES_DIR = "static/machinery_images"
+os.makedirs(MACHINERY_IMAGES_DIR, exist_ok=True)
+
+MAX_IMAGE_UPLOAD_BYTES = int(os.getenv("MAX_IMAGE_UPLOAD_BYTES", str(15 * 1024 * 1024)))
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+UPLOAD_CHUNK_SIZE = 64 * 1024
+# Multipart boundaries, part headers and the text fields sent alongside the image
+UPLOAD_FORM_OVERHEAD = 64 * 1024
+# Routes whose request body is an image upload; UploadLimitMiddleware caps their bodies
+UPLOAD_ROUTES = {("POST", "/machinery/"), ("POST", "/predict/disease")}
+
+# Longest edge in px for each derivative. "detail" is what image_url points to.
+DERIVATIVE_SIZES = {
+    "detail": 800,
+    "thumb": 240,
+}
+JPEG_QUALITY = 85
+WEBP_QUALITY = 80
+# Bump whenever sizes/quality change: derivative names must change with their bytes,
+# because clients cache them forever.
+PIPELINE_VERSION = "1"
+CONTENT_HASH_LENGTH = 32  # hex chars of sha256 used in filenames
+
+_pool = None
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=IMAGE_WORKERS)
+    return _pool
+
+
+def shutdown_image_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def content_basename(data: bytes) -> str:
+    digest = hashlib.sha256(f"machinery-v{PIPELINE_VERSION}:".encode())
+    digest.update(data)
+    return digest.hexdigest()[:CONTENT_HASH_LENGTH]
+
+
+def _variant_names(basename: str):
+    for name in DERIVATIVE_SIZES:
+        yield name, f"{basename}_{name}.jpg", f"{basename}_{name}.webp"
+
+
+def _save_atomic(img, path: str, fmt: str, **params):
+    # Write then rename so a concurrent request never serves a half-written file
+    tmp = f"{path}.{os.getpid()}.tmp"
+    img.save(tmp, fmt, **params)
+    os.replace(tmp, path)
+
+
+def build_derivatives(data: bytes, out_dir: str) -> dict:
+    """
+    Decode once and write every derivative as JPEG and WebP, named by the
+    content hash of the upload. Identical uploads reuse the existing files.
+    Runs in a worker process. Returns {name: {"jpeg": url, "webp": url}}.
+    """
+    from PIL import Image, ImageOps  # only the worker processes need Pillow
+
+    basename = content_basename(data)
+    variants = {
+        name: {"jpeg": f"/{out_dir}/{jpeg_name}", "webp": f"/{out_dir}/{webp_name}"}
+        for name, jpeg_name, webp_name in _variant_names(basename)
+    }
+    if all(
+        os.path.exists(os.path.join(out_dir, jpeg_name)) and os.path.exists(os.path.join(out_dir, webp_name))
+        for _, jpeg_name, webp_name in _variant_names(basename)
+    ):
+        return variants
+
+    img = Image.open(io.BytesIO(data))
+    if img.format == "JPEG":
+        # Let libjpeg decode at 1/2, 1/4 or 1/8 scale when the source is huge
+        largest = max(DERIVATIVE_SIZES.values())
+        img.draft("RGB", (largest, largest))
+    img = ImageOps.exif_transpose(img)
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+
+    current = img
+    # Largest first so each smaller size is resampled from the previous one
+    for name, size in sorted(DERIVATIVE_SIZES.items(), key=lambda item: -item[1]):
+        current = current.copy()
+        current.thumbnail((size, size), Image.Resampling.LANCZOS)
+        jpeg_name = f"{basename}_{name}.jpg"
+        webp_name = f"{basename}_{name}.webp"
+        _save_atomic(current, os.path.join(out_dir, jpeg_name), "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+        _save_atomic(current, os.path.join(out_dir, webp_name), "WEBP", quality=WEBP_QUALITY, method=4)
+    return variants
+
+
+def _too_large(limit: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Image must be at most {limit // (1024 * 1024)} MB",
+    )
+
+
+class UploadLimitMiddleware:
+    """
+    ASGI middleware that caps the request body of UPLOAD_ROUTES before
+    Starlette parses the form. By the time a handler runs, the multipart body
+    has already been received and spooled to disk, so the limit has to be
+    enforced here: an oversized Content-Length is refused without reading the
+    body, and a chunked or understated body fails with 413 as soon as it
+    passes the limit.
+    """
+
+    def __init__(self, app, limit: int = MAX_IMAGE_UPLOAD_BYTES, routes=UPLOAD_ROUTES):
+        self.app = app
+        self.limit = limit
+        self.max_body = limit + UPLOAD_FORM_OVERHEAD
+        self.routes = routes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or (scope["method"], scope["path"]) not in self.routes:
+            return await self.app(scope, receive, send)
+
+        for name, value in scope["headers"]:
+            if name == b"content-length" and value.isdigit() and int(value) > self.max_body:
+                error = _too_large(self.limit)
+                response = JSONResponse({"detail": error.detail}, status_code=error.status_code)
+                return await response(scope, receive, send)
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body:
+                    raise _too_large(self.limit)  # re-raised by FastAPI's body parsing as a 413
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+async def read_upload_limited(upload: UploadFile, limit: int = MAX_IMAGE_UPLOAD_BYTES) -> bytes:
+    """
+    Read a parsed upload, failing with 413 when the file exceeds `limit`.
+    The body itself is capped earlier by UploadLimitMiddleware.
+    """
+    too_large = _too_large(limit)
+    if upload.size is not None and upload.size > limit:
+        raise too_large
+
+    chunks, size = [], 0
+    while True:
+        chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > limit:
+            raise too_large
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+async def process_machinery_image(data: bytes) -> dict:
+    from PIL import UnidentifiedImageError
+
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(_get_pool(), build_derivatives, data, MACHINERY_IMAGES_DIR)
+    except UnidentifiedImageError:
+        raise HTTPException(status_code=400, detail="Uploaded file is not a supported image")
@@ -0,0 +1,173 @@
+import json
+import logging
+import os
+import re
+import time
+from collections import Counter as Tally
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+from services.metrics import Counter, Histogram
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+# Same statement repeated this many times in one request smells like N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "10"))
+
+logger = logging.getLogger("smart_krishi.sql")
+request_logger = logging.getLogger("smart_krishi.request")
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Request latency by route",
+    ["method", "route", "status"],
+)
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries",
+    "SQL statements issued per request",
+    ["method", "route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+QUERY_SECONDS = Histogram("db_query_duration_seconds", "SQL statement latency")
+SLOW_QUERIES = Counter("db_slow_queries_total", "Statements slower than SLOW_QUERY_MS")
+N_PLUS_ONE = Counter(
+    "db_n_plus_one_suspected_total",
+    "Requests repeating one statement at least N_PLUS_ONE_THRESHOLD times",
+    ["method", "route"],
+)
+POOL_CHECKOUT_SECONDS = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection",
+    ["pool"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+
+
+class RequestStats:
+    __slots__ = ("count", "seconds", "statements")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = Tally()
+
+    def most_repeated(self):
+        if not self.statements:
+            return None, 0
+        return self.statements.most_common(1)[0]
+
+
+current_stats: ContextVar = ContextVar("request_sql_stats", default=None)
+
+
+# --- pool checkout timing -----------------------------------------------------
+
+class TimedQueuePool(QueuePool):
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - started, pool="sync")
+
+
+class TimedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - started, pool="async")
+
+
+# --- statement hooks ----------------------------------------------------------
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _redact(parameters):
+    """Describe bound parameters without leaking their values."""
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (list, tuple, dict)):
+            return f"<{len(parameters)} parameter sets>"
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    QUERY_SECONDS.observe(elapsed)
+
+    stats = current_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.seconds += elapsed
+        stats.statements[statement] += 1
+
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        SLOW_QUERIES.inc()
+        logger.warning(json.dumps({
+            "event": "slow_query",
+            "duration_ms": round(elapsed * 1000, 2),
+            "statement": _WHITESPACE.sub(" ", statement)[:2000],
+            "parameters": _redact(parameters),
+            "executemany": executemany,
+        }))
+
+
+def instrument_engine(sync_engine):
+    """Attach timing hooks. Pass `async_engine.sync_engine` for async engines."""
+    if not event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# --- request middleware ---------------------------------------------------------
+
+async def sql_metrics_middleware(request, call_next):
+    """
+    Counts SQL per request, exposes it as X-DB-Query-Count / X-DB-Query-Time-Ms,
+    records route latency and flags probable N+1 patterns.
+    """
+    stats = RequestStats()
+    token = current_stats.set(stats)
+    started = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+    finally:
+        current_stats.reset(token)
+        elapsed = time.perf_counter() - started
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", "unmatched")
+        REQUEST_SECONDS.observe(elapsed, method=request.method, route=route_path, status=status_code)
+        REQUEST_QUERIES.observe(stats.count, method=request.method, route=route_path)
+
+    statement, repeats = stats.most_repeated()
+    suspect = repeats >= N_PLUS_ONE_THRESHOLD
+    if suspect:
+        N_PLUS_ONE.inc(method=request.method, route=route_path)
+
+    response.headers["X-DB-Query-Count"] = str(stats.count)
+    response.headers["X-DB-Query-Time-Ms"] = f"{stats.seconds * 1000:.2f}"
+
+    log = request_logger.warning if suspect else request_logger.info
+    log(json.dumps({
+        "event": "request",
+        "method": request.method,
+        "route": route_path,
+        "status": status_code,
+        "duration_ms": round(elapsed * 1000, 2),
+        "db_queries": stats.count,
+        "db_time_ms": round(stats.seconds * 1000, 2),
+        "n_plus_one": {"statement": _WHITESPACE.sub(" ", statement)[:500], "repeats": repeats} if suspect else None,
+    }))
+    return response
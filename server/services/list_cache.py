@@ -0,0 +1,178 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import Counter
+
+from fastapi import Request, Response
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models.sync import Versioned, table_version
+from services.cache import TTLCache
+
+# "memory" (per worker) or "redis" (shared between workers, needs the `redis` package)
+LIST_CACHE_BACKEND = os.getenv("LIST_CACHE_BACKEND", "memory")
+LIST_CACHE_REDIS_URL = os.getenv("LIST_CACHE_REDIS_URL", "redis://localhost:6379/0")
+LIST_CACHE_SIZE = int(os.getenv("LIST_CACHE_SIZE", "2000"))
+LIST_CACHE_TTL = int(os.getenv("LIST_CACHE_TTL", "30"))
+# How long a worker answers If-None-Match from the table version it last read,
+# without asking the database; its own commits drop that version at once
+LIST_CACHE_VERSION_SECONDS = float(os.getenv("LIST_CACHE_VERSION_SECONDS", "2"))
+
+
+def _encode(body: bytes, headers: dict) -> bytes:
+    return json.dumps(headers).encode() + b"\n" + body
+
+
+def _decode(entry: bytes):
+    headers, body = entry.split(b"\n", 1)
+    return body, json.loads(headers)
+
+
+class MemoryBackend:
+    """In-process LRU."""
+
+    def __init__(self, maxsize: int, ttl: int):
+        self.entries = TTLCache("list_response", maxsize, ttl)
+
+    async def get(self, key: str):
+        return self.entries.get(key)
+
+    async def set(self, key: str, entry: bytes):
+        self.entries.set(key, entry)
+
+
+class RedisBackend:
+    """Shared between workers: SETEX'd responses."""
+
+    def __init__(self, url: str, ttl: int):
+        import redis.asyncio as redis  # optional dependency
+
+        self.client = redis.from_url(url)
+        self.ttl = ttl
+
+    async def get(self, key: str):
+        return await self.client.get(f"listcache:entry:{key}")
+
+    async def set(self, key: str, entry: bytes):
+        await self.client.set(f"listcache:entry:{key}", entry, ex=self.ttl)
+
+
+def build_backend(kind: str = LIST_CACHE_BACKEND):
+    if kind == "memory":
+        return MemoryBackend(LIST_CACHE_SIZE, LIST_CACHE_TTL)
+    if kind == "redis":
+        return RedisBackend(LIST_CACHE_REDIS_URL, LIST_CACHE_TTL)
+    raise ValueError(f"Unknown LIST_CACHE_BACKEND: {kind}")
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+
+class ListCache:
+    """
+    Caches serialized list responses keyed on table version + query string.
+    A write gives the table a new version (table_version), which orphans every
+    cached page without any invalidation call.
+
+    Each worker also remembers the last version it read per table, for
+    version_seconds or until it commits a write to that table itself, so a
+    revalidation that still matches is answered with a 304 without touching
+    the database. Writes from other workers are seen within version_seconds.
+    """
+
+    def __init__(self, backend, version_seconds: float = LIST_CACHE_VERSION_SECONDS):
+        self.backend = backend
+        self.version_seconds = version_seconds
+        self._lock = threading.Lock()
+        self._known = {}  # table -> (version, monotonic time it was read)
+        self._writes = Counter()  # table -> local commits, so a read racing one isn't remembered
+
+    def known_version(self, table: str):
+        """The version this worker read recently, or None if it has to ask the database."""
+        entry = self._known.get(table)
+        if entry is None or time.monotonic() - entry[1] >= self.version_seconds:
+            return None
+        return entry[0]
+
+    def _remember(self, table: str, version: int, writes: int):
+        with self._lock:
+            known = self.known_version(table)
+            # A lagging replica's older version never replaces a newer one
+            if self._writes[table] == writes and (known is None or version >= known):
+                self._known[table] = (version, time.monotonic())
+
+    def invalidate(self, *tables: str):
+        with self._lock:
+            for table in tables:
+                self._writes[table] += 1
+                self._known.pop(table, None)
+
+    async def respond(self, request: Request, db, table: str, build) -> Response:
+        """
+        `build` is an async callable returning (json_bytes, extra_headers); it is
+        only called on a miss. Matching If-None-Match gets a 304 without calling it.
+        `db` is the session `build` reads from; the version comes from it too,
+        so a page built on a lagging replica is keyed (and tagged) with the
+        replica's older version, never the primary's newer one.
+        """
+        params = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+        if_none_match = request.headers.get("if-none-match")
+
+        known = self.known_version(table)
+        if if_none_match is not None and known is not None:
+            key, validators = self._validators(request, table, known, params)
+            if _etag_matches(if_none_match, validators["ETag"]):
+                return Response(status_code=304, headers=validators)
+
+        writes = self._writes[table]
+        version = await table_version(db, table)
+        self._remember(table, version, writes)
+        key, validators = self._validators(request, table, version, params)
+        if if_none_match is not None and _etag_matches(if_none_match, validators["ETag"]):
+            return Response(status_code=304, headers=validators)
+
+        entry = await self.backend.get(key)
+        if entry is not None:
+            body, headers = _decode(entry)
+        else:
+            body, headers = await build()
+            await self.backend.set(key, _encode(body, headers))
+
+        return Response(content=body, media_type="application/json", headers={**headers, **validators})
+
+    @staticmethod
+    def _validators(request: Request, table: str, version: int, params: str):
+        key = f"{table}:{version}:{request.url.path}?{params}"
+        etag = f'"{table}-{version}-{hashlib.sha1(key.encode()).hexdigest()[:16]}"'
+        return key, {"ETag": etag, "Cache-Control": "no-cache"}
+
+
+list_cache = ListCache(build_backend())
+
+
+# --- local writes ----------------------------------------------------------------------
+
+@event.listens_for(Session, "before_flush")
+def _note_changed_tables(session, flush_context, instances):
+    changed = session.info.setdefault("list_cache_tables", set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, Versioned):
+            changed.add(obj.__tablename__)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_tables(session):
+    changed = session.info.pop("list_cache_tables", None)
+    if changed:
+        list_cache.invalidate(*changed)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_tables(session):
+    session.info.pop("list_cache_tables", None)
@@ -0,0 +1,166 @@
+import asyncio
+import threading
+import time
+from abc import ABC, abstractmethod
+
+from sqlalchemy import select
+
+from models.sync import Tombstone, table_version
+from services.metrics import Counter
+
+MIRROR_REFRESHES = Counter("table_mirror_refreshes_total", "In-memory table copies refreshed from the database", ["mirror", "kind"])
+MIRROR_CHANGES = Counter("table_mirror_changes_total", "Changed or deleted rows applied by catch-up refreshes", ["mirror"])
+
+
+class TableMirror(ABC):
+    """
+    Base for a per-worker in-memory copy of a Versioned table (see
+    models/sync.py). The first ensure_fresh() loads every row; after that, at
+    most every refresh_seconds, it fetches only rows and tombstones with a
+    row_version past the newest one seen, so writes from other workers show
+    up within refresh_seconds. Refreshes are single-flight: concurrent
+    callers wait for the one in progress instead of running their own.
+
+    The version of every row held is kept, and a change is applied only if
+    it's newer, so a refresh never overwrites a newer upsert() from this
+    worker. Rows this worker deleted keep their tombstone's version in
+    `removed` until the watermark passes it, so a catch-up from a lagging
+    replica can't bring them back. Subclasses set `name` and `model`, and
+    implement columns() (id first) plus _reset/_put/_discard, which run with
+    self._lock held.
+    """
+    name = None
+
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._refreshed_at = None
+        self._refresh_lock = None
+        self._refresh_loop = None
+        self.watermark = 0  # newest row_version applied
+        self.versions = {}  # id -> row_version of the copy held
+        self.removed = {}  # id -> version of its deletion, while newer than the watermark
+
+    @property
+    @abstractmethod
+    def model(self):
+        """The Versioned model mirrored."""
+
+    @abstractmethod
+    def columns(self) -> tuple:
+        """Columns copied, the id first."""
+
+    @abstractmethod
+    def _reset(self, rows):
+        """Replace the copy with `rows` (tuples of columns())."""
+
+    @abstractmethod
+    def _put(self, row):
+        """Add or overwrite one row."""
+
+    @abstractmethod
+    def _discard(self, row_id):
+        """Drop one row, if held."""
+
+    def _changed(self):
+        """Called (lock held) after a batch of _put/_discard calls."""
+
+    def _known(self, row_id) -> int:
+        return max(self.versions.get(row_id, 0), self.removed.get(row_id, 0))
+
+    def _forget_removed(self):
+        # A catch-up only asks for versions past the watermark, and a row's
+        # versions all precede its tombstone's, so older deletions can't come back
+        self.removed = {row_id: version for row_id, version in self.removed.items() if version > self.watermark}
+
+    @property
+    def loaded(self) -> bool:
+        return self._refreshed_at is not None
+
+    @property
+    def stale(self) -> bool:
+        return not self.loaded or time.monotonic() - self._refreshed_at >= self.refresh_seconds
+
+    def _single_flight(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if self._refresh_loop is not loop:
+            self._refresh_loop, self._refresh_lock = loop, asyncio.Lock()
+        return self._refresh_lock
+
+    async def ensure_fresh(self, db):
+        if not self.stale:
+            return
+        async with self._single_flight():
+            if not self.stale:  # refreshed by the request we waited for
+                return
+            if self.loaded:
+                await self._catch_up(db)
+            else:
+                await self._load(db)
+            self._refreshed_at = time.monotonic()
+
+    async def _load(self, db):
+        # Version first: anything committed after it is picked up again by the next catch-up
+        watermark = await table_version(db, self.model.__tablename__)
+        rows = (await db.execute(select(*self.columns(), self.model.row_version))).all()
+        self.load(rows, watermark)
+
+    def load(self, rows, watermark: int = 0):
+        """Replace everything with `rows` (the columns() plus row_version last)."""
+        with self._lock:
+            rows = [row for row in rows if row[0] not in self.removed or (row[-1] or 0) > self.removed[row[0]]]
+            self.versions = {row[0]: row[-1] or 0 for row in rows}
+            self.watermark = max([watermark, *self.versions.values()])
+            self._forget_removed()
+            self._reset([tuple(row)[:-1] for row in rows])
+        MIRROR_REFRESHES.inc(mirror=self.name, kind="full")
+
+    async def _catch_up(self, db):
+        since = self.watermark
+        rows = (await db.execute(
+            select(*self.columns(), self.model.row_version).where(self.model.row_version > since)
+        )).all()
+        deleted = (await db.execute(
+            select(Tombstone.entity_id, Tombstone.row_version)
+            .where(Tombstone.entity == self.model.__tablename__, Tombstone.row_version > since)
+        )).all()
+        with self._lock:
+            for row in rows:
+                if row[-1] > self._known(row[0]):
+                    self.versions[row[0]] = row[-1]
+                    self._put(tuple(row)[:-1])
+            for row_id, version in deleted:
+                if version > self._known(row_id):
+                    self.versions.pop(row_id, None)
+                    self.removed[row_id] = version
+                    self._discard(row_id)
+            self.watermark = max([since, *(row[-1] for row in rows), *(version for _, version in deleted)])
+            self._forget_removed()
+            if rows or deleted:
+                self._changed()
+        MIRROR_REFRESHES.inc(mirror=self.name, kind="incremental")
+        MIRROR_CHANGES.inc(len(rows) + len(deleted), mirror=self.name)
+
+    # This worker's own writes, applied right away
+
+    def upsert_row(self, row, version):
+        if not self.loaded:
+            return  # the first ensure_fresh() loads everything
+        with self._lock:
+            if version is not None and version < self._known(row[0]):
+                return
+            self.versions[row[0]] = version or 0
+            self._put(row)
+            self._changed()
+
+    def remove_row(self, row_id, version: int):
+        """`version` is the deletion's (the tombstone's row_version)."""
+        if not self.loaded:
+            return
+        with self._lock:
+            if version < self._known(row_id):
+                return
+            self.versions.pop(row_id, None)
+            self.removed[row_id] = version
+            self._discard(row_id)
+            self._changed()
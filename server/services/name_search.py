@@ -0,0 +1,277 @@
+import heapq
+import os
+import re
+import unicodedata
+from bisect import bisect_left
+from collections import Counter as Tally
+
+from services.metrics import Counter, Gauge
+from services.mirror import TableMirror
+
+# How often other workers' writes are fetched (rows with a newer row_version)
+NAME_INDEX_REFRESH_SECONDS = float(os.getenv("NAME_INDEX_REFRESH_SECONDS", "2"))
+# Only the best-ranked matches of a name search are looked up in SQL
+NAME_SEARCH_MAX_CANDIDATES = int(os.getenv("NAME_SEARCH_MAX_CANDIDATES", "2000"))
+# Dice similarity of trigram sets needed for a fuzzy token match
+NAME_MATCH_THRESHOLD = float(os.getenv("NAME_MATCH_THRESHOLD", "0.45"))
+
+NAME_SEARCHES = Counter("machinery_name_searches_total", "Name searches served by the in-memory index", ["kind"])
+NAME_INDEX_TERMS = Gauge("machinery_name_index_terms", "Distinct normalized words in the name index")
+NAME_INDEX_REBUILDS = Counter("machinery_name_index_rebuilds_total", "Full rebuilds of the name index")
+
+# --- normalization ---------------------------------------------------------------
+
+# Devanagari -> Latin, close to how farmers type Nepali names in Roman script
+_DEVANAGARI_VOWELS = {
+    "अ": "a", "आ": "a", "इ": "i", "ई": "i", "उ": "u", "ऊ": "u", "ऋ": "ri",
+    "ए": "e", "ऐ": "ai", "ओ": "o", "औ": "au",
+}
+_DEVANAGARI_SIGNS = {
+    "ा": "a", "ि": "i", "ी": "i", "ु": "u", "ू": "u", "ृ": "ri",
+    "े": "e", "ै": "ai", "ो": "o", "ौ": "au", "ं": "n", "ँ": "n", "ः": "h",
+}
+_DEVANAGARI_CONSONANTS = {
+    "क": "k", "ख": "kh", "ग": "g", "घ": "gh", "ङ": "ng", "च": "ch", "छ": "chh", "ज": "j",
+    "झ": "jh", "ञ": "n", "ट": "t", "ठ": "th", "ड": "d", "ढ": "dh", "ण": "n", "त": "t",
+    "थ": "th", "द": "d", "ध": "dh", "न": "n", "प": "p", "फ": "ph", "ब": "b", "भ": "bh",
+    "म": "m", "य": "y", "र": "r", "ल": "l", "व": "v", "श": "sh", "ष": "sh", "स": "s", "ह": "h",
+}
+_VIRAMA = "्"
+_DEVANAGARI_DIGITS = {chr(0x0966 + i): str(i) for i in range(10)}
+
+# Spelling variants that sound alike in romanized Nepali/English, applied in order
+_PHONETIC_RULES = [
+    (re.compile(r"ph"), "f"),
+    (re.compile(r"chh"), "ch"),
+    (re.compile(r"c(?!h)"), "k"),
+    (re.compile(r"q"), "k"),
+    (re.compile(r"x"), "ks"),
+    (re.compile(r"w"), "v"),
+    (re.compile(r"z"), "j"),
+    (re.compile(r"sh"), "s"),
+    (re.compile(r"ee"), "i"),
+    (re.compile(r"oo"), "u"),
+    (re.compile(r"([a-z])\1+"), r"\1"),
+]
+_VOWELS = re.compile(r"[aeiouy]")
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def transliterate(text: str) -> str:
+    """Romanize Devanagari (inherent 'a' included), pass everything else through."""
+    out = []
+    chars = list(text)
+    for i, ch in enumerate(chars):
+        if ch in _DEVANAGARI_CONSONANTS:
+            out.append(_DEVANAGARI_CONSONANTS[ch])
+            following = chars[i + 1] if i + 1 < len(chars) else ""
+            if following not in _DEVANAGARI_SIGNS and following != _VIRAMA:
+                out.append("a")
+        elif ch in _DEVANAGARI_SIGNS:
+            out.append(_DEVANAGARI_SIGNS[ch])
+        elif ch in _DEVANAGARI_VOWELS:
+            out.append(_DEVANAGARI_VOWELS[ch])
+        elif ch in _DEVANAGARI_DIGITS:
+            out.append(_DEVANAGARI_DIGITS[ch])
+        elif ch == _VIRAMA:
+            continue
+        else:
+            out.append(ch)
+    return "".join(out)
+
+
+def tokenize(text: str) -> list:
+    """Lowercase ASCII words, with accents stripped and Devanagari romanized."""
+    text = unicodedata.normalize("NFKD", transliterate(text or ""))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    return _WORD.findall(text)
+
+
+def phonetic(word: str) -> str:
+    """'tractor', 'traktor' and 'trekter' fold towards the same spelling."""
+    for pattern, replacement in _PHONETIC_RULES:
+        word = pattern.sub(replacement, word)
+    return word
+
+
+def skeleton(word: str) -> str:
+    """Consonants only: catches vowel-level transliteration differences."""
+    return word[:1] + _VOWELS.sub("", word[1:])
+
+
+def trigrams(word: str) -> set:
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# --- index -------------------------------------------------------------------------
+
+class NameIndex(TableMirror):
+    """
+    Inverted index over machinery names. Words are normalized with
+    `phonetic()`; each distinct word is indexed by trigram, so a query word is
+    matched against the (small) vocabulary rather than every listing:
+    exact, prefix (autocomplete), same consonant skeleton, or trigram
+    similarity >= NAME_MATCH_THRESHOLD.
+    """
+    name = "name_index"
+
+    def __init__(self, refresh_seconds: float = NAME_INDEX_REFRESH_SECONDS):
+        super().__init__(refresh_seconds)
+        self._clear()
+
+    @property
+    def model(self):
+        from models.machinery import Machinery
+
+        return Machinery
+
+    def columns(self):
+        return (self.model.id, self.model.name)
+
+    def _clear(self):
+        self.names = {}  # machinery_id -> display name
+        self.words = {}  # machinery_id -> tuple of normalized words
+        self.postings = {}  # word -> set of machinery ids
+        self.by_trigram = {}  # trigram -> set of words
+        self.by_skeleton = {}  # skeleton -> set of words
+        self.sorted_words = []  # for prefix lookups
+
+    def _reset(self, rows):
+        self._clear()
+        for machinery_id, name in rows:
+            self._add(machinery_id, name)
+        self._changed()
+        NAME_INDEX_REBUILDS.inc()
+
+    def _put(self, row):
+        machinery_id, name = row
+        self._remove(machinery_id)
+        self._add(machinery_id, name)
+
+    def _discard(self, machinery_id):
+        self._remove(machinery_id)
+
+    def _changed(self):
+        self.sorted_words = sorted(self.postings)
+        NAME_INDEX_TERMS.set(len(self.postings))
+
+    # Incremental maintenance from this worker's writes
+
+    def upsert(self, machinery_id: int, name: str, version: int = None):
+        self.upsert_row((machinery_id, name), version)
+
+    def remove(self, machinery_id: int, version: int):
+        self.remove_row(machinery_id, version)
+
+    def _add(self, machinery_id, name):
+        words = tuple(dict.fromkeys(phonetic(word) for word in tokenize(name)))
+        self.names[machinery_id] = name
+        self.words[machinery_id] = words
+        for word in words:
+            ids = self.postings.get(word)
+            if ids is None:
+                ids = self.postings[word] = set()
+                for gram in trigrams(word):
+                    self.by_trigram.setdefault(gram, set()).add(word)
+                self.by_skeleton.setdefault(skeleton(word), set()).add(word)
+            ids.add(machinery_id)
+
+    def _remove(self, machinery_id):
+        self.names.pop(machinery_id, None)
+        for word in self.words.pop(machinery_id, ()):
+            ids = self.postings.get(word)
+            if ids is None:
+                continue
+            ids.discard(machinery_id)
+            if not ids:
+                del self.postings[word]
+                for gram in trigrams(word):
+                    self.by_trigram[gram].discard(word)
+                    if not self.by_trigram[gram]:
+                        del self.by_trigram[gram]
+                self.by_skeleton[skeleton(word)].discard(word)
+                if not self.by_skeleton[skeleton(word)]:
+                    del self.by_skeleton[skeleton(word)]
+
+    # Lookups
+
+    def _prefixed(self, prefix: str):
+        start = bisect_left(self.sorted_words, prefix)
+        for word in self.sorted_words[start:]:
+            if not word.startswith(prefix):
+                break
+            yield word
+
+    def _matching_words(self, query_word: str, allow_prefix: bool) -> dict:
+        """{indexed word: score in (0, 1]} for one query word."""
+        matches = {}
+        if query_word in self.postings:
+            matches[query_word] = 1.0
+        if allow_prefix:
+            for word in self._prefixed(query_word):
+                matches.setdefault(word, 0.9)
+        for word in self.by_skeleton.get(skeleton(query_word), ()):
+            matches.setdefault(word, 0.8)
+
+        grams = trigrams(query_word)
+        shared = Tally(word for gram in grams for word in self.by_trigram.get(gram, ()))
+        for word, count in shared.items():
+            if word in matches:
+                continue
+            score = 2 * count / (len(grams) + len(trigrams(word)))
+            if score >= NAME_MATCH_THRESHOLD:
+                matches[word] = score * 0.8
+        return matches
+
+    def search(self, query: str) -> dict:
+        """
+        {machinery_id: relevance} for listings matching every query word.
+        The last word also matches as a prefix, for search-as-you-type.
+        """
+        query_words = [phonetic(word) for word in tokenize(query)]
+        if not query_words:
+            return {}
+        NAME_SEARCHES.inc(kind="search")
+        with self._lock:
+            scores = None
+            for position, query_word in enumerate(query_words):
+                allow_prefix = position == len(query_words) - 1
+                word_scores = {}
+                for word, score in self._matching_words(query_word, allow_prefix).items():
+                    for machinery_id in self.postings[word]:
+                        if score > word_scores.get(machinery_id, 0.0):
+                            word_scores[machinery_id] = score
+                if scores is None:
+                    scores = word_scores
+                else:
+                    scores = {mid: scores[mid] + s for mid, s in word_scores.items() if mid in scores}
+                if not scores:
+                    return {}
+        return {mid: score / len(query_words) for mid, score in scores.items()}
+
+    def suggest(self, prefix: str, limit: int = 10) -> list:
+        """Most common listing names matching `prefix` (fuzzy on the last word)."""
+        NAME_SEARCHES.inc(kind="suggest")
+        matches = self.search(prefix)
+        with self._lock:
+            ranked = Tally()
+            best = {}
+            for machinery_id, score in matches.items():
+                name = self.names.get(machinery_id)
+                if name is None:
+                    continue
+                key = " ".join(tokenize(name))
+                ranked[key] += 1
+                if score > best.get(key, (0.0, None))[0]:
+                    best[key] = (score, name)
+        order = sorted(ranked, key=lambda key: (-best[key][0], -ranked[key], key))
+        return [best[key][1] for key in order[:limit]]
+
+
+def top_candidates(scores: dict, limit: int = NAME_SEARCH_MAX_CANDIDATES) -> list:
+    """Ids of the best `limit` matches from search(), best first (ties by id)."""
+    return heapq.nsmallest(limit, scores, key=lambda machinery_id: (-scores[machinery_id], machinery_id))
+
+
+name_index = NameIndex()
@@ -0,0 +1,152 @@
+import asyncio
+import json
+import logging
+import os
+
+from services.metrics import Counter, Gauge
+
+# "memory" (single worker) or "redis" (fan-out across workers, needs the `redis` package)
+NOTIFY_BACKEND = os.getenv("NOTIFY_BACKEND", "memory")
+NOTIFY_REDIS_URL = os.getenv("NOTIFY_REDIS_URL", "redis://localhost:6379/0")
+NOTIFY_REDIS_CHANNEL = os.getenv("NOTIFY_REDIS_CHANNEL", "smart_krishi:notifications")
+# Events buffered per open stream; a client that falls further behind is resynced from the database
+NOTIFY_QUEUE_SIZE = int(os.getenv("NOTIFY_QUEUE_SIZE", "100"))
+
+logger = logging.getLogger("smart_krishi.notifications")
+
+STREAMS = Gauge("notification_streams", "Open notification streams")
+PUBLISHED = Counter("notifications_published_total", "Notification events published to the hub")
+DELIVERED = Counter("notifications_delivered_total", "Notification events queued to open streams")
+LAGGED = Counter("notification_stream_lagged_total", "Events dropped because a stream's queue was full")
+
+
+class Subscription:
+    """One open stream. `lagged` is set once an event had to be dropped."""
+    __slots__ = ("user_id", "queue", "lagged")
+
+    def __init__(self, user_id: int, maxsize: int):
+        self.user_id = user_id
+        self.queue = asyncio.Queue(maxsize)
+        self.lagged = False
+
+    def offer(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Never block the publisher on a slow reader
+            self.lagged = True
+            LAGGED.inc()
+            return
+        DELIVERED.inc()
+
+    def reset(self):
+        """Forget buffered events; the caller is about to catch up from the database."""
+        self.lagged = False
+        while not self.queue.empty():
+            self.queue.get_nowait()
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class MemoryBroker:
+    """Delivers straight to this process's subscribers."""
+
+    async def start(self, deliver):
+        self.deliver = deliver
+
+    async def stop(self):
+        pass
+
+    async def publish(self, user_id: int, event):
+        self.deliver(user_id, event)
+
+
+class RedisBroker:
+    """Pub/sub channel shared by every worker; each worker delivers to its own streams."""
+
+    def __init__(self, url: str, channel: str):
+        import redis.asyncio as redis  # optional dependency
+
+        self.client = redis.from_url(url)
+        self.channel = channel
+        self._listener = None
+
+    async def start(self, deliver):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(self.channel)
+        self._listener = asyncio.create_task(self._listen(pubsub, deliver))
+
+    async def _listen(self, pubsub, deliver):
+        try:
+            async for message in pubsub.listen():
+                payload = json.loads(message["data"])
+                deliver(payload["user_id"], (payload["id"], payload["data"]))
+        finally:
+            await pubsub.aclose()
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+        await self.client.aclose()
+
+    async def publish(self, user_id: int, event):
+        notification_id, data = event
+        await self.client.publish(self.channel, json.dumps({"user_id": user_id, "id": notification_id, "data": data}))
+
+
+def build_broker(kind: str = NOTIFY_BACKEND):
+    if kind == "memory":
+        return MemoryBroker()
+    if kind == "redis":
+        return RedisBroker(NOTIFY_REDIS_URL, NOTIFY_REDIS_CHANNEL)
+    raise ValueError(f"Unknown NOTIFY_BACKEND: {kind}")
+
+
+class NotificationHub:
+    """
+    Fans notification events out to open streams. Events are (id, json_str)
+    pairs; the row is already committed, so anything a stream misses can be
+    re-read from the notifications table.
+    """
+
+    def __init__(self, broker, queue_size: int = NOTIFY_QUEUE_SIZE):
+        self.broker = broker
+        self.queue_size = queue_size
+        self.subscribers = {}  # user_id -> set of Subscription
+
+    async def start(self):
+        await self.broker.start(self.deliver)
+
+    async def stop(self):
+        await self.broker.stop()
+
+    def subscribe(self, user_id: int) -> Subscription:
+        subscription = Subscription(user_id, self.queue_size)
+        self.subscribers.setdefault(user_id, set()).add(subscription)
+        STREAMS.inc()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        streams = self.subscribers.get(subscription.user_id)
+        if streams is not None and subscription in streams:
+            streams.discard(subscription)
+            if not streams:
+                del self.subscribers[subscription.user_id]
+            STREAMS.dec()
+
+    def deliver(self, user_id: int, event):
+        for subscription in self.subscribers.get(user_id, ()):
+            subscription.offer(event)
+
+    async def publish(self, user_id: int, notification_id: int, data: str):
+        PUBLISHED.inc()
+        try:
+            await self.broker.publish(user_id, (notification_id, data))
+        except Exception:
+            # Delivery is best effort; clients catch up from the table
+            logger.exception("Failed to publish notification %s", notification_id)
+
+
+notification_hub = NotificationHub(build_broker())
@@ -0,0 +1,269 @@
+import asyncio
+import contextlib
+import importlib
+import os
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+
+from services.metrics import Counter, Histogram
+
+DISEASE_BACKEND = os.getenv("DISEASE_BACKEND", "gradio")  # "gradio" or "local"
+DISEASE_GRADIO_SPACE = os.getenv("DISEASE_GRADIO_SPACE", "biswa000/rice")
+# Optional "package.module:function" taking a list of image bytes, for the local backend
+DISEASE_LOCAL_MODEL = os.getenv("DISEASE_LOCAL_MODEL")
+
+PREDICT_MAX_BATCH_SIZE = int(os.getenv("PREDICT_MAX_BATCH_SIZE", "8"))
+PREDICT_MAX_WAIT_MS = int(os.getenv("PREDICT_MAX_WAIT_MS", "20"))
+PREDICT_TIMEOUT_SECONDS = float(os.getenv("PREDICT_TIMEOUT_SECONDS", "30"))
+PREDICT_QUEUE_LIMIT = int(os.getenv("PREDICT_QUEUE_LIMIT", "256"))
+PREDICT_CONCURRENCY = int(os.getenv("PREDICT_CONCURRENCY", "2"))  # batches in flight
+
+PREDICT_BATCH_SIZE = Histogram(
+    "disease_predict_batch_size",
+    "Images per backend call",
+    buckets=(1, 2, 4, 8, 16, 32),
+)
+PREDICT_SECONDS = Histogram(
+    "disease_predict_backend_seconds",
+    "Backend latency per batch",
+    ["backend"],
+)
+PREDICT_FAILURES = Counter(
+    "disease_predict_failures_total",
+    "Prediction requests that failed",
+    ["reason"],
+)
+
+
+class PredictionBusy(Exception):
+    """Raised when the prediction queue is full."""
+
+
+class PredictionBackend(ABC):
+    """
+    Interface for disease prediction backends.
+    predict_batch() is blocking and always runs on a worker thread. It returns
+    one entry per image; an entry may be an Exception, which fails only that
+    image's request.
+    """
+    name = "base"
+
+    @abstractmethod
+    def predict_batch(self, images: list) -> list:
+        ...
+
+    def close(self):
+        pass
+
+
+def _guess_suffix(data: bytes) -> str:
+    if data.startswith(b"\x89PNG"):
+        return ".png"
+    if data[8:12] == b"WEBP":
+        return ".webp"
+    return ".jpg"
+
+
+def _image_path(stack: contextlib.ExitStack, data: bytes) -> str:
+    """
+    A path holding `data` for as long as `stack` is open. gradio_client only
+    uploads from a path (it stats and opens it), so on Linux the bytes go
+    into an anonymous memory file, reached through /proc, and never touch
+    the disk; elsewhere they fall back to a private temp file.
+    """
+    if hasattr(os, "memfd_create"):
+        fd = os.memfd_create("disease-image", os.MFD_CLOEXEC)
+        stack.callback(os.close, fd)
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+        return f"/proc/self/fd/{fd}"
+    tmp = stack.enter_context(tempfile.NamedTemporaryFile(suffix=_guess_suffix(data)))
+    tmp.write(data)
+    tmp.flush()
+    return tmp.name
+
+
+class GradioBackend(PredictionBackend):
+    """Remote Hugging Face space, with one client reused for the life of the worker."""
+    name = "gradio"
+
+    def __init__(self, space: str, timeout: float = PREDICT_TIMEOUT_SECONDS):
+        self.space = space
+        self.timeout = timeout
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _get_client(self):
+        with self._lock:
+            if self._client is None:
+                from gradio_client import Client  # heavy; imported on first prediction
+
+                self._client = Client(self.space)
+            return self._client
+
+    def predict_batch(self, images):
+        from gradio_client import handle_file
+
+        client = self._get_client()
+        with contextlib.ExitStack() as stack:  # each image's file lives as long as its job
+            jobs = [
+                client.submit(img=handle_file(_image_path(stack, data)), api_name="/predict")
+                for data in images
+            ]
+            # One deadline for the batch so a hung Space can't pin this thread
+            deadline = time.monotonic() + self.timeout
+            results = []
+            for job in jobs:
+                try:
+                    results.append(job.result(timeout=max(0.0, deadline - time.monotonic())))
+                except Exception as exc:  # TimeoutError included; other images still get theirs
+                    job.cancel()
+                    results.append(exc)
+            return results
+
+
+def _stub_predict(images):
+    return [{"label": "unknown", "confidences": []} for _ in images]
+
+
+class LocalBackend(PredictionBackend):
+    """In-process model; falls back to a stub for offline use and testing."""
+    name = "local"
+
+    def __init__(self, predict_fn=None):
+        self.predict_fn = predict_fn or _stub_predict
+
+    def predict_batch(self, images):
+        return list(self.predict_fn(images))
+
+
+def load_local_model(path: str):
+    module_name, _, attr = path.partition(":")
+    return getattr(importlib.import_module(module_name), attr or "predict")
+
+
+def build_backend(kind: str = DISEASE_BACKEND) -> PredictionBackend:
+    if kind == "local":
+        return LocalBackend(load_local_model(DISEASE_LOCAL_MODEL) if DISEASE_LOCAL_MODEL else None)
+    if kind == "gradio":
+        return GradioBackend(DISEASE_GRADIO_SPACE)
+    raise ValueError(f"Unknown DISEASE_BACKEND: {kind}")
+
+
+class PredictionService:
+    """
+    Long-lived prediction engine. Concurrent requests are queued and grouped
+    into batches of up to max_batch_size, waiting at most max_wait seconds for
+    a batch to fill, then handed to the backend on a worker thread.
+    """
+
+    def __init__(
+        self,
+        backend: PredictionBackend,
+        max_batch_size: int = PREDICT_MAX_BATCH_SIZE,
+        max_wait: float = PREDICT_MAX_WAIT_MS / 1000,
+        timeout: float = PREDICT_TIMEOUT_SECONDS,
+        queue_limit: int = PREDICT_QUEUE_LIMIT,
+        concurrency: int = PREDICT_CONCURRENCY,
+    ):
+        self.backend = backend
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.timeout = timeout
+        self.queue_limit = queue_limit
+        self.concurrency = concurrency
+        self._queue = None
+        self._workers = []
+        self._executor = None
+
+    @property
+    def running(self):
+        return bool(self._workers)
+
+    async def start(self):
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_limit)
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="predict")
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        if not self.running:
+            return
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.backend.close()
+
+    async def predict(self, image: bytes):
+        """Queue one image and wait for its result (asyncio.TimeoutError after `timeout`)."""
+        if not self.running:
+            await self.start()
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((image, future))
+        except asyncio.QueueFull:
+            PREDICT_FAILURES.inc(reason="busy")
+            raise PredictionBusy()
+        try:
+            return await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            PREDICT_FAILURES.inc(reason="timeout")
+            raise
+
+    async def _next_batch(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        # Drop requests whose caller already timed out
+        return [(image, future) for image, future in batch if not future.done()]
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            if not batch:
+                continue
+            PREDICT_BATCH_SIZE.observe(len(batch))
+            started = time.perf_counter()
+            try:
+                results = await loop.run_in_executor(
+                    self._executor, self.backend.predict_batch, [image for image, _ in batch]
+                )
+            except Exception as exc:
+                PREDICT_FAILURES.inc(reason="backend")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+            finally:
+                PREDICT_SECONDS.observe(time.perf_counter() - started, backend=self.backend.name)
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    PREDICT_FAILURES.inc(reason="backend")
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+
+prediction_service = PredictionService(build_backend())
@@ -0,0 +1,199 @@
+import asyncio
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from starlette.concurrency import run_in_threadpool
+
+from services.cache import TTLCache
+from services.metrics import Counter
+
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "5000"))
+PREDICTION_CACHE_TTL = int(os.getenv("PREDICTION_CACHE_TTL", str(7 * 24 * 3600)))
+# Optional on-disk tier that survives restarts; disabled when unset
+PREDICTION_CACHE_DIR = os.getenv("PREDICTION_CACHE_DIR")
+# Perceptual (difference) hash matching for near-duplicate photos; 0 disables it
+PREDICTION_PHASH_DISTANCE = int(os.getenv("PREDICTION_PHASH_DISTANCE", "0"))
+
+PREDICTION_CACHE_LOOKUPS = Counter(
+    "disease_prediction_cache_total",
+    "Prediction cache outcomes by tier",
+    ["result"],
+)
+
+
+def content_key(img) -> str:
+    """sha256 of the decoded pixels, so re-encodes and metadata changes don't matter."""
+    digest = hashlib.sha256(f"{img.mode}:{img.width}x{img.height}:".encode())
+    digest.update(img.tobytes())
+    return digest.hexdigest()
+
+
+def difference_hash(img, size: int = 8) -> int:
+    """64-bit dHash: compares neighbouring pixels of a tiny grayscale copy."""
+    from PIL import Image
+
+    small = img.convert("L").resize((size + 1, size), Image.Resampling.BILINEAR)
+    pixels = small.tobytes()
+    bits = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for col in range(size):
+            bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return bits
+
+
+def fingerprint(data: bytes, with_phash: bool):
+    """Return (key, phash). Undecodable uploads fall back to a hash of the raw bytes."""
+    from PIL import Image, ImageOps  # imported on first use to keep startup fast
+
+    try:
+        img = Image.open(io.BytesIO(data))
+        img = ImageOps.exif_transpose(img).convert("RGB")
+    except Exception:
+        return "raw-" + hashlib.sha256(data).hexdigest(), None
+    return content_key(img), difference_hash(img) if with_phash else None
+
+
+class DiskTier:
+    """One JSON file per key, fanned out by key prefix."""
+
+    def __init__(self, root: str, ttl: float):
+        self.root = root
+        self.ttl = ttl
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], f"{key}.json")
+
+    def get(self, key):
+        try:
+            with open(self._path(key)) as fh:
+                entry = json.load(fh)
+        except (OSError, ValueError):
+            return None
+        if entry["created"] + self.ttl < time.time():
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+            return None
+        return entry
+
+    def set(self, key, result):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as fh:
+            json.dump({"created": time.time(), "result": result}, fh)
+        os.replace(tmp, path)
+
+
+class PhashIndex:
+    """Bounded map of perceptual hash -> content key, searched by Hamming distance."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, phash: int, key: str):
+        with self._lock:
+            self._entries[phash] = key
+            self._entries.move_to_end(phash)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def nearest(self, phash: int, max_distance: int):
+        with self._lock:
+            entries = list(self._entries.items())
+        best_key, best_distance = None, max_distance + 1
+        for candidate, key in entries:
+            distance = (candidate ^ phash).bit_count()
+            if distance < best_distance:
+                best_key, best_distance = key, distance
+        return best_key
+
+
+class PredictionCache:
+    """
+    Memory (LRU+TTL) and optional disk cache of predictions keyed by image
+    content, with single-flight deduplication of concurrent identical uploads.
+    """
+
+    def __init__(self, maxsize=PREDICTION_CACHE_SIZE, ttl=PREDICTION_CACHE_TTL,
+                 cache_dir=PREDICTION_CACHE_DIR, phash_distance=PREDICTION_PHASH_DISTANCE):
+        self.memory = TTLCache("disease_prediction", maxsize, ttl)
+        self.disk = DiskTier(cache_dir, ttl) if cache_dir else None
+        self.phash_distance = phash_distance
+        self.phashes = PhashIndex(maxsize) if phash_distance > 0 else None
+        self._in_flight = {}
+
+    def _lookup(self, key, phash):
+        result = self.memory.get(key)
+        if result is not None:
+            return result, "memory"
+        if self.disk is not None:
+            entry = self.disk.get(key)
+            if entry is not None:
+                self.memory.set(key, entry["result"])
+                return entry["result"], "disk"
+        if self.phashes is not None and phash is not None:
+            similar = self.phashes.nearest(phash, self.phash_distance)
+            if similar is not None:
+                result = self.memory.get(similar)
+                if result is not None:
+                    return result, "similar"
+        return None, None
+
+    def _store(self, key, phash, result):
+        self.memory.set(key, result)
+        if self.phashes is not None and phash is not None:
+            self.phashes.add(phash, key)
+        if self.disk is not None:
+            self.disk.set(key, result)
+
+    async def get_or_compute(self, image: bytes, compute):
+        """Return (result, outcome) where outcome is memory/disk/similar/shared/miss."""
+        key, phash = await run_in_threadpool(fingerprint, image, self.phashes is not None)
+        result, tier = await run_in_threadpool(self._lookup, key, phash)
+        if tier is not None:
+            PREDICTION_CACHE_LOOKUPS.inc(result=tier)
+            return result, tier
+
+        pending = self._in_flight.get(key)
+        if pending is not None:
+            PREDICTION_CACHE_LOOKUPS.inc(result="shared")
+            try:
+                return await asyncio.shield(pending), "shared"
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+            # The request running the inference went away; run our own
+            return await compute(image), "miss"
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        PREDICTION_CACHE_LOOKUPS.inc(result="miss")
+        try:
+            result = await compute(image)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            future.exception()  # mark retrieved when nobody else was waiting
+            raise
+        else:
+            future.set_result(result)
+            await run_in_threadpool(self._store, key, phash, result)
+            return result, "miss"
+        finally:
+            self._in_flight.pop(key, None)
+
+
+prediction_cache = PredictionCache()
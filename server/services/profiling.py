@@ -0,0 +1,328 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import secrets
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter as Tally
+from datetime import datetime
+
+from starlette.routing import Match
+
+from services.metrics import Counter
+
+# Requests sending `X-Profile-Token: <PROFILE_TOKEN>` are profiled; the same
+# token unlocks /admin/profiles. Unset disables both.
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN")
+PROFILE_HEADER = b"x-profile-token"
+# Random sampling per route template, e.g. "POST /machinery/=0.02,/predict/disease=0.1"
+PROFILE_SAMPLE_RATES = os.getenv("PROFILE_SAMPLE_RATES", "")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+# Stops the sampler on long requests (SSE streams, big uploads)
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "30"))
+PROFILE_MAX_CONCURRENT = int(os.getenv("PROFILE_MAX_CONCURRENT", "2"))
+# Ring buffer: the newest PROFILE_MAX_FILES profiles are kept
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "smart-krishi-profiles"))
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "100"))
+
+logger = logging.getLogger("smart_krishi.profiling")
+
+PROFILES = Counter("profiles_captured_total", "Request profiles written to disk", ["trigger"])
+PROFILES_SKIPPED = Counter("profiles_skipped_total", "Profiles not taken", ["reason"])
+
+# Where threads sit when they have nothing to do; such samples are dropped.
+# A thread blocked in C shows its caller as the leaf, so pool loops count as idle
+# (aiosqlite's DB time already shows up in the request's await stack).
+IDLE_FILES = ("threading.py", "queue.py", "selectors.py")
+IDLE_FUNCTIONS = {("thread.py", "_worker"), ("core.py", "_connection_worker_thread")}
+
+
+def parse_rates(spec: str) -> dict:
+    """{(method or None, route template): rate} from "METHOD /path=rate,/path=rate"."""
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        target, _, rate = item.rpartition("=")
+        method, _, path = target.strip().rpartition(" ")
+        rates[(method.upper() or None, path)] = float(rate)
+    return rates
+
+
+def frame_label(code) -> str:
+    path = code.co_filename.replace("\\", "/").split("/")
+    return f"{code.co_qualname} ({'/'.join(path[-2:])}:{code.co_firstlineno})"
+
+
+def frame_stack(frame) -> list:
+    """Labels from the outermost call to `frame`."""
+    stack = []
+    while frame is not None:
+        stack.append(frame_label(frame.f_code))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def await_stack(coro) -> list:
+    """Where a suspended task is waiting: its chain of awaiting coroutines, outermost first."""
+    stack = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None) or getattr(coro, "ag_frame", None)
+        if frame is None:
+            break
+        stack.append(frame_label(frame.f_code))
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None) or getattr(coro, "ag_await", None)
+    return stack
+
+
+class Sampler(threading.Thread):
+    """
+    Wall-clock sampler for one request task. Every interval it records where
+    the task is: its live stack if it's running on the event loop, else the
+    await chain it's suspended in (so DB and network waits show up). Busy
+    worker threads (to_thread, the threadpool) are recorded under their own
+    root; they may belong to concurrent requests.
+
+    It never touches the loop from its own thread: whether the task is
+    running is read off its coroutine (cr_running, set while a step executes).
+    Stacks come from sys._current_frames(), so this is CPython-only.
+    """
+
+    def __init__(self, task, interval: float, max_seconds: float):
+        super().__init__(name="request-profiler", daemon=True)
+        self.task = task
+        self.coro = task.get_coro()
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.loop_thread = threading.get_ident()  # constructed on the loop thread
+        self.stacks = Tally()
+        self.samples = 0
+        self._done = threading.Event()
+
+    def run(self):
+        deadline = time.monotonic() + self.max_seconds
+        while not self._done.wait(self.interval) and time.monotonic() < deadline:
+            try:
+                self.sample()
+            except Exception:  # a frame changed under us; skip this tick
+                continue
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+    def sample(self):
+        frames = sys._current_frames()
+        if getattr(self.coro, "cr_running", False):
+            self.stacks[";".join(["[running]"] + frame_stack(frames.get(self.loop_thread)))] += 1
+        elif not self.task.done():
+            self.stacks[";".join(["[awaiting]"] + await_stack(self.coro))] += 1
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in frames.items():
+            if ident in (self.loop_thread, self.ident) or names.get(ident, "").startswith("request-profiler"):
+                continue
+            filename = os.path.basename(frame.f_code.co_filename)
+            if filename in IDLE_FILES or (filename, frame.f_code.co_name) in IDLE_FUNCTIONS:
+                continue
+            self.stacks[";".join([f"[thread] {names.get(ident, ident)}"] + frame_stack(frame))] += 1
+        self.samples += 1
+
+
+# --- storage ---------------------------------------------------------------------------
+
+PROFILE_ID = re.compile(r"^\d{13}-[0-9a-f]{8}$")
+
+
+class ProfileStore:
+    """
+    Bounded ring buffer of profiles on disk: <id>.folded (collapsed stacks,
+    "a;b;c count" per line) plus <id>.json metadata. Ids sort by capture time;
+    the oldest are deleted past max_files.
+    """
+
+    def __init__(self, directory: str = PROFILE_DIR, max_files: int = PROFILE_MAX_FILES):
+        self.directory = directory
+        self.max_files = max_files
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def new_id() -> str:
+        return f"{int(time.time() * 1000):013d}-{uuid.uuid4().hex[:8]}"
+
+    def _path(self, profile_id: str, suffix: str) -> str:
+        if not PROFILE_ID.match(profile_id):
+            raise KeyError(profile_id)
+        return os.path.join(self.directory, profile_id + suffix)
+
+    def ids(self) -> list:
+        """Newest first."""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(
+            (name[:-5] for name in os.listdir(self.directory) if name.endswith(".json") and PROFILE_ID.match(name[:-5])),
+            reverse=True,
+        )
+
+    def save(self, meta: dict, stacks: Tally):
+        os.makedirs(self.directory, exist_ok=True)
+        profile_id = meta["id"]
+        with open(self._path(profile_id, ".folded"), "w") as f:
+            f.writelines(f"{stack} {count}\n" for stack, count in stacks.most_common())
+        with open(self._path(profile_id, ".json"), "w") as f:
+            json.dump(meta, f)
+        with self._lock:
+            for old in self.ids()[self.max_files:]:
+                for suffix in (".json", ".folded"):
+                    try:
+                        os.remove(self._path(old, suffix))
+                    except FileNotFoundError:
+                        pass
+
+    def meta(self, profile_id: str) -> dict:
+        with open(self._path(profile_id, ".json")) as f:
+            return json.load(f)
+
+    def list(self, limit: int = 100) -> list:
+        found = []
+        for profile_id in self.ids()[:limit]:
+            try:
+                found.append(self.meta(profile_id))
+            except (OSError, ValueError):
+                continue  # pruned while listing
+        return found
+
+    def collapsed(self, profile_id: str) -> str:
+        with open(self._path(profile_id, ".folded")) as f:
+            return f.read()
+
+    def speedscope(self, profile_id: str) -> dict:
+        """The profile in speedscope's file format (https://www.speedscope.app)."""
+        meta = self.meta(profile_id)
+        frames, index = [], {}
+        samples, weights = [], []
+        for line in self.collapsed(profile_id).splitlines():
+            stack, _, count = line.rpartition(" ")
+            sample = []
+            for name in stack.split(";"):
+                if name not in index:
+                    index[name] = len(frames)
+                    frames.append({"name": name})
+                sample.append(index[name])
+            samples.append(sample)
+            weights.append(int(count) * meta["interval_ms"])
+        name = f"{meta['method']} {meta['path']} ({meta['duration_ms']} ms)"
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "smart-krishi",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }],
+        }
+
+
+# --- middleware ------------------------------------------------------------------------
+
+def has_profile_token(value) -> bool:
+    if not PROFILE_TOKEN or not value:
+        return False
+    if isinstance(value, bytes):
+        value = value.decode("latin-1")
+    return secrets.compare_digest(value, PROFILE_TOKEN)
+
+
+def route_template(scope):
+    app = scope.get("app")
+    for route in getattr(app, "routes", ()):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", None)
+    return None
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that samples single requests on demand: those carrying
+    the profile token header, and a random PROFILE_SAMPLE_RATES share of the
+    configured routes. Everything else passes straight through. Profiles go
+    to the ProfileStore; the response gets an X-Profile-Id header.
+    """
+
+    def __init__(self, app, store: ProfileStore = None, rates: str = PROFILE_SAMPLE_RATES):
+        self.app = app
+        self.store = store or profile_store
+        self.rates = parse_rates(rates)
+        self.active = 0
+
+    def trigger(self, scope):
+        if scope["path"].startswith("/admin/profiles"):
+            return None
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                return "header" if has_profile_token(value) else None
+        if self.rates:
+            route = route_template(scope)
+            rate = self.rates.get((scope["method"], route), self.rates.get((None, route)))
+            if rate and random.random() < rate:
+                return "sampled"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        trigger = self.trigger(scope) if scope["type"] == "http" else None
+        if trigger is None:
+            return await self.app(scope, receive, send)
+        if self.active >= PROFILE_MAX_CONCURRENT:
+            PROFILES_SKIPPED.inc(reason="busy")
+            return await self.app(scope, receive, send)
+
+        profile_id = self.store.new_id()
+        status = 500
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", profile_id.encode())]}
+            await send(message)
+
+        sampler = Sampler(asyncio.current_task(), PROFILE_INTERVAL_MS / 1000, PROFILE_MAX_SECONDS)
+        self.active += 1
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            sampler.stop()
+            self.active -= 1
+            meta = {
+                "id": profile_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": getattr(scope.get("route"), "path", None) or route_template(scope),
+                "status": status,
+                "trigger": trigger,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+                "samples": sampler.samples,
+                "interval_ms": PROFILE_INTERVAL_MS,
+                "created_at": datetime.utcnow().isoformat(),
+            }
+            try:
+                await asyncio.to_thread(self.store.save, meta, sampler.stacks)
+                PROFILES.inc(trigger=trigger)
+            except OSError:
+                logger.exception("Could not write profile %s", profile_id)
+
+
+profile_store = ProfileStore()
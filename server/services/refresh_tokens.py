@@ -0,0 +1,222 @@
+import asyncio
+import hashlib
+import logging
+import os
+import secrets
+import uuid
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException, status
+from sqlalchemy import delete, func, select, update
+
+from database import AsyncSessionLocal
+from models.refresh_token import RefreshToken
+from models.user import User
+from services.auth import ACCESS_TOKEN_EXPIRE_MINUTES, revoked_sessions
+from services.metrics import Counter
+
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "30"))
+# A rotated token presented again this soon is a client retry after a lost
+# response, not theft: it gets a new successor instead of revoking the session
+REFRESH_REUSE_GRACE_SECONDS = float(os.getenv("REFRESH_REUSE_GRACE_SECONDS", "30"))
+# How often each worker loads other workers' revocations into its denylist
+REFRESH_DENYLIST_SYNC_SECONDS = float(os.getenv("REFRESH_DENYLIST_SYNC_SECONDS", "30"))
+REFRESH_PURGE_INTERVAL_SECONDS = float(os.getenv("REFRESH_PURGE_INTERVAL_SECONDS", "3600"))
+REFRESH_PURGE_BATCH = int(os.getenv("REFRESH_PURGE_BATCH", "1000"))
+
+logger = logging.getLogger("smart_krishi.auth")
+
+REFRESH_REQUESTS = Counter("refresh_token_requests_total", "Refresh token exchanges by outcome", ["result"])
+REFRESH_PURGED = Counter("refresh_tokens_purged_total", "Expired refresh tokens deleted by the purge task")
+
+
+def hash_token(token: str) -> str:
+    # Tokens are 256 random bits, so a fast unsalted hash is enough (no bcrypt)
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def issue_refresh_token(db, user_id: int, family_id: str = None):
+    """Add a new token to the session (new family unless given); returns (token, family_id). Caller commits."""
+    token = secrets.token_urlsafe(32)
+    family_id = family_id or uuid.uuid4().hex
+    db.add(RefreshToken(
+        user_id=user_id,
+        family_id=family_id,
+        token_hash=hash_token(token),
+        expires_at=datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+    ))
+    return token, family_id
+
+
+async def revoke_family(db, family_id: str):
+    """Revoke every token of a login session and deny its access tokens. Caller commits."""
+    await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.utcnow())
+    )
+    revoked_sessions.add(family_id)
+
+
+async def revoke_user_sessions(db, user_id: int, keep: str = None) -> int:
+    """Revoke every live session of a user except `keep` (e.g. after a password change). Caller commits."""
+    query = select(RefreshToken.family_id).where(RefreshToken.user_id == user_id, RefreshToken.revoked_at.is_(None))
+    if keep is not None:
+        query = query.where(RefreshToken.family_id != keep)
+    families = (await db.scalars(query.distinct())).all()
+    if families:
+        await db.execute(
+            update(RefreshToken)
+            .where(RefreshToken.family_id.in_(families), RefreshToken.revoked_at.is_(None))
+            .values(revoked_at=datetime.utcnow())
+        )
+        for family_id in families:
+            revoked_sessions.add(family_id)
+    return len(families)
+
+
+def _rejected(result: str, detail: str = "Invalid refresh token"):
+    REFRESH_REQUESTS.inc(result=result)
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+async def rotate_refresh_token(db, token: str):
+    """
+    Exchange a refresh token for its successor: (user, new_token, family_id).
+    A token that was already rotated is evidence it leaked, so the whole
+    family is revoked, unless it comes back within REFRESH_REUSE_GRACE_SECONDS:
+    then the client most likely lost the response, and gets a new successor
+    in place of the one it never received (only hashes are stored, so that
+    one can't be sent again).
+    """
+    row = await db.scalar(
+        select(RefreshToken).where(RefreshToken.token_hash == hash_token(token)).with_for_update()
+    )
+    now = datetime.utcnow()
+    if row is None:
+        raise _rejected("invalid")
+    if row.revoked_at is not None or row.family_id in revoked_sessions:
+        raise _rejected("revoked")
+    retried = row.used_at is not None
+    if retried and (now - row.used_at).total_seconds() > REFRESH_REUSE_GRACE_SECONDS:
+        await revoke_family(db, row.family_id)
+        await db.commit()
+        logger.warning("Refresh token reuse for user %s; session %s revoked", row.user_id, row.family_id)
+        raise _rejected("reused")
+    if row.expires_at <= now:
+        raise _rejected("expired")
+
+    user = await db.scalar(select(User).where(User.id == row.user_id))
+    if user is None or user.is_active is False:
+        raise _rejected("inactive")
+
+    if retried:
+        # Retire the unreceived successor, so the family still has one live token
+        await db.execute(
+            update(RefreshToken)
+            .where(RefreshToken.family_id == row.family_id, RefreshToken.used_at.is_(None))
+            .values(used_at=now)
+        )
+    else:
+        row.used_at = now
+    new_token, family_id = issue_refresh_token(db, row.user_id, row.family_id)
+    await db.commit()
+    REFRESH_REQUESTS.inc(result="reissued" if retried else "rotated")
+    return user, new_token, family_id
+
+
+async def revoke_refresh_token(db, token: str) -> bool:
+    """Logout: revoke the session the token belongs to. False if the token is unknown."""
+    family_id = await db.scalar(select(RefreshToken.family_id).where(RefreshToken.token_hash == hash_token(token)))
+    if family_id is None:
+        return False
+    await revoke_family(db, family_id)
+    await db.commit()
+    return True
+
+
+class RefreshTokenMaintenance:
+    """
+    Per-worker background task. Every REFRESH_DENYLIST_SYNC_SECONDS it loads
+    sessions revoked by other workers into the in-memory denylist; every
+    REFRESH_PURGE_INTERVAL_SECONDS it deletes expired tokens, a batch per
+    transaction so the table is never locked for long.
+    """
+
+    def __init__(
+        self,
+        sync_seconds: float = REFRESH_DENYLIST_SYNC_SECONDS,
+        purge_interval: float = REFRESH_PURGE_INTERVAL_SECONDS,
+        batch_size: int = REFRESH_PURGE_BATCH,
+    ):
+        self.sync_seconds = sync_seconds
+        self.purge_interval = purge_interval
+        self.batch_size = batch_size
+        self._task = None
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_purge = loop.time()
+        while True:
+            try:
+                await self.sync_denylist()
+                if loop.time() >= next_purge:
+                    await self.purge()
+                    next_purge = loop.time() + self.purge_interval
+            except Exception:
+                logger.exception("Refresh token maintenance failed")
+            await asyncio.sleep(self.sync_seconds)
+
+    async def sync_denylist(self) -> int:
+        """Deny sessions revoked recently enough that their access tokens may still be valid."""
+        lifetime = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        now = datetime.utcnow()
+        async with AsyncSessionLocal() as session:
+            rows = (await session.execute(
+                select(RefreshToken.family_id, func.max(RefreshToken.revoked_at))
+                .where(RefreshToken.revoked_at > now - lifetime)
+                .group_by(RefreshToken.family_id)
+            )).all()
+        for family_id, revoked_at in rows:
+            revoked_sessions.add(family_id, ttl=(revoked_at + lifetime - now).total_seconds())
+        return len(rows)
+
+    async def purge(self, now: datetime = None) -> int:
+        """Delete tokens that expired before `now`, batch_size rows at a time."""
+        now = now or datetime.utcnow()
+        purged = 0
+        async with AsyncSessionLocal() as session:
+            while True:
+                ids = (await session.scalars(
+                    select(RefreshToken.id).where(RefreshToken.expires_at < now).limit(self.batch_size)
+                )).all()
+                if not ids:
+                    break
+                await session.execute(delete(RefreshToken).where(RefreshToken.id.in_(ids)))
+                await session.commit()
+                purged += len(ids)
+                REFRESH_PURGED.inc(len(ids))
+                if len(ids) < self.batch_size:
+                    break
+                await asyncio.sleep(0)  # let requests run between batches
+        if purged:
+            logger.info("Purged %d expired refresh tokens", purged)
+        return purged
+
+
+refresh_token_maintenance = RefreshTokenMaintenance()
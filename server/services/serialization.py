@@ -0,0 +1,33 @@
+import orjson
+from sqlalchemy import select
+
+
+class Projection:
+    """
+    Read path for list endpoints: select just the columns a response schema
+    exposes, as plain rows, and encode them with orjson. Skips building ORM
+    instances and per-row Pydantic validation; keys and order match the schema,
+    so the JSON is the same as `response_model` would produce.
+    """
+
+    def __init__(self, schema, model):
+        self.schema = schema
+        self.fields = tuple(schema.model_fields)
+        # AttributeError here means the schema grew a field the table doesn't have
+        self.columns = [getattr(model, field) for field in self.fields]
+
+    def select(self):
+        return select(*self.columns)
+
+    def as_dicts(self, rows):
+        fields = self.fields
+        return [dict(zip(fields, row)) for row in rows]
+
+    def dump(self, rows) -> bytes:
+        """JSON array of the rows."""
+        return orjson.dumps(self.as_dicts(rows))
+
+    def dump_lines(self, rows) -> bytes:
+        """NDJSON: one object per row."""
+        fields = self.fields
+        return b"".join(orjson.dumps(dict(zip(fields, row))) + b"\n" for row in rows)
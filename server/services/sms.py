@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import os
+import time
+
+from services.metrics import Counter, Gauge, Histogram
+
+# SMS goes out through Twilio when all three are set; otherwise messages are skipped
+TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
+TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
+TWILIO_FROM_NUMBER = os.getenv("TWILIO_FROM_NUMBER")
+# Numbers are stored without a country code
+SMS_DEFAULT_COUNTRY_CODE = os.getenv("SMS_DEFAULT_COUNTRY_CODE", "+977")
+# A Twilio long code sends about one message per second
+SMS_RATE_PER_SECOND = float(os.getenv("SMS_RATE_PER_SECOND", "1"))
+SMS_MAX_RETRIES = int(os.getenv("SMS_MAX_RETRIES", "3"))
+SMS_RETRY_BACKOFF_SECONDS = float(os.getenv("SMS_RETRY_BACKOFF_SECONDS", "2"))
+SMS_QUEUE_LIMIT = int(os.getenv("SMS_QUEUE_LIMIT", "10000"))
+
+logger = logging.getLogger("smart_krishi.sms")
+
+SMS_MESSAGES = Counter("sms_messages_total", "SMS messages by outcome", ["result"])
+SMS_RETRIES = Counter("sms_retries_total", "SMS send attempts that were retried")
+SMS_QUEUE_DEPTH = Gauge("sms_queue_depth", "SMS messages waiting to be sent")
+SMS_SEND_SECONDS = Histogram("sms_send_seconds", "Twilio API call latency")
+
+
+def to_e164(phone: str, country_code: str = SMS_DEFAULT_COUNTRY_CODE) -> str:
+    phone = "".join(ch for ch in phone if ch.isdigit() or ch == "+")
+    return phone if phone.startswith("+") else country_code + phone.lstrip("0")
+
+
+def is_retryable(exc: Exception) -> bool:
+    # Twilio errors carry the HTTP status; anything without one is a network problem
+    status = getattr(exc, "status", None)
+    return status is None or status == 429 or status >= 500
+
+
+class SmsSender:
+    """
+    Background SMS queue drained by one task at a fixed rate, so a large
+    fan-out never exceeds the provider's send limit. Failed sends are retried
+    with exponential backoff. The Twilio client is blocking and runs in a thread.
+    """
+
+    def __init__(
+        self,
+        account_sid=TWILIO_ACCOUNT_SID,
+        auth_token=TWILIO_AUTH_TOKEN,
+        from_number=TWILIO_FROM_NUMBER,
+        rate: float = SMS_RATE_PER_SECOND,
+        max_retries: int = SMS_MAX_RETRIES,
+        backoff: float = SMS_RETRY_BACKOFF_SECONDS,
+        queue_limit: int = SMS_QUEUE_LIMIT,
+    ):
+        self.account_sid = account_sid
+        self.auth_token = auth_token
+        self.from_number = from_number
+        self.interval = 1 / rate
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.queue_limit = queue_limit
+        self._client = None
+        self._queue = None
+        self._worker_task = None
+        self._next_send = 0.0
+
+    @property
+    def enabled(self):
+        return bool(self.account_sid and self.auth_token and self.from_number)
+
+    @property
+    def running(self):
+        return self._worker_task is not None
+
+    async def start(self):
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_limit)
+        self._worker_task = asyncio.create_task(self._worker())
+
+    async def stop(self):
+        if not self.running:
+            return
+        self._worker_task.cancel()
+        await asyncio.gather(self._worker_task, return_exceptions=True)
+        self._worker_task = None
+        SMS_QUEUE_DEPTH.set(0)
+
+    async def enqueue(self, phone: str, body: str) -> bool:
+        """Queue a message without waiting for it to be sent. False if skipped or dropped."""
+        if not self.enabled:
+            SMS_MESSAGES.inc(result="disabled")
+            return False
+        if not self.running:
+            await self.start()
+        try:
+            self._queue.put_nowait((to_e164(phone), body))
+        except asyncio.QueueFull:
+            SMS_MESSAGES.inc(result="dropped")
+            return False
+        SMS_QUEUE_DEPTH.set(self._queue.qsize())
+        return True
+
+    def _get_client(self):
+        if self._client is None:
+            from twilio.rest import Client  # optional dependency
+
+            self._client = Client(self.account_sid, self.auth_token)
+        return self._client
+
+    def _send(self, phone: str, body: str):
+        started = time.perf_counter()
+        try:
+            self._get_client().messages.create(to=phone, from_=self.from_number, body=body)
+        finally:
+            SMS_SEND_SECONDS.observe(time.perf_counter() - started)
+
+    async def _pace(self):
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        if self._next_send > now:
+            await asyncio.sleep(self._next_send - now)
+        self._next_send = max(now, self._next_send) + self.interval
+
+    async def _deliver(self, phone: str, body: str):
+        for attempt in range(self.max_retries + 1):
+            await self._pace()
+            try:
+                await asyncio.to_thread(self._send, phone, body)
+            except Exception as exc:
+                if attempt == self.max_retries or not is_retryable(exc):
+                    SMS_MESSAGES.inc(result="failed")
+                    logger.warning("SMS to %s failed after %d attempt(s): %s", phone[-4:], attempt + 1, exc)
+                    return
+                SMS_RETRIES.inc()
+                await asyncio.sleep(self.backoff * 2 ** attempt)
+            else:
+                SMS_MESSAGES.inc(result="sent")
+                return
+
+    async def _worker(self):
+        while True:
+            phone, body = await self._queue.get()
+            SMS_QUEUE_DEPTH.set(self._queue.qsize())
+            try:
+                await self._deliver(phone, body)
+            except Exception:
+                logger.exception("SMS worker error")
+
+
+sms_sender = SmsSender()
@@ -0,0 +1,273 @@
+import os
+import sys
+from datetime import datetime
+from math import cos, radians
+
+from services.geo import EARTH_RADIUS_KM, bounding_box
+from services.metrics import Counter, Gauge
+from services.mirror import TableMirror
+
+# How often other workers' writes are fetched (rows with a newer row_version)
+SNAPSHOT_REFRESH_SECONDS = float(os.getenv("SNAPSHOT_REFRESH_SECONDS", "2"))
+# sort=score ranks by SEARCH_DISTANCE_WEIGHT * distance/radius + SEARCH_PRICE_WEIGHT * price/max_price
+SEARCH_DISTANCE_WEIGHT = float(os.getenv("SEARCH_DISTANCE_WEIGHT", "0.7"))
+SEARCH_PRICE_WEIGHT = float(os.getenv("SEARCH_PRICE_WEIGHT", "0.3"))
+INITIAL_CAPACITY = 1024
+
+SNAPSHOT_ROWS = Gauge("machinery_snapshot_rows", "Listings held in the in-memory search snapshot")
+SNAPSHOT_BYTES = Gauge("machinery_snapshot_bytes", "Approximate memory used by the search snapshot")
+SNAPSHOT_BYTES_PER_LISTING = Gauge("machinery_snapshot_bytes_per_listing", "Marginal snapshot memory per listing")
+SNAPSHOT_REBUILDS = Counter("machinery_snapshot_rebuilds_total", "Full rebuilds of the search snapshot")
+
+EPOCH = datetime(1970, 1, 1)
+
+# name -> numpy dtype; one array per column, indexed by slot
+COLUMNS = {
+    "id": "int64",
+    "lat": "float64",
+    "lon": "float64",
+    "lat_rad": "float64",
+    "lon_rad": "float64",
+    "cos_lat": "float64",
+    "price": "float64",
+    "delivery": "bool",
+    "delivery_charge": "float64",
+    "available_from": "float64",  # seconds since 1970 (naive UTC); -inf if open-ended
+    "available_to": "float64",  # +inf if open-ended
+    "is_available": "bool",
+    "live": "bool",  # False for deleted slots awaiting reuse
+}
+
+
+def _seconds(value, default):
+    if value is None:
+        return default
+    if value.tzinfo is not None:
+        value = value.replace(tzinfo=None) - value.utcoffset()
+    return (value - EPOCH).total_seconds()
+
+
+def _float(value):
+    return float("nan") if value is None else float(value)
+
+
+class MachinerySnapshot(TableMirror):
+    """
+    Column arrays (NumPy) of every listing's searchable fields, so a radius
+    search is one vectorized pass instead of a SQL scan plus per-row haversine.
+    Kept current by upsert()/remove() from this worker's writes and by
+    TableMirror catch-ups for everyone else's; deleted slots are reused.
+    NumPy is imported on first use to keep startup fast.
+    """
+    name = "machinery_snapshot"
+
+    def __init__(self, refresh_seconds: float = SNAPSHOT_REFRESH_SECONDS):
+        super().__init__(refresh_seconds)
+        self.capacity = self.size = 0
+        self.arrays = {}
+        self.slots = {}
+        self.free = []
+
+    @property
+    def model(self):
+        from models.machinery import Machinery
+
+        return Machinery
+
+    def columns(self):
+        m = self.model
+        return (
+            m.id, m.latitude, m.longitude, m.price_per_hour, m.delivery_available, m.delivery_charge,
+            m.available_from, m.available_to, m.is_available,
+        )
+
+    def _clear(self, capacity):
+        import numpy as np
+
+        self.capacity = capacity
+        self.size = 0  # slots in use (live or free), all < capacity
+        self.arrays = {name: np.zeros(capacity, dtype) for name, dtype in COLUMNS.items()}
+        self.slots = {}  # machinery id -> slot
+        self.free = []
+
+    def _reset(self, rows):
+        """Load rows of columns(), one column at a time."""
+        import numpy as np
+
+        n = len(rows)
+        ids, lat, lon, price, delivery, charge, available_from, available_to, is_available = (
+            zip(*rows) if rows else [()] * 9
+        )
+        self._clear(max(INITIAL_CAPACITY, n))
+        a = self.arrays
+        a["id"][:n] = ids
+        a["lat"][:n] = [_float(value) for value in lat]
+        a["lon"][:n] = [_float(value) for value in lon]
+        a["lat_rad"][:n] = np.radians(a["lat"][:n])
+        a["lon_rad"][:n] = np.radians(a["lon"][:n])
+        a["cos_lat"][:n] = np.cos(a["lat_rad"][:n])
+        a["price"][:n] = [_float(value) for value in price]
+        a["delivery"][:n] = [bool(value) for value in delivery]
+        a["delivery_charge"][:n] = [_float(value) for value in charge]
+        a["available_from"][:n] = [_seconds(value, float("-inf")) for value in available_from]
+        a["available_to"][:n] = [_seconds(value, float("inf")) for value in available_to]
+        a["is_available"][:n] = [value is not False for value in is_available]
+        a["live"][:n] = True
+        self.size = n
+        self.slots = {machinery_id: slot for slot, machinery_id in enumerate(ids)}
+        SNAPSHOT_REBUILDS.inc()
+        self._changed()
+
+    def _put(self, row):
+        slot = self.slots.get(row[0])
+        if slot is None:
+            slot = self._allocate(row[0])
+        self._write(slot, *row)
+
+    def _discard(self, machinery_id):
+        slot = self.slots.pop(machinery_id, None)
+        if slot is not None:
+            self.arrays["live"][slot] = False
+            self.free.append(slot)
+
+    def _changed(self):
+        SNAPSHOT_ROWS.set(len(self.slots))
+        SNAPSHOT_BYTES.set(self.memory_bytes())
+        SNAPSHOT_BYTES_PER_LISTING.set(self.bytes_per_listing())
+
+    # Incremental maintenance from this worker's writes
+
+    def upsert(self, machinery):
+        """Add or overwrite one listing (an ORM object or row with the Machinery columns)."""
+        self.upsert_row((
+            machinery.id, machinery.latitude, machinery.longitude, machinery.price_per_hour,
+            machinery.delivery_available, machinery.delivery_charge,
+            machinery.available_from, machinery.available_to, machinery.is_available,
+        ), getattr(machinery, "row_version", None))
+
+    def remove(self, machinery_id: int, version: int):
+        self.remove_row(machinery_id, version)
+
+    def _allocate(self, machinery_id):
+        if self.free:
+            slot = self.free.pop()
+        else:
+            if self.size == self.capacity:
+                self._grow()
+            slot = self.size
+            self.size += 1
+        self.slots[machinery_id] = slot
+        return slot
+
+    def _grow(self):
+        import numpy as np
+
+        capacity = max(INITIAL_CAPACITY, self.capacity * 2)
+        for name, array in self.arrays.items():
+            grown = np.zeros(capacity, array.dtype)
+            grown[:self.capacity] = array
+            self.arrays[name] = grown
+        self.capacity = capacity
+
+    def _write(self, slot, machinery_id, lat, lon, price, delivery, delivery_charge,
+               available_from, available_to, is_available):
+        a = self.arrays
+        a["id"][slot] = machinery_id
+        a["lat"][slot] = _float(lat)
+        a["lon"][slot] = _float(lon)
+        a["lat_rad"][slot] = radians(lat) if lat is not None else float("nan")
+        a["lon_rad"][slot] = radians(lon) if lon is not None else float("nan")
+        a["cos_lat"][slot] = cos(radians(lat)) if lat is not None else float("nan")
+        a["price"][slot] = _float(price)
+        a["delivery"][slot] = bool(delivery)
+        a["delivery_charge"][slot] = _float(delivery_charge)
+        a["available_from"][slot] = _seconds(available_from, float("-inf"))
+        a["available_to"][slot] = _seconds(available_to, float("inf"))
+        a["is_available"][slot] = is_available is not False
+        a["live"][slot] = True
+
+    # Search
+
+    def search(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        min_price: float = None,
+        max_price: float = None,
+        delivery: bool = None,
+        available_at: datetime = None,
+        candidate_ids=None,
+        sort: str = "distance",
+        k: int = 100,
+    ):
+        """[(machinery_id, distance_km)] of the best k matches, best first."""
+        import numpy as np
+
+        if k <= 0:
+            return []
+        with self._lock:
+            n = self.size
+            a = {name: array[:n] for name, array in self.arrays.items()}
+            mask = a["live"] & a["is_available"]
+            if min_price:
+                mask &= a["price"] >= min_price
+            if max_price:
+                mask &= a["price"] <= max_price
+            if delivery is not None:
+                mask &= a["delivery"] == delivery
+            if available_at is not None:
+                moment = _seconds(available_at, 0.0)
+                mask &= (a["available_from"] <= moment) & (a["available_to"] > moment)
+            if candidate_ids is not None:
+                mask &= np.isin(a["id"], np.fromiter(candidate_ids, dtype="int64"))
+
+            # Bounding box first, trigonometry only for what's inside it
+            min_lat, max_lat, min_lon, max_lon = bounding_box(latitude, longitude, radius_km)
+            mask &= (a["lat"] >= min_lat) & (a["lat"] <= max_lat) & (a["lon"] >= min_lon) & (a["lon"] <= max_lon)
+            index = np.flatnonzero(mask)
+
+            lat1 = radians(latitude)
+            dlat = a["lat_rad"][index] - lat1
+            dlon = a["lon_rad"][index] - radians(longitude)
+            h = np.sin(dlat / 2) ** 2 + np.cos(lat1) * a["cos_lat"][index] * np.sin(dlon / 2) ** 2
+            distance = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(h, 1.0)))
+
+            inside = distance <= radius_km
+            index, distance = index[inside], distance[inside]
+            if not len(index):
+                return []
+
+            if sort == "score":
+                price = a["price"][index]
+                top_price = price.max() or 1.0
+                score = SEARCH_DISTANCE_WEIGHT * distance / (radius_km or 1.0) + SEARCH_PRICE_WEIGHT * price / top_price
+            else:
+                score = distance
+
+            # O(n) selection of the best k, then sort just those
+            if k < len(score):
+                best = np.argpartition(score, k - 1)[:k]
+            else:
+                best = np.arange(len(score))
+            best = best[np.argsort(score[best], kind="stable")]
+            ids = a["id"][index[best]]
+            return list(zip(ids.tolist(), distance[best].tolist()))
+
+    # Sizing
+
+    def memory_bytes(self) -> int:
+        """Arrays at their current capacity plus the id -> slot map, roughly."""
+        arrays = sum(array.nbytes for array in self.arrays.values())
+        boxed = 2 * 28  # int key + int value objects per dict entry
+        return arrays + sys.getsizeof(self.slots) + len(self.slots) * boxed + sys.getsizeof(self.free)
+
+    def bytes_per_listing(self) -> float:
+        """What one more listing costs once capacity is in place: a row of every column plus its map entry."""
+        listings = len(self.slots)
+        row = sum(array.itemsize for array in self.arrays.values())
+        slot_map = (sys.getsizeof(self.slots) / listings if listings else 0) + 2 * 28
+        return round(row + slot_map, 1)
+
+
+machinery_snapshot = MachinerySnapshot()
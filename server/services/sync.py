@@ -0,0 +1,178 @@
+import gzip
+import os
+from datetime import timezone
+
+import orjson
+from sqlalchemy import and_, or_, select
+
+from models.machinery import Machinery
+from models.notification import Notification
+from models.sync import Tombstone
+from models.vegetable import Vegetable
+from schemas.machinery import MachineryOut
+from schemas.notification import NotificationOut
+from schemas.vegetable import VegetableOut
+from services.metrics import Counter, Histogram
+from services.serialization import Projection
+
+# Responses at least this big are gzipped for clients that accept it
+SYNC_GZIP_MIN_BYTES = int(os.getenv("SYNC_GZIP_MIN_BYTES", "1024"))
+SYNC_GZIP_LEVEL = int(os.getenv("SYNC_GZIP_LEVEL", "6"))
+
+SYNC_REQUESTS = Counter("sync_requests_total", "Delta-sync responses by encoding", ["encoding"])
+SYNC_ROWS = Counter("sync_rows_total", "Changed and deleted rows sent to sync clients")
+SYNC_BYTES = Histogram(
+    "sync_response_bytes",
+    "Encoded size of delta-sync responses, after compression",
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+)
+
+# entity name -> (model, projection); per-user entities are filtered on user_id
+ENTITIES = {
+    "machinery": (Machinery, Projection(MachineryOut, Machinery)),
+    "vegetables": (Vegetable, Projection(VegetableOut, Vegetable)),
+    "notifications": (Notification, Projection(NotificationOut, Notification)),
+}
+PER_USER = ("notifications",)
+
+
+def parse_token(token: str):
+    """
+    {entity: version} from a sync token, None if it's malformed. Tokens hold
+    one version per entity, dot-separated in ENTITIES order, since every
+    table has its own counter; a bare number (from before that) or "0"
+    applies to all of them.
+    """
+    parts = token.split(".")
+    if not all(part.isdigit() for part in parts):
+        return None
+    if len(parts) == 1:
+        return dict.fromkeys(ENTITIES, int(parts[0]))
+    if len(parts) != len(ENTITIES):
+        return None
+    return dict(zip(ENTITIES, map(int, parts)))
+
+
+def format_token(versions: dict) -> str:
+    return ".".join(str(versions[entity]) for entity in ENTITIES)
+
+
+async def collect_changes(db, user_id: int, since: dict, limit: int) -> dict:
+    """
+    Up to `limit` changes with row_version > since[entity], oldest first in
+    each entity, across every entity and tombstone. `token` holds the version
+    of the last change included per entity: the client stores it only after
+    applying the chunk and sends it back as `since`, so a dropped connection
+    just repeats that chunk.
+    """
+    batches = []  # (row_version, entity, row or deleted id)
+    for entity, (model, projection) in ENTITIES.items():
+        query = projection.select().add_columns(model.row_version).where(model.row_version > since[entity])
+        if entity in PER_USER:
+            query = query.where(model.user_id == user_id)
+        # One extra per source: if any is left over after the merge, there's more to fetch
+        rows = (await db.execute(query.order_by(model.row_version).limit(limit + 1))).all()
+        batches.extend((row.row_version, entity, row) for row in rows)
+
+    deletable = [
+        and_(
+            Tombstone.entity == entity,
+            Tombstone.row_version > version,
+            *([Tombstone.user_id == user_id] if entity in PER_USER else []),
+        )
+        for entity, version in since.items()
+        if version  # a first sync has nothing to delete
+    ]
+    if deletable:
+        tombstones = await db.execute(
+            select(Tombstone.row_version, Tombstone.entity, Tombstone.entity_id)
+            .where(or_(*deletable))
+            .order_by(Tombstone.row_version)
+            .limit(limit + 1)
+        )
+        batches.extend((version, entity, entity_id) for version, entity, entity_id in tombstones)
+
+    # Each source is sorted by version, so whatever the cut, every entity gets a
+    # gap-free prefix of its own changes
+    batches.sort(key=lambda change: change[0])
+    more = len(batches) > limit
+    batches = batches[:limit]
+
+    token = dict(since)
+    changed = {entity: [] for entity in ENTITIES}
+    deleted = {entity: [] for entity in ENTITIES}
+    for version, entity, item in batches:
+        token[entity] = version
+        if isinstance(item, int):
+            deleted[entity].append(item)
+        else:
+            changed[entity].append(item)
+
+    payload = {"token": format_token(token), "more": more}
+    for entity, (_, projection) in ENTITIES.items():
+        # Projection.fields stops the zip before the trailing row_version column
+        payload[entity] = projection.as_dicts(changed[entity])
+    payload["deleted"] = deleted
+    SYNC_ROWS.inc(len(batches))
+    return payload
+
+
+# --- encodings -----------------------------------------------------------------------
+# msgpack and cbor2 are imported on first use; a client asking for one that
+# isn't installed gets a 406.
+
+def _msgpack(payload) -> bytes:
+    import msgpack
+
+    # Datetimes as the same ISO strings the JSON encoding uses
+    return msgpack.packb(payload, default=lambda value: value.isoformat())
+
+
+def _cbor(payload) -> bytes:
+    import cbor2
+
+    # Stored datetimes are naive UTC; encoded as RFC 3339 strings (tag 0)
+    return cbor2.dumps(payload, timezone=timezone.utc)
+
+
+ENCODERS = {
+    "application/json": orjson.dumps,
+    "application/msgpack": _msgpack,
+    "application/x-msgpack": _msgpack,
+    "application/cbor": _cbor,
+}
+ENCODER_MODULES = {_msgpack: "msgpack", _cbor: "cbor2"}
+
+
+def available_encodings() -> list:
+    import importlib.util
+
+    return [
+        media_type for media_type, encoder in ENCODERS.items()
+        if encoder not in ENCODER_MODULES or importlib.util.find_spec(ENCODER_MODULES[encoder])
+    ]
+
+
+def negotiate(accept: str):
+    """The first media type in Accept that we can encode (JSON for none/`*/*`), else None."""
+    if not accept:
+        return "application/json"
+    for part in accept.split(","):
+        media_type = part.split(";")[0].strip().lower()
+        if media_type in ("*/*", "application/*"):
+            return "application/json"
+        if media_type in ENCODERS and media_type in available_encodings():
+            return media_type
+    return None
+
+
+def encode(payload, media_type: str, accept_encoding: str = ""):
+    """(body, headers) for the payload, gzipped when the client accepts it and it's worth it."""
+    body = ENCODERS[media_type](payload)
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    if len(body) >= SYNC_GZIP_MIN_BYTES and "gzip" in accept_encoding.lower():
+        body = gzip.compress(body, SYNC_GZIP_LEVEL)
+        headers["Content-Encoding"] = "gzip"
+    SYNC_REQUESTS.inc(encoding=media_type + ("+gzip" if "Content-Encoding" in headers else ""))
+    SYNC_BYTES.observe(len(body))
+    return body, headers
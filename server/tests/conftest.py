@@ -0,0 +1,44 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Must be set before database.py is imported: a throwaway SQLite file (aiosqlite for requests)
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="krishi-tests-"), "test.db")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ["DISEASE_BACKEND"] = "local"
+os.environ["REPLICA_DATABASE_URLS"] = ""
+sys.path.insert(0, SERVER_DIR)
+os.chdir(SERVER_DIR)  # static/ is resolved relative to the working directory
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    import migrate
+    from main import app
+
+    migrate.upgrade()
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def statements():
+    """SQL statements sent through the async engine while the test runs."""
+    from sqlalchemy import event
+
+    from database import async_engine
+
+    seen = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        seen.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    yield seen
+    event.remove(async_engine.sync_engine, "before_cursor_execute", record)
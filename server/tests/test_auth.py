@@ -0,0 +1,134 @@
+import time
+
+import pytest
+
+PASSWORD = "secret1"
+
+
+@pytest.fixture(autouse=True)
+def _fresh_principals():
+    from services.auth import token_cache, user_cache
+
+    yield
+    token_cache.clear()
+    user_cache.clear()
+
+
+def register(client, email, phone="9844444444"):
+    response = client.post("/auth/register", json={
+        "email": email, "name": "Farmer", "password": PASSWORD, "phone": phone,
+    })
+    assert response.status_code == 201, response.text
+
+
+def login(client, email, password=PASSWORD):
+    response = client.post("/auth/login", data={"username": email, "password": password})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def refresh(client, token):
+    return client.post("/auth/refresh", json={"refresh_token": token})
+
+
+def signed_in(client, tokens) -> bool:
+    response = client.get("/machinery/bookings", headers={"Authorization": f"Bearer {tokens['access_token']}"})
+    assert response.status_code in (200, 401), response.text
+    return response.status_code == 200
+
+
+def test_refresh_rotates_the_token(client):
+    register(client, "rotate@example.com")
+    first = login(client, "rotate@example.com")
+
+    response = refresh(client, first["refresh_token"])
+
+    assert response.status_code == 200, response.text
+    second = response.json()
+    assert second["refresh_token"] != first["refresh_token"]
+    assert signed_in(client, second)
+    assert refresh(client, second["refresh_token"]).status_code == 200
+
+
+def test_retry_within_the_grace_period_gets_a_new_successor(client):
+    register(client, "retry@example.com")
+    first = login(client, "retry@example.com")
+    lost = refresh(client, first["refresh_token"]).json()  # the client never sees this response
+
+    response = refresh(client, first["refresh_token"])
+
+    assert response.status_code == 200, response.text
+    retried = response.json()
+    assert retried["refresh_token"] not in (first["refresh_token"], lost["refresh_token"])
+    assert signed_in(client, retried)
+    assert refresh(client, retried["refresh_token"]).status_code == 200
+
+
+def test_reuse_after_the_grace_period_revokes_the_session(client, monkeypatch):
+    from services import refresh_tokens
+
+    register(client, "reuse@example.com")
+    first = login(client, "reuse@example.com")
+    second = refresh(client, first["refresh_token"]).json()
+    monkeypatch.setattr(refresh_tokens, "REFRESH_REUSE_GRACE_SECONDS", -1)
+
+    response = refresh(client, first["refresh_token"])
+
+    assert response.status_code == 401
+    # The whole family is gone: its live refresh token and its access tokens
+    assert refresh(client, second["refresh_token"]).status_code == 401
+    assert not signed_in(client, second)
+
+
+def test_logout_denies_the_sessions_access_tokens(client):
+    register(client, "logout@example.com")
+    tokens = login(client, "logout@example.com")
+    other = login(client, "logout@example.com")
+    assert signed_in(client, tokens)
+
+    response = client.post("/auth/logout", json={"refresh_token": tokens["refresh_token"]})
+
+    assert response.status_code == 204
+    assert not signed_in(client, tokens)
+    assert refresh(client, tokens["refresh_token"]).status_code == 401
+    assert signed_in(client, other)
+
+
+def test_password_change_revokes_every_other_session(client):
+    register(client, "password@example.com")
+    current = login(client, "password@example.com")
+    elsewhere = login(client, "password@example.com")
+
+    response = client.post(
+        "/users/change-password",
+        params={"current_password": PASSWORD, "new_password": "secret2"},
+        headers={"Authorization": f"Bearer {current['access_token']}"},
+    )
+
+    assert response.status_code == 204, response.text
+    assert signed_in(client, current)
+    assert refresh(client, current["refresh_token"]).status_code == 200
+    assert not signed_in(client, elsewhere)
+    assert refresh(client, elsewhere["refresh_token"]).status_code == 401
+    login(client, "password@example.com", "secret2")
+
+
+def test_expiring_set_keeps_every_key_until_it_expires():
+    from services.cache import ExpiringSet
+
+    revoked = ExpiringSet("test_revoked", ttl=1.0)
+    for key in range(50_000):  # no size bound: nothing is dropped early
+        revoked.add(key)
+    revoked.add("short", ttl=0.05)
+    revoked.add("capped", ttl=60)  # never longer than the set's TTL
+
+    assert 0 in revoked and 49_999 in revoked and "short" in revoked
+    time.sleep(0.1)
+    assert "short" not in revoked
+    assert 0 in revoked
+    time.sleep(1.0)
+    assert 0 not in revoked and "capped" not in revoked
+
+    revoked.add("next")  # expired keys are swept on insert
+    assert len(revoked) == 1
+
@@ -0,0 +1,76 @@
+from datetime import datetime
+
+
+def add_machine(available_to=datetime(2026, 12, 31)):
+    from database import SessionLocal
+    from models.machinery import Machinery
+
+    with SessionLocal() as db:
+        machine = Machinery(
+            name="Harvester", price_per_hour=900, latitude=27.6, longitude=85.2,
+            owner_name="Owner", owner_phone="9822222222", delivery_available=False,
+            available_from=datetime(2026, 1, 1), available_to=available_to,
+        )
+        db.add(machine)
+        db.commit()
+        return machine.id
+
+
+def book_elsewhere(machinery_id, *spans):
+    """Bookings committed by another worker: this one's calendar cache isn't told."""
+    from database import SessionLocal
+    from models.machinery import Booking, DeliveryType
+
+    with SessionLocal() as db:
+        for start, end in spans:
+            db.add(Booking(
+                machinery_id=machinery_id, user_phone="9833333333", start_time=start, end_time=end,
+                delivery_type=DeliveryType.SELF_PICKUP, total_price=900,
+            ))
+            db.flush()
+        db.commit()
+
+
+def busy(client, machinery_id, start, end):
+    response = client.get("/machinery/availability", params={
+        "machinery_ids": machinery_id, "start": start.isoformat(), "end": end.isoformat(),
+    })
+    assert response.status_code == 200, response.text
+    [calendar] = response.json()
+    return [(slot["start"], slot["end"]) for slot in calendar["busy"]]
+
+
+def test_bookings_from_another_worker_are_busy_on_a_cached_calendar(client):
+    machinery_id = add_machine()
+    start, end = datetime(2026, 3, 1), datetime(2026, 3, 8)
+    assert busy(client, machinery_id, start, end) == []  # builds and caches the calendar
+
+    # The later booking gets the lower id
+    book_elsewhere(
+        machinery_id,
+        (datetime(2026, 3, 5, 9), datetime(2026, 3, 5, 11)),
+        (datetime(2026, 3, 2, 14), datetime(2026, 3, 2, 15)),
+    )
+
+    assert busy(client, machinery_id, start, end) == [
+        ("2026-03-02T14:00:00", "2026-03-02T15:00:00"),
+        ("2026-03-05T09:00:00", "2026-03-05T11:00:00"),
+    ]
+
+
+def test_calendar_masks_are_bounded_to_the_horizon(client):
+    from services import availability
+
+    machinery_id = add_machine(available_to=datetime(2045, 1, 1))
+    book_elsewhere(machinery_id, (datetime(2030, 6, 1, 8), datetime(2030, 6, 1, 10)))
+    assert busy(client, machinery_id, datetime(2026, 4, 1), datetime(2026, 4, 2)) == []
+
+    calendar = availability.calendars.get(machinery_id)
+    assert calendar.open_mask.bit_length() <= availability.HORIZON_HOURS
+    assert calendar.busy_mask == 0  # the 2030 booking is past the horizon
+
+    # A window outside the horizon rebuilds the calendar around it
+    assert busy(client, machinery_id, datetime(2030, 6, 1), datetime(2030, 6, 2)) == [
+        ("2030-06-01T08:00:00", "2030-06-01T10:00:00"),
+    ]
+    assert availability.calendars.get(machinery_id).base == availability.hour_floor(datetime(2030, 6, 1))
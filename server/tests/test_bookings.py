@@ -0,0 +1,148 @@
+from datetime import datetime
+
+
+def register_and_login(client, email, phone):
+    response = client.post("/auth/register", json={
+        "email": email, "name": "Farmer", "password": "secret1", "phone": phone,
+        "latitude": 27.7, "longitude": 85.3,
+    })
+    assert response.status_code == 201, response.text
+    response = client.post("/auth/login", data={"username": email, "password": "secret1"})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def add_bookings(phone, count):
+    from database import SessionLocal
+    from models.machinery import Booking, DeliveryType, Machinery
+
+    with SessionLocal() as db:
+        machines = [
+            Machinery(
+                name=f"Tractor {i}", price_per_hour=500, latitude=27.71, longitude=85.31,
+                owner_name="Owner", owner_phone="9811111111", delivery_available=True, delivery_charge=100,
+                available_from=datetime(2026, 1, 1), available_to=datetime(2026, 12, 31),
+            )
+            for i in range(count)
+        ]
+        db.add_all(machines)
+        db.flush()
+        db.add_all(
+            Booking(
+                machinery_id=machine.id, user_phone=phone,
+                start_time=datetime(2026, 2, 1 + i, 10), end_time=datetime(2026, 2, 1 + i, 12),
+                delivery_type=DeliveryType.OWNER_DELIVERY if i % 2 else DeliveryType.SELF_PICKUP,
+                total_price=1000,
+            )
+            for i, machine in enumerate(machines)
+        )
+        db.commit()
+
+
+def test_user_bookings_is_one_statement(client, statements):
+    headers = register_and_login(client, "bookings@example.com", "9800000001")
+    add_bookings("9800000001", 5)
+    client.get("/machinery/bookings", headers=headers)  # loads the user into the principal cache
+    statements.clear()
+
+    response = client.get("/machinery/bookings", headers=headers)
+
+    assert response.status_code == 200, response.text
+    bookings = response.json()
+    assert len(bookings) == 5
+    assert [b["start_time"] for b in bookings] == sorted((b["start_time"] for b in bookings), reverse=True)
+    assert {b["delivery_charge"] for b in bookings} == {None, 100.0}
+    # However many bookings, the endpoint issues a single SELECT ... JOIN
+    assert len(statements) == 1, statements
+    assert response.headers["X-DB-Query-Count"] == "1"
+
+
+def add_machine(**fields):
+    from database import SessionLocal
+    from models.machinery import Machinery
+
+    with SessionLocal() as db:
+        machine = Machinery(**{
+            "name": "Booking tractor", "price_per_hour": 500, "latitude": 27.71, "longitude": 85.31,
+            "owner_name": "Owner", "owner_phone": "9811111111", "delivery_available": True, "delivery_charge": 100,
+            "available_from": datetime(2027, 1, 1), "available_to": datetime(2027, 12, 31),
+            **fields,
+        })
+        db.add(machine)
+        db.commit()
+        return machine.id
+
+
+def book(client, headers, machinery_id, start, end, **fields):
+    return client.post("/machinery/book", headers=headers, json={
+        "machinery_id": machinery_id, "start_time": start.isoformat(), "end_time": end.isoformat(),
+        "delivery_type": "SELF_PICKUP", **fields,
+    })
+
+
+def test_overlapping_bookings_conflict(client):
+    from database import SessionLocal
+    from models.machinery import Booking, DeliveryType
+
+    headers = register_and_login(client, "overlap@example.com", "9800000002")
+    machine = add_machine()
+    assert book(client, headers, machine, datetime(2027, 3, 1, 8), datetime(2027, 3, 1, 12)).status_code == 200
+
+    # Known to this worker
+    response = book(client, headers, machine, datetime(2027, 3, 1, 11), datetime(2027, 3, 1, 14))
+    assert response.status_code == 409, response.text
+    # Back to back is fine: intervals are half-open
+    assert book(client, headers, machine, datetime(2027, 3, 1, 12), datetime(2027, 3, 1, 13)).status_code == 200
+
+    # Booked on another worker: only the database knows
+    with SessionLocal() as db:
+        db.add(Booking(
+            machinery_id=machine, user_phone="9800000009", delivery_type=DeliveryType.SELF_PICKUP,
+            start_time=datetime(2027, 3, 2, 8), end_time=datetime(2027, 3, 2, 10), total_price=1000,
+        ))
+        db.commit()
+    response = book(client, headers, machine, datetime(2027, 3, 2, 9), datetime(2027, 3, 2, 11))
+    assert response.status_code == 409, response.text
+
+
+def test_total_price_is_computed_by_the_server(client):
+    headers = register_and_login(client, "price@example.com", "9800000003")
+    machine = add_machine(price_per_hour=450, delivery_charge=150)
+
+    pickup = book(client, headers, machine, datetime(2027, 4, 1, 8), datetime(2027, 4, 1, 11), total_price=1)
+    delivered = book(
+        client, headers, machine, datetime(2027, 4, 2, 8), datetime(2027, 4, 2, 9, 30),
+        delivery_type="OWNER_DELIVERY", total_price=0,
+    )
+
+    assert pickup.status_code == 200, pickup.text
+    assert pickup.json()["total_price"] == 1350  # 3 h at 450
+    assert delivered.status_code == 200, delivered.text
+    assert delivered.json()["total_price"] == 825  # 1.5 h at 450, plus delivery
+
+
+def test_bookings_must_fit_the_availability_window(client):
+    headers = register_and_login(client, "window@example.com", "9800000004")
+    machine = add_machine(available_from=datetime(2027, 5, 1), available_to=datetime(2027, 5, 10))
+
+    for start, end in [
+        (datetime(2027, 4, 30, 20), datetime(2027, 5, 1, 2)),  # starts before
+        (datetime(2027, 5, 9, 20), datetime(2027, 5, 10, 2)),  # ends after
+        (datetime(2027, 5, 3, 12), datetime(2027, 5, 3, 10)),  # ends before it starts
+    ]:
+        response = book(client, headers, machine, start, end)
+        assert response.status_code == 400, (start, end, response.text)
+
+    assert book(client, headers, machine, datetime(2027, 5, 1), datetime(2027, 5, 10)).status_code == 200
+
+
+def test_bookings_are_for_the_callers_own_phone(client):
+    headers = register_and_login(client, "phone@example.com", "9800000005")
+    machine = add_machine()
+
+    response = book(client, headers, machine, datetime(2027, 6, 1, 8), datetime(2027, 6, 1, 10), user_phone="9800000006")
+    assert response.status_code == 403, response.text
+
+    response = book(client, headers, machine, datetime(2027, 6, 1, 8), datetime(2027, 6, 1, 10), user_phone="9800000005")
+    assert response.status_code == 200, response.text
+    assert response.json()["user_phone"] == "9800000005"
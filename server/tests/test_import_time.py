@@ -0,0 +1,23 @@
+import os
+import subprocess
+import sys
+
+from bench.importtime import FORBIDDEN, SERVER_DIR, measure
+
+# Same budget CI passes to `python -m bench.importtime --budget-ms`
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "1500"))
+
+
+def test_import_main_is_within_budget():
+    # Best of three, so a cold disk cache doesn't fail it
+    total_us = min(measure("main")[0] for _ in range(3))
+
+    assert total_us / 1000 <= IMPORT_BUDGET_MS, f"import main took {total_us / 1000:.0f} ms"
+
+
+def test_heavy_packages_are_not_imported_at_startup():
+    check = f"import sys, main; print(','.join(p for p in {FORBIDDEN!r} if p in sys.modules))"
+    proc = subprocess.run([sys.executable, "-c", check], cwd=SERVER_DIR, capture_output=True, text=True)
+
+    assert proc.returncode == 0, proc.stderr[-2000:]
+    assert proc.stdout.strip() == "", f"imported at startup, should be lazy: {proc.stdout.strip()}"
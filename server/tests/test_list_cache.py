@@ -0,0 +1,53 @@
+def add_vegetable(client, name="Tomato"):
+    response = client.post("/vegetables/", json={"veg_name": name, "category": "fruit", "quantity": 5, "rate": 80})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_matching_etag_is_a_304_without_queries(client):
+    add_vegetable(client)
+    first = client.get("/vegetables/", params={"category": "fruit"})
+    assert first.status_code == 200, first.text
+    etag = first.headers["ETag"]
+
+    response = client.get("/vegetables/", params={"category": "fruit"}, headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert response.headers["X-DB-Query-Count"] == "0"
+
+
+def test_local_write_invalidates_the_etag(client):
+    add_vegetable(client, "Brinjal")
+    etag = client.get("/vegetables/").headers["ETag"]
+
+    added = add_vegetable(client, "Okra")
+    response = client.get("/vegetables/", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert added["id"] in [row["id"] for row in response.json()]
+
+
+def test_write_from_another_worker_shows_up_once_the_version_expires(client):
+    from database import SessionLocal
+    from models.vegetable import Vegetable
+    from services.list_cache import list_cache
+
+    add_vegetable(client, "Cabbage")
+    etag = client.get("/vegetables/").headers["ETag"]
+    known = dict(list_cache._known)
+    with SessionLocal() as db:
+        db.add(Vegetable(veg_name="Radish", category="root", quantity=1, rate=40))
+        db.commit()
+    list_cache._known.update(known)  # another worker's commit doesn't reach this worker's list_cache
+
+    # Within LIST_CACHE_VERSION_SECONDS the remembered version still answers
+    assert client.get("/vegetables/", headers={"If-None-Match": etag}).status_code == 304
+
+    version, read_at = list_cache._known["vegetables"]
+    list_cache._known["vegetables"] = (version, read_at - list_cache.version_seconds)
+    response = client.get("/vegetables/", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert "Radish" in [row["veg_name"] for row in response.json()]
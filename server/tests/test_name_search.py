@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+
+
+class Result:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def all(self):
+        return self.rows
+
+    def one(self):
+        return self.rows[0]
+
+
+class FakeDatabase:
+    """Answers a mirror's queries in order: what a (possibly lagging) database returns."""
+
+    def __init__(self, *results):
+        self.results = list(results)
+
+    async def execute(self, query):
+        return Result(self.results.pop(0))
+
+
+LISTINGS = [(1, "Mahindra Tractor", 1), (2, "Rice Harvester", 2), (3, "Power Tiller", 3), (4, "Water Pump", 4)]
+
+
+@pytest.fixture
+def index():
+    from services.name_search import NameIndex
+
+    index = NameIndex(refresh_seconds=0)
+    # Full load: table_version, then every row
+    asyncio.run(index.ensure_fresh(FakeDatabase([(4, None)], LISTINGS)))
+    return index
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("tractor", 1),
+    ("traktor", 1),  # spelling variant
+    ("trecter", 1),  # vowel-level difference
+    ("mahindra trac", 1),  # the last word is a prefix (search-as-you-type)
+    ("harv", 2),
+    ("tiler", 3),
+    ("ट्रैक्टर", 1),  # Devanagari, romanized
+])
+def test_fuzzy_matches(index, query, expected):
+    scores = index.search(query)
+
+    assert max(scores, key=scores.get) == expected, scores
+
+
+def test_non_matching_words_filter_out(index):
+    assert index.search("rice tractor") == {}
+    assert index.search("zzz") == {}
+
+
+def test_suggest_autocompletes_names(index):
+    assert index.suggest("pu") == ["Water Pump"]
+    assert index.suggest("rice h") == ["Rice Harvester"]
+
+
+def test_catch_up_applies_other_workers_changes(index):
+    # Another worker renamed 2, added 5 and deleted 4
+    asyncio.run(index.ensure_fresh(FakeDatabase(
+        [(2, "Paddy Reaper", 6), (5, "Seed Drill", 7)],
+        [(4, 8)],
+    )))
+
+    assert 2 in index.search("reaper") and not index.search("harvester")
+    assert 5 in index.search("drill")
+    assert not index.search("pump")
+    assert index.watermark == 8
+
+
+def test_lagging_replica_cannot_bring_back_a_deleted_row(index):
+    index.remove(1, version=9)  # this worker's delete; its tombstone is version 9
+
+    # A replica that hasn't seen the delete yet still has the row, at a newer version than we held
+    asyncio.run(index.ensure_fresh(FakeDatabase([(1, "Mahindra Tractor", 6)], [])))
+    assert not index.search("tractor")
+    assert index.removed == {1: 9}
+
+    # Once the watermark passes the tombstone, it isn't needed any more
+    asyncio.run(index.ensure_fresh(FakeDatabase([], [(1, 9)])))
+    assert not index.search("tractor")
+    assert index.removed == {}
+
+
+def test_local_upsert_is_not_overwritten_by_an_older_catch_up(index):
+    index.upsert(3, "Mini Tiller", version=10)
+
+    asyncio.run(index.ensure_fresh(FakeDatabase([(3, "Power Tiller", 5)], [])))
+
+    assert index.names[3] == "Mini Tiller"
+
+
+def test_listings_from_another_worker_show_up_in_suggestions(client, monkeypatch):
+    from database import SessionLocal
+    from models.machinery import Machinery
+    from services.name_search import name_index
+
+    client.get("/machinery/suggest", params={"q": "x"})  # loads the index
+    monkeypatch.setattr(name_index, "refresh_seconds", 0)
+    with SessionLocal() as db:  # another worker
+        machine = Machinery(
+            name="Kubota Combine", price_per_hour=1200, latitude=27.7, longitude=85.3,
+            owner_name="Owner", owner_phone="9866666666",
+        )
+        db.add(machine)
+        db.commit()
+
+        assert client.get("/machinery/suggest", params={"q": "kubota com"}).json() == ["Kubota Combine"]
+
+        db.delete(machine)
+        db.commit()
+
+    assert client.get("/machinery/suggest", params={"q": "kubota"}).json() == []
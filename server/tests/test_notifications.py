@@ -0,0 +1,164 @@
+import asyncio
+
+import pytest
+
+
+
+def sign_in(client, email, phone):
+    response = client.post("/auth/register", json={
+        "email": email, "name": "Farmer", "password": "secret1", "phone": phone,
+    })
+    assert response.status_code == 201, response.text
+    response = client.post("/auth/login", data={"username": email, "password": "secret1"})
+    assert response.status_code == 200, response.text
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    return client.get("/users/me", headers=headers).json()["id"], headers
+
+
+def notify(user_id, message):
+    from database import SessionLocal
+    from models.notification import Notification
+
+    with SessionLocal() as db:
+        notification = Notification(user_id=user_id, message=message)
+        db.add(notification)
+        db.commit()
+        return notification.id
+
+
+def event_id(event: str) -> int:
+    assert event.startswith("id: "), event
+    return int(event.split("\n", 1)[0][4:])
+
+
+async def next_events(stream, count, timeout=5):
+    return [event_id(await asyncio.wait_for(anext(stream), timeout)) for _ in range(count)]
+
+
+async def publish(user_id, notification_id):
+    from services.notifications import notification_hub
+
+    await notification_hub.publish(user_id, notification_id, "{}")
+
+
+@pytest.fixture
+def open_stream(client):
+    """Runs notification_stream on the app's loop, the way the endpoint does, and closes it afterwards."""
+    from database import AsyncSessionLocal
+    from router.notification import notification_stream
+
+    streams = []
+
+    def open_stream(user_id, last_id=None):
+        streams.append(notification_stream(AsyncSessionLocal, user_id, last_id))
+        return streams[-1]
+
+    yield open_stream
+    for stream in streams:
+        client.portal.call(stream.aclose)
+
+
+def test_resume_replays_what_was_missed_then_goes_live(client, open_stream):
+    user_id, _ = sign_in(client, "stream-resume@example.com", "9877777771")
+    seen = notify(user_id, "Seen before the disconnect")
+    missed = [notify(user_id, f"Missed {i}") for i in range(3)]
+    stream = open_stream(user_id, last_id=seen)
+
+    async def resume():
+        replayed = await next_events(stream, 3)
+        live = notify(user_id, "Live")
+        await publish(user_id, missed[-1])  # also replayed: not sent twice
+        await publish(user_id, live)
+        return replayed, await next_events(stream, 1), live
+
+    replayed, after, live = client.portal.call(resume)
+
+    assert replayed == missed
+    assert after == [live]
+
+
+def test_last_event_id_header_is_the_resume_point(client, monkeypatch):
+    import router.notification as notifications
+
+    _, headers = sign_in(client, "stream-header@example.com", "9877777772")
+    resumed = []
+
+    async def finite_stream(sessions, user_id, last_id):
+        resumed.append(last_id)
+        yield ": done\n\n"
+
+    monkeypatch.setattr(notifications, "notification_stream", finite_stream)
+
+    response = client.get("/notifications/stream", params={"last_id": 1}, headers={**headers, "Last-Event-ID": "7"})
+    client.get("/notifications/stream", params={"last_id": 3}, headers=headers)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert resumed == [7, 3]
+
+
+def test_slow_consumer_is_resynced_from_the_table(client, open_stream, monkeypatch):
+    from services.notifications import LAGGED, notification_hub
+
+    monkeypatch.setattr(notification_hub, "queue_size", 2)
+    user_id, _ = sign_in(client, "stream-slow@example.com", "9877777773")
+    stream = open_stream(user_id)
+
+    async def fall_behind():
+        waiting = asyncio.ensure_future(anext(stream))
+        while user_id not in notification_hub.subscribers:
+            await asyncio.sleep(0.01)
+        (subscription,) = notification_hub.subscribers[user_id]
+        lagged = LAGGED.value()
+        # A burst the reader doesn't drain: the publisher drops events instead of waiting
+        ids = [notify(user_id, f"Burst {i}") for i in range(6)]
+        for notification_id in ids:
+            await publish(user_id, notification_id)
+        assert subscription.lagged and subscription.queue.qsize() == 2
+        assert LAGGED.value() - lagged == 4
+        first = event_id(await asyncio.wait_for(waiting, 5))
+        return ids, [first] + await next_events(stream, 5), subscription
+
+    ids, received, subscription = client.portal.call(fall_behind)
+
+    assert received == ids  # nothing lost, nothing twice
+    assert not subscription.lagged
+
+
+def test_closing_the_stream_unsubscribes(client, open_stream):
+    from services.notifications import notification_hub
+
+    user_id, _ = sign_in(client, "stream-close@example.com", "9877777774")
+    stream = open_stream(user_id)
+
+    async def connect_then_disconnect():
+        waiting = asyncio.ensure_future(anext(stream))
+        while user_id not in notification_hub.subscribers:
+            await asyncio.sleep(0.01)
+        waiting.cancel()  # the client went away mid-wait
+        await asyncio.gather(waiting, return_exceptions=True)
+        await stream.aclose()
+
+    client.portal.call(connect_then_disconnect)
+
+    assert user_id not in notification_hub.subscribers
+
+
+def test_feed_pages_with_the_next_cursor(client):
+    user_id, headers = sign_in(client, "feed-pages@example.com", "9877777775")
+    ids = [notify(user_id, f"Feed {i}") for i in range(5)]
+
+    pages, params = [], {"limit": 2}
+    while True:
+        response = client.get("/notifications", params=params, headers=headers)
+        assert response.status_code == 200, response.text
+        pages.append([n["id"] for n in response.json()])
+        if "X-Next-Cursor" not in response.headers:
+            break
+        params["before"] = response.headers["X-Next-Cursor"]
+
+    assert pages == [ids[:2:-1], ids[2:0:-1], ids[:1]]  # newest first, no gaps or repeats
+    # Rows added after the first page don't shift later pages
+    notify(user_id, "Newer")
+    response = client.get("/notifications", params={"limit": 2, "before": ids[3]}, headers=headers)
+    assert [n["id"] for n in response.json()] == ids[2:0:-1]
@@ -0,0 +1,59 @@
+import os
+import tempfile
+
+import pytest
+
+
+class FakeJob:
+    def __init__(self, result):
+        self._result = result
+        self.cancelled = False
+
+    def result(self, timeout=None):
+        if isinstance(self._result, Exception):
+            raise self._result
+        return self._result
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class FakeClient:
+    """Reads each upload the way gradio_client does: stat, then open the path."""
+
+    def __init__(self):
+        self.paths = []
+
+    def submit(self, img, api_name):
+        path = img["path"]
+        self.paths.append(path)
+        assert os.path.getsize(path) > 0
+        with open(path, "rb") as f:
+            data = f.read()
+        if data == b"broken":
+            return FakeJob(RuntimeError("space error"))
+        return FakeJob({"label": data.decode(), "confidences": []})
+
+
+def test_gradio_backend_uploads_from_memory_and_fails_items_independently():
+    pytest.importorskip("gradio_client")
+    from services.prediction import GradioBackend
+
+    backend = GradioBackend("test/space")
+    backend._client = FakeClient()
+    before = set(os.listdir(tempfile.gettempdir()))
+
+    results = backend.predict_batch([b"blast", b"broken", b"healthy"])
+
+    assert [r["label"] for r in (results[0], results[2])] == ["blast", "healthy"]
+    assert isinstance(results[1], RuntimeError)
+    if hasattr(os, "memfd_create"):
+        assert all(path.startswith("/proc/self/fd/") for path in backend._client.paths)
+        assert set(os.listdir(tempfile.gettempdir())) == before
+
+
+def test_backends_must_implement_predict_batch():
+    from services.prediction import PredictionBackend
+
+    with pytest.raises(TypeError):
+        PredictionBackend()
@@ -0,0 +1,139 @@
+import asyncio
+import time
+from collections import Counter as Tally
+
+import pytest
+
+TOKEN = "test-profile-token"
+
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    from services import profiling
+
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", TOKEN)
+    monkeypatch.setattr(profiling, "PROFILE_INTERVAL_MS", 1.0)
+    monkeypatch.setattr(profiling.profile_store, "directory", str(tmp_path))
+    return profiling.profile_store
+
+
+def profile_id(n):
+    return f"{1_700_000_000_000 + n:013d}-{n:08x}"
+
+
+def save(store, n, stacks=None):
+    store.save({
+        "id": profile_id(n), "method": "GET", "path": "/vegetables/", "route": "/vegetables/", "status": 200,
+        "trigger": "header", "duration_ms": 12.5, "samples": 4, "interval_ms": 5.0, "created_at": "2026-10-18T00:00:00",
+    }, stacks or Tally({"[running];main;handler": 3, "[awaiting];main;query": 1}))
+    return profile_id(n)
+
+
+def test_requests_with_the_token_are_profiled(client, store):
+    from services.profiling import PROFILE_ID
+
+    response = client.get("/vegetables/", params={"category": "profiled"}, headers={"X-Profile-Token": TOKEN})
+
+    assert response.status_code == 200
+    captured = response.headers["X-Profile-Id"]
+    assert PROFILE_ID.match(captured)
+    assert store.ids() == [captured]
+    meta = store.meta(captured)
+    assert (meta["method"], meta["path"], meta["route"]) == ("GET", "/vegetables/", "/vegetables/")
+    assert (meta["status"], meta["trigger"]) == (200, "header")
+
+
+@pytest.mark.parametrize("headers", [{"X-Profile-Token": "wrong"}, {"X-Profile-Token": ""}, {}])
+def test_other_requests_are_not_profiled(client, store, headers):
+    response = client.get("/vegetables/", headers=headers)
+
+    assert response.status_code == 200
+    assert "X-Profile-Id" not in response.headers
+    assert store.ids() == []
+
+
+def test_no_token_configured_means_no_profiling(client, store, monkeypatch):
+    from services import profiling
+
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", None)
+
+    response = client.get("/vegetables/", headers={"X-Profile-Token": TOKEN})
+
+    assert "X-Profile-Id" not in response.headers
+    assert client.get("/admin/profiles", headers={"X-Profile-Token": TOKEN}).status_code == 403
+
+
+def test_only_the_newest_profiles_are_kept(store, monkeypatch, tmp_path):
+    monkeypatch.setattr(store, "max_files", 3)
+
+    for n in range(5):
+        save(store, n)
+
+    assert store.ids() == [profile_id(4), profile_id(3), profile_id(2)]
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted(
+        profile_id(n) + suffix for n in (2, 3, 4) for suffix in (".json", ".folded")
+    )
+
+
+def test_admin_endpoints_need_the_token(client, store):
+    captured = save(store, 1)
+
+    for headers in ({}, {"X-Profile-Token": "wrong"}):
+        assert client.get("/admin/profiles", headers=headers).status_code == 403
+        assert client.get(f"/admin/profiles/{captured}", headers=headers).status_code == 403
+
+    response = client.get("/admin/profiles", headers={"X-Profile-Token": TOKEN})
+    assert response.status_code == 200
+    assert [meta["id"] for meta in response.json()] == [captured]
+    # Admin requests are never profiled themselves
+    assert "X-Profile-Id" not in response.headers
+
+
+def test_download_is_speedscope_json(client, store):
+    captured = save(store, 1)
+
+    response = client.get(f"/admin/profiles/{captured}", headers={"X-Profile-Token": TOKEN})
+
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"] == "application/json"
+    assert f'{captured}.speedscope.json' in response.headers["content-disposition"]
+    document = response.json()
+    assert document["$schema"] == "https://www.speedscope.app/file-format-schema.json"
+    frames = [frame["name"] for frame in document["shared"]["frames"]]
+    (profile,) = document["profiles"]
+    assert (profile["type"], profile["unit"], profile["startValue"]) == ("sampled", "milliseconds", 0)
+    stacks = [";".join(frames[i] for i in sample) for sample in profile["samples"]]
+    assert dict(zip(stacks, profile["weights"])) == {"[running];main;handler": 15.0, "[awaiting];main;query": 5.0}
+    assert profile["endValue"] == sum(profile["weights"])
+
+    collapsed = client.get(f"/admin/profiles/{captured}", params={"format": "collapsed"}, headers={"X-Profile-Token": TOKEN})
+    assert collapsed.text == "[running];main;handler 3\n[awaiting];main;query 1\n"
+    for missing in (profile_id(9), "..%2F..%2Fetc%2Fpasswd"):
+        assert client.get(f"/admin/profiles/{missing}", headers={"X-Profile-Token": TOKEN}).status_code == 404
+
+
+def test_sampler_tells_running_from_awaiting():
+    from services.profiling import Sampler
+
+    def spin(seconds):
+        until = time.perf_counter() + seconds
+        while time.perf_counter() < until:
+            pass
+
+    async def request():
+        spin(0.1)
+        await asyncio.sleep(0.1)
+
+    async def profile():
+        task = asyncio.ensure_future(request())
+        sampler = Sampler(task, 0.002, 5)
+        sampler.start()
+        await task
+        sampler.stop()
+        return sampler
+
+    sampler = asyncio.run(profile())
+
+    running = sum(count for stack, count in sampler.stacks.items() if stack.startswith("[running]") and "spin" in stack)
+    awaiting = sum(count for stack, count in sampler.stacks.items() if stack.startswith("[awaiting]") and "request" in stack)
+    assert running > 5 and awaiting > 5, sampler.stacks
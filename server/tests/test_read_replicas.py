@@ -0,0 +1,89 @@
+import json
+import shutil
+import sqlite3
+
+import pytest
+
+
+@pytest.fixture
+def replica(client, monkeypatch, tmp_path):
+    """A second SQLite file, copied from the primary, as the app's only read replica. It doesn't replicate."""
+    import database
+    from services.list_cache import list_cache
+
+    path = tmp_path / "replica.db"
+    shutil.copy(database.engine.url.database, path)
+    router = database.ReadRouter(database.AsyncSessionLocal, [f"sqlite:///{path}"])
+    monkeypatch.setattr(database, "read_router", router)
+    yield router, path
+    client.portal.call(router.stop)
+    client.cookies.clear()
+    list_cache.invalidate("vegetables")  # versions read from the replica
+
+
+def streamed_names(client, category, **headers):
+    response = client.get("/vegetables/", params={"format": "ndjson", "category": category}, headers=headers)
+    assert response.status_code == 200, response.text
+    return [json.loads(line)["veg_name"] for line in response.text.splitlines()]
+
+
+def listed_names(client, category, **headers):
+    response = client.get("/vegetables/", params={"category": category}, headers=headers)
+    assert response.status_code == 200, response.text
+    return [row["veg_name"] for row in response.json()]
+
+
+def add_to_replica_only(path, name, category):
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            "INSERT INTO vegetables (veg_name, category, quantity, rate, row_version) VALUES (?, ?, 1, 10, 1000000)",
+            (name, category),
+        )
+
+
+def test_reads_are_served_from_the_replica(client, replica):
+    _, path = replica
+    add_to_replica_only(path, "Replica gourd", "replica-read")
+
+    assert streamed_names(client, "replica-read") == ["Replica gourd"]
+    assert listed_names(client, "replica-read") == ["Replica gourd"]
+
+
+def test_unhealthy_replica_falls_back_to_the_primary(client, replica, monkeypatch):
+    router, path = replica
+    add_to_replica_only(path, "Replica yam", "replica-down")
+    client.portal.call(router.check)
+    assert router.replicas[0].healthy
+    assert streamed_names(client, "replica-down") == ["Replica yam"]
+
+    async def unreachable():
+        raise ConnectionError("replica unreachable")
+
+    monkeypatch.setattr(router.replicas[0], "probe", unreachable)
+    client.portal.call(router.check)
+
+    assert not router.replicas[0].healthy
+    assert streamed_names(client, "replica-down") == []
+
+
+def test_callers_read_their_own_writes(client, replica):
+    router, _ = replica
+    writer = {"Authorization": "Bearer writer"}
+    response = client.post(
+        "/vegetables/", headers=writer,
+        json={"veg_name": "Fresh spinach", "category": "replica-rw", "quantity": 2, "rate": 60},
+    )
+    assert response.status_code == 200, response.text
+    assert "krishi_rw=1" in response.headers["set-cookie"]
+
+    # Same caller (and this worker knows it): the primary, which has the row
+    assert streamed_names(client, "replica-rw", **writer) == ["Fresh spinach"]
+
+    # Another caller reads the replica, which hasn't caught up
+    client.cookies.clear()
+    assert streamed_names(client, "replica-rw", Authorization="Bearer someone-else") == []
+
+    # Another worker only sees the cookie
+    router.recent_writers.clear()
+    client.cookies.set("krishi_rw", "1")
+    assert listed_names(client, "replica-rw", **writer) == ["Fresh spinach"]
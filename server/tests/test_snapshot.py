@@ -0,0 +1,168 @@
+import asyncio
+import random
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import select
+
+# Seeded listings around a point no other test uses
+CENTER = (28.6, 81.6)
+RADIUS_KM = 30
+
+
+@pytest.fixture(scope="module")
+def listings(client):
+    from database import SessionLocal
+    from models.machinery import Machinery
+
+    rng = random.Random(21)
+    with SessionLocal() as db:
+        db.add_all(
+            Machinery(
+                name=f"Seeded machine {i}", price_per_hour=rng.randrange(200, 3000, 10),
+                latitude=CENTER[0] + rng.uniform(-0.4, 0.4), longitude=CENTER[1] + rng.uniform(-0.4, 0.4),
+                owner_name="Owner", owner_phone="9822222222", delivery_available=rng.random() < 0.5,
+                is_available=rng.random() < 0.9,
+            )
+            for i in range(400)
+        )
+        db.commit()
+
+
+@pytest.fixture(autouse=True)
+def _current_snapshot(monkeypatch):
+    from services.snapshot import machinery_snapshot
+
+    monkeypatch.setattr(machinery_snapshot, "refresh_seconds", 0)
+
+
+def sql_ranking(latitude, longitude, radius_km, max_price=None):
+    """The search as it was before the snapshot: SQL bounding box, then haversine per row."""
+    from database import SessionLocal
+    from models.machinery import Machinery
+    from services.geo import bounding_box, haversine
+
+    min_lat, max_lat, min_lon, max_lon = bounding_box(latitude, longitude, radius_km)
+    query = select(Machinery.id, Machinery.latitude, Machinery.longitude, Machinery.price_per_hour).where(
+        Machinery.is_available == True,
+        Machinery.latitude.between(min_lat, max_lat),
+        Machinery.longitude.between(min_lon, max_lon),
+    )
+    if max_price:
+        query = query.where(Machinery.price_per_hour <= max_price)
+    with SessionLocal() as db:
+        candidates = db.execute(query).all()
+    nearby = []
+    for machine in candidates:
+        distance = haversine(latitude, longitude, machine.latitude, machine.longitude)
+        if distance <= radius_km:
+            nearby.append((distance, machine.id, machine.price_per_hour))
+    nearby.sort()
+    return nearby
+
+
+def listed_ids(client, **params):
+    response = client.get("/machinery/", params={
+        "latitude": CENTER[0], "longitude": CENTER[1], "max_distance": RADIUS_KM, **params,
+    })
+    assert response.status_code == 200, response.text
+    return [machine["id"] for machine in response.json()]
+
+
+def test_top_k_matches_the_sql_haversine_search(client, listings):
+    expected = sql_ranking(*CENTER, RADIUS_KM)
+    assert len(expected) > 100
+
+    assert listed_ids(client, limit=25) == [machine_id for _, machine_id, _ in expected[:25]]
+    assert listed_ids(client, skip=25, limit=25) == [machine_id for _, machine_id, _ in expected[25:50]]
+    assert listed_ids(client, limit=1000) == [machine_id for _, machine_id, _ in expected]
+
+    cheap = sql_ranking(*CENTER, RADIUS_KM, max_price=800)
+    assert listed_ids(client, max_price=800, limit=10) == [machine_id for _, machine_id, _ in cheap[:10]]
+
+
+def test_distances_match_haversine(client, listings):
+    from database import AsyncSessionLocal
+    from services.snapshot import machinery_snapshot
+
+    async def ranked():
+        async with AsyncSessionLocal() as db:
+            await machinery_snapshot.ensure_fresh(db)
+        return machinery_snapshot.search(*CENTER, RADIUS_KM, k=50)
+
+    expected = sql_ranking(*CENTER, RADIUS_KM)[:50]
+    ranking = client.portal.call(ranked)
+
+    assert [machine_id for machine_id, _ in ranking] == [machine_id for _, machine_id, _ in expected]
+    for (_, distance), (expected_distance, _, _) in zip(ranking, expected):
+        assert distance == pytest.approx(expected_distance, abs=1e-6)
+
+
+def test_sort_by_score_blends_distance_and_price(client, listings):
+    from services.snapshot import SEARCH_DISTANCE_WEIGHT, SEARCH_PRICE_WEIGHT
+
+    nearby = sql_ranking(*CENTER, RADIUS_KM)
+    top_price = max(price for _, _, price in nearby)
+    expected = sorted(
+        nearby,
+        key=lambda m: SEARCH_DISTANCE_WEIGHT * m[0] / RADIUS_KM + SEARCH_PRICE_WEIGHT * m[2] / top_price,
+    )
+
+    by_score = listed_ids(client, sort="score", limit=20)
+
+    assert by_score == [machine_id for _, machine_id, _ in expected[:20]]
+    assert by_score != listed_ids(client, limit=20)
+
+
+class Result:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def all(self):
+        return self.rows
+
+    def one(self):
+        return self.rows[0]
+
+
+class FakeDatabase:
+    def __init__(self, *results):
+        self.results = list(results)
+
+    async def execute(self, query):
+        return Result(self.results.pop(0))
+
+
+def listing(machinery_id, latitude, longitude, price=500, version=None):
+    return SimpleNamespace(
+        id=machinery_id, latitude=latitude, longitude=longitude, price_per_hour=price,
+        delivery_available=False, delivery_charge=None, available_from=datetime(2027, 1, 1),
+        available_to=None, is_available=True, row_version=version,
+    )
+
+
+def test_removed_slots_are_reused():
+    from services.snapshot import INITIAL_CAPACITY, MachinerySnapshot
+
+    snapshot = MachinerySnapshot(refresh_seconds=60)
+    rows = [(i, 10.0, 10.0 + i / 1000, 500, False, None, None, None, True, i) for i in range(1, 6)]
+    asyncio.run(snapshot.ensure_fresh(FakeDatabase([(5, None)], rows)))
+    slot = snapshot.slots[2]
+
+    snapshot.remove(2, version=6)
+    assert 2 not in [machinery_id for machinery_id, _ in snapshot.search(10.0, 10.0, 50)]
+    snapshot.upsert(listing(7, 10.0, 10.0, version=7))
+
+    assert snapshot.slots[7] == slot
+    assert snapshot.size == 5 and snapshot.capacity == INITIAL_CAPACITY
+    ranked = snapshot.search(10.0, 10.0, 50)
+    assert [machinery_id for machinery_id, _ in ranked] == [7, 1, 3, 4, 5]
+    assert ranked[0][1] == 0.0
+
+    # Slots freed and taken again many times over: the arrays don't grow
+    for machinery_id in range(8, 2008):
+        snapshot.remove(machinery_id - 1, version=machinery_id)
+        snapshot.upsert(listing(machinery_id, 10.0, 10.0, version=machinery_id))
+    assert snapshot.size == 5 and snapshot.capacity == INITIAL_CAPACITY
+    assert len(snapshot.search(10.0, 10.0, 50)) == 5
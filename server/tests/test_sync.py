@@ -0,0 +1,149 @@
+import pytest
+
+
+def sign_in(client, email, phone):
+    response = client.post("/auth/register", json={
+        "email": email, "name": "Farmer", "password": "secret1", "phone": phone,
+    })
+    assert response.status_code == 201, response.text
+    response = client.post("/auth/login", data={"username": email, "password": "secret1"})
+    assert response.status_code == 200, response.text
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    return client.get("/users/me", headers=headers).json()["id"], headers
+
+
+def sync(client, headers, since="0", **params):
+    response = client.get("/sync", params={"since": since, **params}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def current_token(client, headers):
+    """Everything synced so far (other tests share the database)."""
+    delta = sync(client, headers, limit=5000)
+    while delta["more"]:
+        delta = sync(client, headers, delta["token"], limit=5000)
+    return delta["token"]
+
+
+def add_vegetable(client, name):
+    response = client.post("/vegetables/", json={"veg_name": name, "category": "sync", "quantity": 1, "rate": 20})
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def notify(user_id, message):
+    from database import SessionLocal
+    from models.notification import Notification
+
+    with SessionLocal() as db:
+        notification = Notification(user_id=user_id, message=message)
+        db.add(notification)
+        db.commit()
+        return notification.id
+
+
+def test_changes_come_in_chunks_until_more_is_false(client):
+    _, headers = sign_in(client, "sync-chunks@example.com", "9855555551")
+    token = current_token(client, headers)
+    names = [f"Sync vegetable {i}" for i in range(5)]
+    for name in names:
+        add_vegetable(client, name)
+
+    seen, chunks, more = [], 0, True
+    while more:
+        delta = sync(client, headers, token, limit=2)
+        seen += [row["veg_name"] for row in delta["vegetables"]]
+        token, more = delta["token"], delta["more"]
+        chunks += 1
+
+    assert seen == names
+    assert chunks == 3
+    assert len(token.split(".")) == 3  # one version per entity
+    # The final token is current: nothing more to send
+    assert sync(client, headers, token)["vegetables"] == []
+
+
+def test_deleted_rows_come_back_as_tombstones(client):
+    _, headers = sign_in(client, "sync-deletes@example.com", "9855555552")
+    vegetable_id = add_vegetable(client, "Sync bitter gourd")
+    token = current_token(client, headers)
+
+    assert client.delete(f"/vegetables/{vegetable_id}").status_code == 200
+    delta = sync(client, headers, token)
+
+    assert delta["deleted"]["vegetables"] == [vegetable_id]
+    assert delta["vegetables"] == []
+    # A first sync has nothing to delete
+    assert vegetable_id not in sync(client, headers, limit=5000)["deleted"]["vegetables"]
+
+
+def test_notifications_sync_only_to_their_user(client):
+    from database import SessionLocal
+    from models.notification import Notification
+
+    user_id, headers = sign_in(client, "sync-mine@example.com", "9855555553")
+    other_id, _ = sign_in(client, "sync-theirs@example.com", "9855555554")
+    token = current_token(client, headers)
+    notify(user_id, "Your tractor is booked")
+    theirs = notify(other_id, "Someone else's news")
+    with SessionLocal() as db:
+        db.delete(db.get(Notification, theirs))
+        db.commit()
+
+    delta = sync(client, headers, token)
+
+    assert [n["message"] for n in delta["notifications"]] == ["Your tractor is booked"]
+    assert delta["deleted"]["notifications"] == []
+
+
+def test_a_single_number_token_still_works(client):
+    _, headers = sign_in(client, "sync-legacy@example.com", "9855555555")
+    token = current_token(client, headers)
+    add_vegetable(client, "Sync pumpkin")
+
+    # Tokens from before per-table counters: one version for every table
+    delta = sync(client, headers, str(min(map(int, token.split(".")))), limit=5000)
+
+    assert "Sync pumpkin" in [row["veg_name"] for row in delta["vegetables"]]
+    for bad in ("abc", "1.2", "-1"):
+        assert client.get("/sync", params={"since": bad}, headers=headers).status_code == 400
+
+
+@pytest.mark.parametrize("media_type, module", [("application/msgpack", "msgpack"), ("application/cbor", "cbor2")])
+def test_compact_encodings_match_json(client, media_type, module):
+    decoder = pytest.importorskip(module)
+    _, headers = sign_in(client, f"sync-{module}@example.com", f"98555555{len(module):02d}")
+    add_vegetable(client, f"Sync {module} radish")
+    expected = sync(client, headers, limit=50)
+
+    response = client.get("/sync", params={"limit": 50}, headers={**headers, "Accept": media_type})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == media_type
+    decoded = decoder.unpackb(response.content) if module == "msgpack" else decoder.loads(response.content)
+    assert (decoded["token"], decoded["more"]) == (expected["token"], expected["more"])
+    assert decoded["vegetables"] == expected["vegetables"]
+    for entity in ("machinery", "notifications"):
+        assert [row["id"] for row in decoded[entity]] == [row["id"] for row in expected[entity]]
+    assert decoded["deleted"] == expected["deleted"]
+
+
+def test_unsupported_accept_is_a_406(client):
+    _, headers = sign_in(client, "sync-406@example.com", "9855555560")
+
+    response = client.get("/sync", headers={**headers, "Accept": "application/xml"})
+
+    assert response.status_code == 406
+    assert "application/json" in response.json()["detail"]
+
+
+def test_tables_have_their_own_version_counters(client):
+    from database import engine
+    from models.sync import reserve_versions
+
+    with engine.begin() as conn:
+        vegetables = reserve_versions(conn, "vegetables")
+        machinery = reserve_versions(conn, "machinery", 3)
+        assert reserve_versions(conn, "vegetables") == vegetables + 1
+        assert reserve_versions(conn, "machinery") == machinery + 1